@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Times analytics.build_report() on synthetic columns, and optionally
+analytics.load_transactions() against a database.
+
+Run from the repository root:
+    python benchmarks/bench_analytics.py --rows 10000000
+    python benchmarks/bench_analytics.py --db bench.db --user-id 2
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import analytics
+import database
+
+
+def synthetic_columns(rows, years, categories, seed):
+    # Ten years of daily-ish activity starting 2015-01-01 (day 16436)
+    first_day, span = 16436, years * 365
+    if analytics.np is not None:
+        rng = analytics.np.random.default_rng(seed)
+        days = rng.integers(first_day, first_day + span, rows)
+        amounts = rng.integers(-20000, 50000, rows)
+        codes = rng.integers(0, categories, rows)
+        months = (days - first_day) * 12 // 365 + 2015 * 12
+    else:
+        rng = random.Random(seed)
+        days = [rng.randrange(first_day, first_day + span) for _ in range(rows)]
+        amounts = [rng.randint(-20000, 50000) for _ in range(rows)]
+        codes = [rng.randrange(categories) for _ in range(rows)]
+        months = [(day - first_day) * 12 // 365 + 2015 * 12 for day in days]
+    names = [f"Category {i:02d}" for i in range(categories)]
+    return analytics.TransactionColumns(days, months, amounts, codes, names)
+
+
+def timed_runs(call, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analytics engine")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--categories', type=int, default=12)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='Also time loading a user from this database')
+    parser.add_argument('--user-id', type=int, default=1)
+    args = parser.parse_args()
+
+    engine = "numpy" if analytics.np is not None else "pure Python"
+    print(f"Engine: {engine}")
+    if args.db:
+        database.set_database_path(args.db)
+        load = timed_runs(lambda: analytics.load_transactions(args.user_id), args.runs)
+        rows = len(analytics.load_transactions(args.user_id))
+        print(f"load_transactions ({rows} rows): median {statistics.median(load):.1f} ms")
+
+    columns = synthetic_columns(args.rows, args.years, args.categories, args.seed)
+    report = timed_runs(lambda: analytics.build_report(columns), args.runs)
+    print(f"build_report ({args.rows} rows, {args.years} years): "
+          f"median {statistics.median(report):.1f} ms, max {max(report):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Times get_budget_summary as the number of categories grows.
+
+Run from the repository root:
+    python benchmarks/bench_budget_summary.py
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import database
+from budget import get_budget_summary
+
+CATEGORY_COUNTS = (5, 20, 80, 320)
+TRANSACTIONS_PER_CATEGORY = 50
+REPEATS = 20
+
+
+def populate(user_id, categories):
+    rng = random.Random(categories)
+    with database.db_connection() as conn:
+        conn.execute("INSERT OR IGNORE INTO users (user_id, name) VALUES (?, ?)",
+                     (user_id, f"bench-{categories}"))
+        rows = []
+        for i in range(categories):
+            category = f"Category {i:03d}"
+            # Leave every fourth category unbudgeted and every fifth without spending
+            if i % 4:
+                conn.execute("INSERT INTO budgets (user_id, category, limit_amount) VALUES (?, ?, ?)",
+                             (user_id, category, 50000))
+            if i % 5:
+                for _ in range(TRANSACTIONS_PER_CATEGORY):
+                    rows.append((user_id, -rng.randint(1, 2000), category,
+                                 f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", ''))
+        conn.executemany("""
+            INSERT INTO transactions (user_id, amount, category, date, description)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+
+
+def count_queries(user_id):
+    statements = []
+    with database.db_connection() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            get_budget_summary(user_id)
+        finally:
+            conn.set_trace_callback(None)
+    return len(statements)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.set_database_path(os.path.join(tmp, 'bench.db'))
+        database.setup_database()
+
+        print(f"{'Categories':>10} {'Rows':>8} {'Queries':>8} {'Median ms':>10} {'Max ms':>8}")
+        for user_id, categories in enumerate(CATEGORY_COUNTS, start=100):
+            populate(user_id, categories)
+            summary = get_budget_summary(user_id)
+            timings = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                get_budget_summary(user_id)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{categories:>10} {len(summary):>8} {count_queries(user_id):>8} "
+                  f"{statistics.median(timings):>10.3f} {max(timings):>8.3f}")
+
+        database.close_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Measures cold-start wall time of each scripted CLI subcommand against a
+per-command budget.
+
+Run from the repository root:
+    python benchmarks/bench_cli_startup.py --runs 20
+
+Exits with status 1 if any command's median exceeds its budget.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Median wall-time budgets in milliseconds, including interpreter start-up
+BUDGETS_MS = {
+    'add-user': 150,
+    'add-transaction': 150,
+    'balance': 150,
+    'summary': 150,
+    'report': 150,
+    'export': 150,
+    'import': 200,
+}
+
+
+def commands(csv_path, export_path):
+    # {run} is replaced by the run number, so repeated entries are not refused as duplicates
+    return {
+        'add-user': ['add-user', 'Bench'],
+        'add-transaction': ['add-transaction', '1', '-12.50', 'Food', '2025-06-01', 'Lunch {run}', '--no-alert'],
+        'balance': ['balance', '1'],
+        'summary': ['summary', '1'],
+        'report': ['report', '1'],
+        'export': ['export', '1', '--output', export_path],
+        'import': ['import', '1', csv_path],
+    }
+
+
+def time_command(args, cwd, runs):
+    timings = []
+    for run in range(runs):
+        argv = [arg.replace('{run}', str(run)) for arg in args]
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'lib.cli'] + argv, cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       env={**os.environ, 'PYTHONPATH': REPO_ROOT})
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start timings for CLI subcommands")
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'import.csv')
+        with open(csv_path, 'w') as f:
+            f.write("date,amount,category,description\n2025-06-01,-3.50,Food,Coffee\n")
+        # The first invocation creates the database; it is not part of the measurement
+        subprocess.run([sys.executable, '-m', 'lib.cli', 'balance', '1'], cwd=tmp, check=True,
+                       stdout=subprocess.DEVNULL, env={**os.environ, 'PYTHONPATH': REPO_ROOT})
+        baseline = time_command(['--help'], tmp, args.runs)
+
+        print(f"{'Command':<18} {'Median ms':>10} {'Max ms':>8} {'Budget':>8}")
+        print("─" * 48)
+        print(f"{'(--help)':<18} {statistics.median(baseline):>10.1f} {max(baseline):>8.1f} {'':>8}")
+        over = []
+        for name, argv in commands(csv_path, os.path.join(tmp, 'export.csv')).items():
+            timings = time_command(argv, tmp, args.runs)
+            median = statistics.median(timings)
+            budget = BUDGETS_MS[name]
+            flag = "" if median <= budget else "  OVER BUDGET"
+            if flag:
+                over.append(name)
+            print(f"{name:<18} {median:>10.1f} {max(timings):>8.1f} {budget:>8}{flag}")
+
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Measures memory per row and load time of get_all_transactions() results:
+per-row dicts (the old format), Transaction records and a TransactionBatch.
+
+Run from the repository root:
+    python benchmarks/bench_records.py --rows 1000000
+    python benchmarks/bench_records.py --db bench.db --user-id 2
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import database
+from generate import generate
+from money import Money
+from transaction import get_all_transactions, transactions_query
+
+
+def load_dicts(user_id):
+    # How get_all_transactions built its rows before records.py
+    query, params = transactions_query(user_id)
+    with database.db_connection(user_id) as conn:
+        rows = []
+        for row in conn.execute(query, params):
+            transaction = dict(row)
+            transaction['amount'] = Money.from_cents(transaction['amount'])
+            rows.append(transaction)
+    return rows
+
+
+FORMATS = {
+    'dict': load_dicts,
+    'Transaction': lambda user_id: get_all_transactions(user_id),
+    'TransactionBatch': lambda user_id: get_all_transactions(user_id, batch=True),
+}
+
+
+def measure(load, user_id):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = load(user_id)
+    seconds = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(result), size, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transaction result formats")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--db', help='Existing database (default: generate one with a single user)')
+    parser.add_argument('--user-id', type=int)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            database.set_database_path(args.db)
+            database.setup_database()
+            user_id = args.user_id or 1
+        else:
+            user_id = generate(os.path.join(tmp, 'bench.db'), users=1, transactions=args.rows)['user_ids'][0]
+
+        print(f"{'Format':<18} {'Rows':>9} {'MB':>8} {'Bytes/row':>10} {'Load s':>8}")
+        for name, load in FORMATS.items():
+            rows, size, seconds = measure(load, user_id)
+            print(f"{name:<18} {rows:>9} {size / 1e6:>8.1f} {size / max(rows, 1):>10.0f} {seconds:>8.2f}")
+
+        database.close_pools()
+
+
+if __name__ == "__main__":
+    main()
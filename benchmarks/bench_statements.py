@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Times statements.run_statements() with 1, 2, 4, ... worker processes on one
+database and reports the speedup over a single worker.
+
+Run from the repository root:
+    python benchmarks/bench_statements.py --users 2000 --transactions 1000000
+    python benchmarks/bench_statements.py --db bench.db --month 5 --year 2025
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import database
+from generate import generate
+from statements import run_statements
+
+
+def worker_counts(limit):
+    counts = [1]
+    while counts[-1] * 2 <= limit:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != limit:
+        counts.append(limit)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel statement generation")
+    parser.add_argument('--db', help='Existing database (default: generate one)')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--transactions', type=int, default=1000000)
+    parser.add_argument('--month', type=int)
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            database.set_database_path(args.db)
+            database.setup_database()
+        else:
+            generate(os.path.join(tmp, 'bench.db'), users=args.users, transactions=args.transactions)
+
+        # Untimed pass: stores the balance checkpoints that read-only workers cannot write
+        run_statements(os.path.join(tmp, 'warmup'), args.month, args.year, workers=1)
+
+        print(f"{'Workers':>7} {'Statements':>10} {'Seconds':>8} {'Per sec':>8} {'Speedup':>8}")
+        baseline = None
+        for workers in worker_counts(args.max_workers):
+            result = run_statements(os.path.join(tmp, f"run{workers}"), args.month, args.year, workers)
+            baseline = baseline or result['seconds']
+            print(f"{workers:>7} {result['written']:>10} {result['seconds']:>8.2f} "
+                  f"{result['written'] / result['seconds']:>8.0f} {baseline / result['seconds']:>7.2f}x")
+
+        database.close_pools()
+
+
+if __name__ == "__main__":
+    main()
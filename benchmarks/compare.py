@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Compares two benchmarks/run.py JSON reports and flags regressions.
+
+Run from the repository root:
+    python benchmarks/compare.py baseline.json candidate.json --threshold 0.10
+
+Exits with status 1 if any function's p50 or p95 got slower by more than the
+threshold (a fraction of the baseline value).
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+GATED_METRICS = ('p50_ms', 'p95_ms')
+
+
+def compare(baseline, candidate, threshold):
+    rows = []
+    for name, before in baseline['results'].items():
+        after = candidate['results'].get(name)
+        if after is None:
+            continue
+        row = {'name': name, 'regressed': False}
+        for metric in METRICS:
+            change = (after[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            row[metric] = (before[metric], after[metric], change)
+            if metric in GATED_METRICS and change > threshold:
+                row['regressed'] = True
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    print(f"{'Function':<34} " + " ".join(f"{metric[:3]:>20}" for metric in METRICS))
+    print("─" * 98)
+    for row in rows:
+        cells = []
+        for metric in METRICS:
+            before, after, change = row[metric]
+            cells.append(f"{before:>7.3f}→{after:<7.3f}{change:>+5.0%}")
+        flag = "  REGRESSION" if row['regressed'] else ""
+        print(f"{row['name']:<34} " + " ".join(f"{cell:>20}" for cell in cells) + flag)
+
+    regressions = [row['name'] for row in rows if row['regressed']]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
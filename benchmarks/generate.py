@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Fills a database with seeded synthetic users, budgets and transactions.
+
+Run from the repository root:
+    python benchmarks/generate.py bench.db --users 100 --transactions 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import database
+from rollup import rebuild_spending_rollup
+from search import rebuild_search_index
+
+CATEGORIES = [
+    'Food', 'Transport', 'Entertainment', 'Healthcare', 'Shopping', 'Utilities',
+    'Rent', 'Travel', 'Education', 'Gifts', 'Insurance', 'Fitness',
+]
+DESCRIPTIONS = ['Groceries', 'Uber ride', 'Cinema', 'Pharmacy', 'Online order',
+                'Electricity bill', 'Monthly rent', 'Flight', 'Course fee', 'Birthday present']
+CHUNK_SIZE = 50000
+
+
+def category_names(count):
+    names = CATEGORIES[:count]
+    names += [f"Category {i:03d}" for i in range(len(names), count)]
+    return names
+
+
+def generate_rows(user_ids, categories, transactions, days, seed):
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=days)
+    for _ in range(transactions):
+        day = (start + timedelta(days=rng.randrange(days))).isoformat()
+        if rng.random() < 0.2:
+            yield (rng.choice(user_ids), rng.randint(50000, 500000), 'Salary', day, 'Salary')
+        else:
+            yield (rng.choice(user_ids), -rng.randint(100, 20000), rng.choice(categories), day,
+                   rng.choice(DESCRIPTIONS))
+
+
+def generate(path, users=10, categories=8, transactions=10000, days=3 * 365, seed=42):
+    """Create (or extend) the database at path and return its row counts."""
+    database.set_database_path(path)
+    database.setup_database()
+    rng = random.Random(seed)
+    names = category_names(categories)
+
+    with database.db_connection() as conn:
+        # Loading is much faster without per-row trigger work; the derived
+        # tables are rebuilt once at the end instead.
+        triggers = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'transactions'"
+        ).fetchall()
+        for trigger in triggers:
+            conn.execute(f"DROP TRIGGER {trigger['name']}")
+        conn.execute("PRAGMA synchronous = OFF")
+
+        first_user = conn.execute("SELECT COALESCE(MAX(user_id), 0) + 1 FROM users").fetchone()[0]
+        user_ids = list(range(first_user, first_user + users))
+        conn.executemany("INSERT INTO users (user_id, name) VALUES (?, ?)",
+                         [(user_id, f"Bench User {user_id}") for user_id in user_ids])
+        conn.executemany(
+            "INSERT OR IGNORE INTO budgets (user_id, category, limit_amount) VALUES (?, ?, ?)",
+            [(user_id, category, rng.randint(100, 2000) * 100)
+             for user_id in user_ids for category in names if rng.random() < 0.5])
+
+        rows = generate_rows(user_ids, names, transactions, days, seed)
+        while True:
+            chunk = [row for _, row in zip(range(CHUNK_SIZE), rows)]
+            if not chunk:
+                break
+            conn.executemany("""
+                INSERT INTO transactions (user_id, amount, category, date, description)
+                VALUES (?, ?, ?, ?, ?)
+            """, chunk)
+        conn.execute("DELETE FROM balance_checkpoints")
+        for trigger in triggers:
+            conn.execute(trigger['sql'])
+        conn.commit()
+        conn.execute("PRAGMA synchronous = FULL")
+
+    rebuild_spending_rollup()
+    rebuild_search_index()
+    return {'users': users, 'categories': categories, 'transactions': transactions,
+            'user_ids': user_ids}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=3 * 365)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate(args.path, args.users, args.categories, args.transactions, args.days, args.seed)
+    print(f"Generated {args.transactions} transactions for {args.users} users "
+          f"in {time.perf_counter() - started:.1f}s -> {args.path}")
+
+
+if __name__ == "__main__":
+    main()
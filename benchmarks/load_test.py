@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Load-tests the HTTP service (lib/server.py) and reports requests/sec and
+latency percentiles per endpoint.
+
+Run from the repository root:
+    python benchmarks/load_test.py --clients 16 --seconds 10
+    python benchmarks/load_test.py --url http://127.0.0.1:8080 --users 1 2 3
+
+Without --url a synthetic database is generated and a server is started in
+this process. Each client keeps one HTTP/1.1 connection open and replays the
+ETag it last saw for each URL, so unchanged reads are answered with 304.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from run import summarize
+
+
+def request_mix(user_ids, rng):
+    user_id = rng.choice(user_ids)
+    roll = rng.random()
+    if roll < 0.35:
+        return 'GET summary', 'GET', f'/users/{user_id}/summary', None
+    if roll < 0.6:
+        return 'GET transactions', 'GET', f'/users/{user_id}/transactions?page_size=50', None
+    if roll < 0.8:
+        return 'GET balance', 'GET', f'/users/{user_id}/balance', None
+    if roll < 0.95:
+        return 'GET budgets', 'GET', f'/users/{user_id}/budgets', None
+    return 'POST transaction', 'POST', f'/users/{user_id}/transactions', {
+        'amount': f"-{rng.randint(1, 9999) / 100:.2f}", 'category': 'Food',
+        'date': time.strftime('%Y-%m-%d'), 'description': 'Load test'}
+
+
+def client(host, port, user_ids, seconds, seed, use_etags, results):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    timings = {}
+    statuses = {}
+    errors = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        name, method, path, payload = request_mix(user_ids, rng)
+        headers = {}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+        if use_etags and path in etags:
+            headers['If-None-Match'] = etags[path]
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body, headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        timings.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if response.getheader('ETag'):
+            etags[path] = response.getheader('ETag')
+    conn.close()
+    results.append((timings, statuses, errors))
+
+
+def run(url, user_ids, clients, seconds, use_etags, seed=42):
+    parts = urlsplit(url)
+    results = []
+    threads = [threading.Thread(target=client, args=(
+        parts.hostname, parts.port, user_ids, seconds, seed + i, use_etags, results))
+        for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings, statuses, errors = {}, {}, 0
+    for client_timings, client_statuses, client_errors in results:
+        for name, values in client_timings.items():
+            timings.setdefault(name, []).extend(values)
+        for status, count in client_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+        errors += client_errors
+    total = sum(len(values) for values in timings.values())
+    return {
+        'requests': total,
+        'requests_per_sec': total / elapsed,
+        'errors': errors,
+        'statuses': statuses,
+        'overall': summarize([value for values in timings.values() for value in values]),
+        'endpoints': {name: summarize(values) for name, values in sorted(timings.items())},
+    }
+
+
+def print_report(report):
+    print(f"{report['requests']} requests, {report['requests_per_sec']:.0f} req/s, "
+          f"{report['errors']} connection errors, statuses {report['statuses']}")
+    print(f"{'Endpoint':<20} {'Count':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("─" * 59)
+    for name, stats in list(report['endpoints'].items()) + [('(all)', report['overall'])]:
+        print(f"{name:<20} {stats['iterations']:>8} {stats['p50_ms']:>9.3f} "
+              f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the finance tracker HTTP service")
+    parser.add_argument('--url', help='Running server to test (one is started locally if omitted)')
+    parser.add_argument('--users', type=int, nargs='+', help='User ids to query (with --url)')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=32, help='Server workers (local server only)')
+    parser.add_argument('--transactions', type=int, default=20000)
+    parser.add_argument('--no-etags', dest='etags', action='store_false',
+                        help='Do not send If-None-Match')
+    parser.add_argument('--output', help='Write the report as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if args.url:
+            url, user_ids = args.url, args.users or [1]
+        else:
+            import database
+            import server as tracker_server
+            from generate import generate
+
+            path = os.path.join(tmp, 'load.db')
+            user_ids = generate(path, users=10, transactions=args.transactions)['user_ids']
+            database.set_database_path(path)
+            server = tracker_server.make_server(port=0, workers=args.workers)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        print(f"{args.clients} clients for {args.seconds:g}s against {url}")
+        report = run(url, user_ids, args.clients, args.seconds, args.etags)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            database.close_pools()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Times the public lib/ functions against a synthetic database and writes
+p50/p95/p99 latencies as JSON.
+
+Run from the repository root:
+    python benchmarks/run.py --transactions 100000 --output results.json
+    python benchmarks/run.py --db bench.db --iterations 500
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from itertools import count
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import database
+from generate import generate, category_names
+from transaction import (
+    save_transaction,
+    get_all_transactions,
+    calculate_balance,
+    get_recent_transactions,
+)
+from budget import get_budget_summary
+from helper import check_transaction_budget_impact
+
+
+def benchmark_cases(user_ids, categories, rng):
+    today = date.today()
+    # Numbered descriptions, unique across runs on one --db, so every timed save is an
+    # insert rather than a duplicate refusal
+    entries = (f"Benchmark {time.time_ns()}-{n}" for n in count())
+    return {
+        'get_all_transactions': lambda: get_all_transactions(rng.choice(user_ids)),
+        'get_all_transactions[month]': lambda: get_all_transactions(
+            rng.choice(user_ids), today.month, today.year),
+        'calculate_balance': lambda: calculate_balance(rng.choice(user_ids)),
+        'calculate_balance[as_of]': lambda: calculate_balance(
+            rng.choice(user_ids), f"{today.year - 1}-{rng.randint(1, 12):02d}-15"),
+        'get_budget_summary': lambda: get_budget_summary(rng.choice(user_ids)),
+        'check_transaction_budget_impact': lambda: check_transaction_budget_impact(
+            rng.choice(user_ids), rng.choice(categories), -rng.randint(1, 100)),
+        'get_recent_transactions': lambda: get_recent_transactions(rng.choice(user_ids), 10),
+        # Writes run last so they do not change the data the reads see
+        'save_transaction': lambda: save_transaction(
+            rng.choice(user_ids), -rng.randint(1, 100), rng.choice(categories),
+            today.isoformat(), next(entries)),
+    }
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    cuts = statistics.quantiles(timings, n=100, method='inclusive') if len(timings) > 1 else timings * 99
+    return {
+        'iterations': len(timings),
+        'mean_ms': statistics.fmean(timings),
+        'min_ms': timings[0],
+        'p50_ms': cuts[49],
+        'p95_ms': cuts[94],
+        'p99_ms': cuts[98],
+        'max_ms': timings[-1],
+    }
+
+
+def run(user_ids, categories, iterations, seed, only=None):
+    rng = random.Random(seed)
+    results = {}
+    for name, call in benchmark_cases(user_ids, categories, rng).items():
+        if only and name not in only:
+            continue
+        timings = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            call()  # warm up caches and the connection pool
+            for _ in range(iterations):
+                start = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - start) * 1000)
+        results[name] = summarize(timings)
+    return results
+
+
+def print_table(results):
+    print(f"{'Function':<34} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    print("─" * 64)
+    for name, stats in results.items():
+        print(f"{name:<34} {stats['p50_ms']:>9.3f} {stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the public finance tracker functions")
+    parser.add_argument('--db', help='Existing database to benchmark (generated into a temp dir if omitted)')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--categories', type=int, default=8)
+    parser.add_argument('--transactions', type=int, default=10000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='+', help='Benchmark only these functions')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            database.set_database_path(args.db)
+            database.setup_database()
+            with database.db_connection() as conn:
+                user_ids = [row[0] for row in conn.execute("SELECT user_id FROM users")]
+                categories = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT category FROM budgets")] or category_names(args.categories)
+            dataset = {'path': os.path.abspath(args.db)}
+        else:
+            path = os.path.join(tmp, 'bench.db')
+            print(f"Generating {args.transactions} transactions for {args.users} users...")
+            dataset = generate(path, args.users, args.categories, args.transactions, seed=args.seed)
+            user_ids = dataset.pop('user_ids')
+            categories = category_names(args.categories)
+
+        results = run(user_ids, categories, args.iterations, args.seed, args.only)
+        database.close_pools()
+
+    print_table(results)
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'dataset': dataset,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
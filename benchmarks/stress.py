@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Runs N reader processes and M writer processes against one database file and
+reports throughput, duplicate refusals and lock errors.
+
+Run from the repository root:
+    python benchmarks/stress.py --readers 4 --writers 4 --seconds 10
+    python benchmarks/stress.py --readers 4 --writers 4 --no-concurrent   # rollback journal
+
+Exits with status 1 if any operation failed with "database is locked".
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date
+from itertools import count
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import database
+from generate import generate, category_names
+
+
+def _is_lock_error(error):
+    return isinstance(error, sqlite3.OperationalError) and 'locked' in str(error)
+
+
+def reader(path, concurrent, user_ids, seconds, seed, results):
+    from budget import get_budget_summary
+    from ledger import balance_as_of
+    from transaction import get_transactions_page
+
+    database.set_database_path(path)
+    if concurrent:
+        database.enable_concurrency()
+    rng = random.Random(seed)
+    ops = errors = locked = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        user_id = rng.choice(user_ids)
+        try:
+            # Calls the functions that let errors propagate, so failures are countable
+            rng.choice([
+                lambda: get_transactions_page(user_id, page_size=50),
+                lambda: balance_as_of(user_id),
+                lambda: get_budget_summary(user_id),
+            ])()
+            ops += 1
+        except Exception as e:
+            errors += 1
+            locked += _is_lock_error(e)
+    database.close_pools()
+    results.put(('reader', ops, errors, locked, 0))
+
+
+def writer(path, concurrent, user_ids, categories, seconds, seed, results):
+    from transaction import DUPLICATE_MESSAGE, save_transaction
+
+    database.set_database_path(path)
+    if concurrent:
+        database.enable_concurrency()
+    rng = random.Random(seed)
+    ops = errors = locked = duplicates = 0
+    # Numbered descriptions, unique across runs on one --db, keep every write a new transaction
+    entries = (f"Stress {time.time_ns()}-{seed}-{n}" for n in count())
+    today = date.today().isoformat()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            saved = save_transaction(rng.choice(user_ids), -rng.randint(1, 100),
+                                     rng.choice(categories), today, next(entries))
+        if saved:
+            ops += 1
+        elif DUPLICATE_MESSAGE in output.getvalue():
+            duplicates += 1
+        else:
+            # save_transaction reports failures on stdout rather than raising
+            errors += 1
+            locked += 'locked' in output.getvalue()
+    database.close_pools()
+    results.put(('writer', ops, errors, locked, duplicates))
+
+
+def run(path, readers, writers, seconds, concurrent, user_ids, categories):
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=reader, args=(path, concurrent, user_ids, seconds, i, results))
+        for i in range(readers)
+    ] + [
+        multiprocessing.Process(target=writer,
+                                args=(path, concurrent, user_ids, categories, seconds, 1000 + i, results))
+        for i in range(writers)
+    ]
+    for process in processes:
+        process.start()
+    totals = {role: {'ops': 0, 'errors': 0, 'locked': 0, 'duplicates': 0} for role in ('reader', 'writer')}
+    for _ in processes:
+        role, ops, errors, locked, duplicates = results.get()
+        totals[role]['ops'] += ops
+        totals[role]['errors'] += errors
+        totals[role]['locked'] += locked
+        totals[role]['duplicates'] += duplicates
+    for process in processes:
+        process.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent reader/writer stress test")
+    parser.add_argument('--db', help='Existing database to use (generated into a temp dir if omitted)')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--transactions', type=int, default=20000)
+    parser.add_argument('--no-concurrent', dest='concurrent', action='store_false',
+                        help='Use the default rollback journal and direct writes')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, 'stress.db')
+        if args.db:
+            database.set_database_path(path)
+            database.setup_database()
+            with database.db_connection() as conn:
+                user_ids = [row[0] for row in conn.execute("SELECT user_id FROM users")]
+        else:
+            user_ids = generate(path, users=10, transactions=args.transactions)['user_ids']
+        categories = category_names(8)
+        if not args.concurrent:
+            with database.db_connection() as conn:
+                conn.execute("PRAGMA journal_mode = DELETE")
+        database.close_pools()
+
+        mode = "WAL + writer queue" if args.concurrent else "rollback journal"
+        print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s, {mode}")
+        totals = run(path, args.readers, args.writers, args.seconds, args.concurrent,
+                     user_ids, categories)
+
+    print(f"{'Role':<8} {'Ops':>8} {'Ops/s':>10} {'Errors':>8} {'Locked':>8} {'Duplicates':>11}")
+    print("─" * 58)
+    for role, entry in totals.items():
+        print(f"{role:<8} {entry['ops']:>8} {entry['ops'] / args.seconds:>10.1f} "
+              f"{entry['errors']:>8} {entry['locked']:>8} {entry['duplicates']:>11}")
+    return 1 if any(entry['locked'] for entry in totals.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
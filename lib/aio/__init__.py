@@ -0,0 +1,184 @@
+"""
+Async versions of the public transaction, budget and helper functions.
+
+    from aio import get_budget_summary, save_transaction
+    summary = await get_budget_summary(1)
+
+Each call runs the blocking function on a bounded thread pool sized to the
+connection pool, so every worker thread maps onto one pooled connection and
+keeps the pool's thread affinity (nested helpers reuse the worker's
+connection). Cancelling an awaiting task interrupts the SQL statement its
+worker is running.
+
+Reads are batched: concurrent calls to the same read function with the same
+arguments on one event loop share a single execution and receive the same
+result object, so treat results as read-only. The shared call is only
+cancelled once every caller waiting on it has been cancelled.
+"""
+
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import budget
+import database
+import helper
+import transaction
+
+_executor = None
+_executor_lock = threading.Lock()
+_inflight = weakref.WeakKeyDictionary()  # event loop -> {call key: _SharedCall}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=database.POOL_SIZE,
+                                           thread_name_prefix='finance-aio')
+        return _executor
+
+
+def shutdown(wait=True):
+    # Stops the worker threads; the next async call starts a fresh pool.
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+class _Call:
+    """Runs one blocking call on a worker and lets the loop interrupt it."""
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.thread_id = None
+        self.lock = threading.Lock()
+
+    def run(self):
+        with self.lock:
+            self.thread_id = threading.get_ident()
+        try:
+            return self.func(*self.args, **self.kwargs)
+        finally:
+            with self.lock:
+                self.thread_id = None
+
+    def interrupt(self):
+        # Holding the lock guarantees the worker is still inside this call, so the
+        # interrupt cannot land on whatever the thread runs next.
+        with self.lock:
+            if self.thread_id is not None:
+                database.interrupt(self.thread_id)
+
+
+async def _run(func, *args, **kwargs):
+    call = _Call(func, args, kwargs)
+    future = _get_executor().submit(call.run)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        if not future.cancel():
+            call.interrupt()
+        raise
+
+
+class _SharedCall:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+def _forget(calls, key, shared):
+    if calls.get(key) is shared:
+        del calls[key]
+
+
+def _call_key(func, args, kwargs):
+    key = (func, args, tuple(sorted(
+        (name, tuple(sorted(value.items())) if isinstance(value, dict) else value)
+        for name, value in kwargs.items())))
+    hash(key)
+    return key
+
+
+async def _run_shared(func, *args, **kwargs):
+    try:
+        key = _call_key(func, args, kwargs)
+    except TypeError:
+        # Unhashable arguments (e.g. a filters dict) are simply not batched
+        return await _run(func, *args, **kwargs)
+
+    calls = _inflight.setdefault(asyncio.get_running_loop(), {})
+    shared = calls.get(key)
+    if shared is None:
+        shared = calls[key] = _SharedCall(asyncio.ensure_future(_run(func, *args, **kwargs)))
+        shared.task.add_done_callback(lambda _: _forget(calls, key, shared))
+
+    shared.waiters += 1
+    try:
+        return await asyncio.shield(shared.task)
+    except asyncio.CancelledError:
+        if shared.waiters == 1 and not shared.task.done():
+            # Later callers must start a new execution rather than join a cancelled one
+            _forget(calls, key, shared)
+            shared.task.cancel()
+        raise
+    finally:
+        shared.waiters -= 1
+
+
+def _read(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await _run_shared(func, *args, **kwargs)
+    return wrapper
+
+
+def _write(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await _run(func, *args, **kwargs)
+    return wrapper
+
+
+# transaction.py
+save_transaction = _write(transaction.save_transaction)
+save_transactions_bulk = _write(transaction.save_transactions_bulk)
+save_transaction_with_budget_alert = _write(transaction.save_transaction_with_budget_alert)
+delete_transaction = _write(transaction.delete_transaction)
+get_all_transactions = _read(transaction.get_all_transactions)
+get_transactions_page = _read(transaction.get_transactions_page)
+calculate_balance = _read(transaction.calculate_balance)
+get_recent_transactions = _read(transaction.get_recent_transactions)
+
+
+async def iter_transactions(user_id, filters=None, page_size=transaction.PAGE_SIZE):
+    # Async counterpart of transaction.iter_transactions: one executor call per page.
+    cursor = None
+    while True:
+        page, cursor = await get_transactions_page(user_id, filters, page_size, cursor)
+        for row in page:
+            yield row
+        if cursor is None:
+            return
+
+
+# budget.py
+set_budget_limit = _write(budget.set_budget_limit)
+update_budget_limit = _write(budget.update_budget_limit)
+check_budget = _read(budget.check_budget)
+get_budget_summary = _read(budget.get_budget_summary)
+
+# helper.py
+get_budget_limit = _read(helper.get_budget_limit)
+get_spending_by_category = _read(helper.get_spending_by_category)
+get_transaction_categories = _read(helper.get_transaction_categories)
+get_budget_and_spending = _read(helper.get_budget_and_spending)
+check_transaction_budget_impact = _read(helper.check_transaction_budget_impact)
+check_current_budget_status = _read(helper.check_current_budget_status)
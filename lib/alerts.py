@@ -0,0 +1,113 @@
+"""
+Batch budget alerts for every user.
+
+evaluate_budget_alerts() computes the OK / WARNING / OVER status of every
+budget in a user-id range with one grouped query over spending_rollup,
+compares it with the status stored in alert_state by the previous run and
+returns only the budgets whose status changed. Budgets with no stored state
+count as OK, so a first run reports only budgets that are already near or
+over their limit.
+
+Ranges are independent, so run_budget_alerts() splits the user ids into
+ranges and evaluates them on a thread pool; each range reads on its own
+pooled connection and records its transitions in one write. In sharded mode
+every shard is split into its own ranges.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from budget import WARNING_RATIO
+from database import data_paths, get_pool, run_write
+from instrument import timed
+from money import Money
+
+MAX_USER_ID = 2 ** 63 - 1
+
+# Same thresholds as budget.budget_status(): OVER at the limit, WARNING from
+# WARNING_RATIO of it
+ALERT_QUERY = """
+    WITH spent AS (
+        SELECT user_id, category, SUM(total_spent) AS spent
+        FROM spending_rollup
+        WHERE user_id BETWEEN ? AND ?
+        GROUP BY user_id, category
+    ),
+    current AS (
+        SELECT b.user_id, b.category, b.limit_amount, COALESCE(s.spent, 0) AS spent,
+               CASE WHEN COALESCE(s.spent, 0) >= b.limit_amount THEN 'OVER'
+                    WHEN COALESCE(s.spent, 0) >= b.limit_amount * ? THEN 'WARNING'
+                    ELSE 'OK' END AS status
+        FROM budgets b
+        LEFT JOIN spent s ON s.user_id = b.user_id AND s.category = b.category
+        WHERE b.user_id BETWEEN ? AND ?
+    )
+    SELECT c.user_id, c.category, c.limit_amount, c.spent, c.status,
+           COALESCE(a.status, 'OK') AS previous
+    FROM current c
+    LEFT JOIN alert_state a ON a.user_id = c.user_id AND a.category = c.category
+    WHERE c.status != COALESCE(a.status, 'OK')
+    ORDER BY c.user_id, c.category
+"""
+
+
+def user_id_ranges(parts, path=None):
+    # Splits the users table's id span into up to `parts` inclusive (first, last) ranges
+    with get_pool(path).connection() as conn:
+        low, high = conn.execute("SELECT MIN(user_id), MAX(user_id) FROM users").fetchone()
+    if low is None:
+        return []
+    size = -(-(high - low + 1) // max(parts, 1))
+    return [(first, min(first + size - 1, high)) for first in range(low, high + 1, size)]
+
+
+def _record_transitions(conn, rows):
+    conn.executemany("""
+        INSERT INTO alert_state (user_id, category, status, spent, limit_amount)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, category) DO UPDATE SET
+            status = excluded.status, spent = excluded.spent,
+            limit_amount = excluded.limit_amount, changed_at = CURRENT_TIMESTAMP
+    """, [(row['user_id'], row['category'], row['status'], row['spent'], row['limit_amount'])
+          for row in rows])
+
+
+@timed
+def evaluate_budget_alerts(first_user_id=None, last_user_id=None, path=None):
+    """Return the budget status changes since the last run for a range of users.
+
+    Each change is a dict with user_id, category, previous and status ('OK',
+    'WARNING' or 'OVER'), spent and limit (Money). The new statuses are stored
+    in alert_state, so the next run only reports what changed after this one.
+    path limits the run to one database file (one shard); by default every
+    file is evaluated.
+    """
+    first = 1 if first_user_id is None else first_user_id
+    last = MAX_USER_ID if last_user_id is None else last_user_id
+    if last < first:
+        return []
+    rows = []
+    for path in [path] if path else data_paths():
+        with get_pool(path).connection() as conn:
+            found = conn.execute(ALERT_QUERY, (first, last, WARNING_RATIO, first, last)).fetchall()
+        if found:
+            run_write(lambda conn: _record_transitions(conn, found), path=path)
+        rows += found
+    return [{
+        'user_id': row['user_id'],
+        'category': row['category'],
+        'previous': row['previous'],
+        'status': row['status'],
+        'spent': Money.from_cents(row['spent']),
+        'limit': Money.from_cents(row['limit_amount']),
+    } for row in rows]
+
+
+def run_budget_alerts(workers=1):
+    # Evaluates every user, `workers` user-id ranges at a time; returns all transitions.
+    ranges = [(first, last, path) for path in data_paths()
+              for first, last in user_id_ranges(workers, path)]
+    if workers <= 1 or len(ranges) <= 1:
+        return [change for bounds in ranges for change in evaluate_budget_alerts(*bounds)]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='budget-alerts') as executor:
+        results = executor.map(lambda bounds: evaluate_budget_alerts(*bounds), ranges)
+        return [change for changes in results for change in changes]
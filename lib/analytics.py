@@ -0,0 +1,199 @@
+"""
+Columnar analytics over one user's transaction history.
+
+load_transactions() pulls a user's rows into parallel integer columns (date
+as days since 1970-01-01, calendar month, amount in cents, category code);
+build_report() turns them into monthly income/expense/net, per-category
+monthly spending, trailing moving averages and year-over-year deltas.
+
+With NumPy installed the columns are int64 arrays and every aggregate is a
+bincount or cumulative sum, so a ten-year report over 10M rows takes a
+few hundred milliseconds once loaded. Without NumPy the same functions run on
+plain lists in a single Python pass and return identical results.
+"""
+
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from database import db_connection
+from helper import date_range_clause
+from instrument import count_rows, timed
+from money import Money
+
+MOVING_AVERAGE_MONTHS = 3
+
+
+class TransactionColumns:
+    """One user's transactions as parallel columns (NumPy arrays or lists)."""
+
+    __slots__ = ('days', 'months', 'amounts', 'categories', 'category_names')
+
+    def __init__(self, days, months, amounts, categories, category_names):
+        self.days = days              # days since 1970-01-01
+        self.months = months          # year * 12 + (month - 1)
+        self.amounts = amounts        # cents; negative for expenses
+        self.categories = categories  # index into category_names
+        self.category_names = category_names
+
+    def __len__(self):
+        return len(self.amounts)
+
+
+def _month_label(month):
+    return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+
+@timed
+def load_transactions(user_id, start_date=None, end_date=None):
+    # start_date is inclusive and end_date exclusive, as elsewhere in lib/
+    clause, params = date_range_clause(start_date=start_date, end_date=end_date, column="t.date")
+    with db_connection(user_id) as conn:
+        names = [row[0] for row in conn.execute(
+            "SELECT DISTINCT category FROM transactions WHERE user_id = ? ORDER BY category",
+            (user_id,))]
+        # Everything is converted to integers in SQL so rows can be copied straight into arrays
+        cursor = conn.execute(f"""
+            WITH codes AS (
+                SELECT category, ROW_NUMBER() OVER (ORDER BY category) - 1 AS code
+                FROM (SELECT DISTINCT category FROM transactions WHERE user_id = ?)
+            )
+            SELECT CAST(julianday(t.date) - 2440587.5 AS INTEGER),
+                   CAST(substr(t.date, 1, 4) AS INTEGER) * 12 + CAST(substr(t.date, 6, 2) AS INTEGER) - 1,
+                   t.amount, c.code
+            FROM transactions t JOIN codes c ON c.category = t.category
+            WHERE t.user_id = ?{clause}
+        """, [user_id, user_id] + params)
+        # Plain tuples; the pool's Row factory would only slow the copy down
+        cursor.row_factory = None
+
+        if np is not None:
+            flat = np.fromiter(chain.from_iterable(cursor), dtype=np.int64)
+            table = flat.reshape(-1, 4)
+            columns = [np.ascontiguousarray(table[:, i]) for i in range(4)]
+        else:
+            columns = [list(column) for column in zip(*cursor)] or [[], [], [], []]
+    count_rows(len(columns[0]))
+    return TransactionColumns(*columns, names)
+
+
+def _monthly_numpy(columns):
+    first = int(columns.months.min())
+    index = columns.months - first
+    size = int(index.max()) + 1
+    categories = len(columns.category_names)
+    # bincount sums in float64, which is exact for integer cents below 2**53.
+    # Expenses are derived as income - net so only two passes touch every row.
+    amounts = columns.amounts.astype(np.float64)
+    net_totals = np.bincount(index, weights=amounts, minlength=size)
+    np.maximum(amounts, 0, out=amounts)
+    income_totals = np.bincount(index, weights=amounts, minlength=size)
+    # The category pass sums each expense as max(amount, 0) - amount
+    amounts -= columns.amounts
+    index *= categories
+    index += columns.categories
+    by_category = np.bincount(index, weights=amounts, minlength=size * categories)
+    income_totals = income_totals.round().astype(np.int64)
+    expense_totals = income_totals - net_totals.round().astype(np.int64)
+    return first, income_totals, expense_totals, by_category.round().astype(np.int64).reshape(size, categories)
+
+
+def _monthly_python(columns):
+    first = min(columns.months)
+    size = max(columns.months) - first + 1
+    categories = len(columns.category_names)
+    income_totals = [0] * size
+    expense_totals = [0] * size
+    by_category = [[0] * categories for _ in range(size)]
+    for month, amount, category in zip(columns.months, columns.amounts, columns.categories):
+        index = month - first
+        if amount > 0:
+            income_totals[index] += amount
+        else:
+            expense_totals[index] -= amount
+            by_category[index][category] -= amount
+    return first, income_totals, expense_totals, by_category
+
+
+def moving_average(values, window=MOVING_AVERAGE_MONTHS):
+    # Trailing mean over `window` entries in cents; None until a full window is available.
+    if np is not None and len(values) and not isinstance(values, list):
+        sums = np.cumsum(np.asarray(values, dtype=np.int64))
+        means = (sums[window - 1:] - np.concatenate(([0], sums[:-window]))) / window
+        return [None] * min(window - 1, len(values)) + [int(round(mean)) for mean in means]
+    averages = []
+    total = 0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        averages.append(int(round(total / window)) if i >= window - 1 else None)
+    return averages
+
+
+def year_over_year(values):
+    # Change against the same month a year earlier, in cents; None for the first year.
+    return [int(values[i] - values[i - 12]) if i >= 12 else None for i in range(len(values))]
+
+
+def _money(cents):
+    return Money.from_cents(cents) if cents is not None else None
+
+
+@timed
+def build_report(columns, window=MOVING_AVERAGE_MONTHS):
+    """Summarize loaded columns month by month.
+
+    Returns {'months': [...], 'categories': [...]} where each month has
+    income, expense, net, the trailing moving averages of expense and net and
+    the year-over-year change in net, and each category has its monthly
+    spending (aligned with 'months'), total and moving average. Months with
+    no transactions are included with zero totals. Amounts are Money.
+    """
+    if not len(columns):
+        return {'months': [], 'categories': []}
+
+    monthly = _monthly_numpy if np is not None and not isinstance(columns.amounts, list) else _monthly_python
+    first, income, expense, by_category = monthly(columns)
+    if np is not None and not isinstance(income, list):
+        net = income - expense
+        category_series = [by_category[:, i] for i in range(by_category.shape[1])]
+    else:
+        net = [i - e for i, e in zip(income, expense)]
+        category_series = [list(series) for series in zip(*by_category)]
+
+    expense_average = moving_average(expense, window)
+    net_average = moving_average(net, window)
+    net_change = year_over_year(net)
+    months = []
+    for i in range(len(income)):
+        months.append({
+            'month': _month_label(first + i),
+            'income': Money.from_cents(income[i]),
+            'expense': Money.from_cents(expense[i]),
+            'net': Money.from_cents(net[i]),
+            'expense_average': _money(expense_average[i]),
+            'net_average': _money(net_average[i]),
+            'net_change_yoy': _money(net_change[i]),
+        })
+
+    categories = []
+    for name, series in zip(columns.category_names, category_series):
+        total = int(sum(series))
+        if not total:
+            continue
+        categories.append({
+            'category': name,
+            'total': Money.from_cents(total),
+            'monthly': [Money.from_cents(value) for value in series],
+            'average': [_money(value) for value in moving_average(series, window)],
+        })
+    categories.sort(key=lambda item: item['total'], reverse=True)
+    return {'months': months, 'categories': categories}
+
+
+def user_report(user_id, start_date=None, end_date=None, window=MOVING_AVERAGE_MONTHS):
+    return build_report(load_transactions(user_id, start_date, end_date), window)
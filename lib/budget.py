@@ -1,38 +1,33 @@
-from database import get_db_connection
+from database import db_connection, run_write
 from transaction import get_spending_by_category
 from datetime import datetime
+from money import Money
+from instrument import timed
 from helper import get_spending_by_category, get_transaction_categories
 
+WARNING_RATIO = 0.9
+
 
 def validate_amount(amount):
-    return isinstance(amount, (int, float)) and amount > 0
+    return isinstance(amount, (int, float, Money)) and amount > 0
 
 
+@timed
 def set_budget_limit(user_id, category, amount):
     if not validate_amount(amount):
         print("Error: Amount must be a positive number.")
         return False
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Check if budget already exists
-        cursor.execute("""
-            SELECT * FROM budgets WHERE user_id = ? AND category = ?
-        """, (user_id, category))
-        if cursor.fetchone():
+        # UNIQUE(user_id, category) makes the insert its own existence check
+        inserted = run_write(lambda conn: conn.execute("""
+            INSERT OR IGNORE INTO budgets (user_id, category, limit_amount)
+            VALUES (?, ?, ?)
+        """, (user_id, category.strip(), Money(amount))).rowcount, user_id=user_id)
+        if not inserted:
             print(
                 "Budget for this category already exists. Use update_budget_limit instead.")
-            conn.close()
             return False
-
-        cursor.execute("""
-            INSERT INTO budgets (user_id, category, limit_amount)
-            VALUES (?, ?, ?)
-        """, (user_id, category.strip(), amount))
-        conn.commit()
-        conn.close()
         print(f"Budget set: {category} - ${amount}")
         return True
     except Exception as e:
@@ -44,24 +39,20 @@ def set_budget_limit(user_id, category, amount):
 # print(budget)
 
 
+@timed
 def update_budget_limit(user_id, category, new_amount):
     if not validate_amount(new_amount):
         print("Error: New amount must be a positive number.")
         return False
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
+        updated = run_write(lambda conn: conn.execute("""
             UPDATE budgets SET limit_amount = ? WHERE user_id = ? AND category = ?
-        """, (new_amount, user_id, category))
-        if cursor.rowcount == 0:
+        """, (Money(new_amount), user_id, category)).rowcount, user_id=user_id)
+        if updated == 0:
             print("⚠️ Budget not found. Use set_budget_limit to create one.")
         else:
             print(f" Budget updated: {category} - ${new_amount}")
-        conn.commit()
-        conn.close()
         return True
     except Exception as e:
         print(f"Error updating budget: {e}")
@@ -70,28 +61,29 @@ def update_budget_limit(user_id, category, new_amount):
 # print(update)
 
 
+def budget_status(spent, limit):
+    if spent >= limit:
+        return "OVER"
+    elif spent >= WARNING_RATIO * limit:
+        return "WARNING"
+    else:
+        return "OK"
+
+
+@timed
 def check_budget(user_id, category, spent):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT limit_amount FROM budgets 
-            WHERE user_id = ? AND category = ?
-        """, (user_id, category))
-        row = cursor.fetchone()
-        conn.close()
+        with db_connection(user_id) as conn:
+            row = conn.execute("""
+                SELECT limit_amount FROM budgets 
+                WHERE user_id = ? AND category = ?
+            """, (user_id, category)).fetchone()
 
         if not row:
             return "No Budget"
 
-        limit = float(row["limit_amount"])
-
-        if spent >= limit:
-            return "OVER"
-        elif spent >= 0.9 * limit:
-            return "WARNING"
-        else:
-            return "OK"
+        limit = Money.from_cents(row["limit_amount"])
+        return budget_status(Money(spent), limit)
     except:
         return "Unknown"
 
@@ -99,35 +91,46 @@ def check_budget(user_id, category, spent):
 # print(checkbuget)
 
 
+def budget_summary(user_id):
+    # One grouped query: per-category spend joined with budgets, plus budgeted
+    # categories the user has not spent anything in yet. Database errors propagate.
+    with db_connection(user_id) as conn:
+        rows = conn.execute("""
+            WITH spending AS (
+                SELECT category,
+                       SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END) AS spent
+                FROM transactions
+                WHERE user_id = ?
+                GROUP BY category
+            )
+            SELECT s.category, b.limit_amount, s.spent
+            FROM spending s
+            LEFT JOIN budgets b ON b.user_id = ? AND b.category = s.category
+            UNION ALL
+            SELECT b.category, b.limit_amount, 0
+            FROM budgets b
+            WHERE b.user_id = ?
+              AND b.category NOT IN (SELECT category FROM spending)
+            ORDER BY 1
+        """, (user_id, user_id, user_id)).fetchall()
+
+    summary = []
+    for category, limit, spent in rows:
+        limit = Money.from_cents(limit) if limit is not None else None
+        spent = Money.from_cents(spent)
+        summary.append({
+            "category": category,
+            "limit": limit,
+            "spent": spent,
+            "status": budget_status(spent, limit) if limit else "No Budget"
+        })
+    return summary
+
+
+@timed
 def get_budget_summary(user_id):
     try:
-        categories = get_transaction_categories(user_id)
-        summary = []
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        for category in categories:
-            # Get budget limit
-            cursor.execute("""
-                SELECT limit_amount FROM budgets WHERE user_id = ? AND category = ?
-            """, (user_id, category))
-            row = cursor.fetchone()
-            limit = float(row["limit_amount"]) if row else None
-
-            # Get total spent from transactions
-            spent = get_spending_by_category(user_id, category)
-
-            summary.append({
-                "category": category,
-                "limit": limit,
-                "spent": spent,
-                "status": check_budget(user_id, category, spent) if limit else "No Budget"
-            })
-
-        conn.close()
-        return summary
-
+        return budget_summary(user_id)
     except Exception as e:
         print(f"Error generating budget summary: {e}")
         return []
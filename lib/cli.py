@@ -2,17 +2,29 @@
 
 import os
 import sys
+
+# Lets `python -m lib.cli ...` from the repository root find the flat lib/ imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # Scripted subcommands skip the interactive menu, colorama and the imports below
+    from commands import main as run_command
+    sys.exit(run_command(sys.argv[1:]))
+
 from datetime import datetime, date
 from colorama import Fore, Style, Back
 import colorama
 
-from database import setup_database, get_db_connection
+from database import setup_database
+from users import create_user, get_all_users
 from transaction import (
     save_transaction_with_budget_alert,
     get_all_transactions,
+    get_transactions_page,
     calculate_balance,
     get_recent_transactions,
-    delete_transaction
+    delete_transaction,
+    find_duplicate
 )
 from budget import (
     set_budget_limit,
@@ -21,6 +33,11 @@ from budget import (
     check_budget
 )
 from helper import get_spending_by_category, get_transaction_categories
+from recurring import materialize_due
+from reports import period_report
+from search import search_transactions
+from money import Money
+import instrument
 
 colorama.init()
 
@@ -39,6 +56,13 @@ class FinanceTrackerCLI:
             print(f"{Fore.RED}✗ Error initializing database: {e}{Style.RESET_ALL}")
             sys.exit(1)
 
+        try:
+            recorded = materialize_due()
+            if recorded:
+                print(f"{Fore.GREEN}✓ Recorded {recorded} recurring transactions{Style.RESET_ALL}")
+        except Exception as e:
+            print(f"{Fore.YELLOW}Could not record recurring transactions: {e}{Style.RESET_ALL}")
+
     def clear_screen(self):
         os.system('cls' if os.name == 'nt' else 'clear')
 
@@ -59,8 +83,10 @@ class FinanceTrackerCLI:
         print(f"{Fore.YELLOW}6.{Style.RESET_ALL} 📈 Budget Summary")
         print(f"{Fore.YELLOW}7.{Style.RESET_ALL} 🕒 Recent Activity")
         print(f"{Fore.YELLOW}8.{Style.RESET_ALL} 🗑️  Delete Transaction")
-        print(f"{Fore.YELLOW}9.{Style.RESET_ALL} 🔄 Refresh Screen")
-        print(f"{Fore.RED}10.{Style.RESET_ALL} 🚪 Exit")
+        print(f"{Fore.YELLOW}9.{Style.RESET_ALL} 📅 Period Reports")
+        print(f"{Fore.YELLOW}10.{Style.RESET_ALL} 🔍 Search Transactions")
+        print(f"{Fore.YELLOW}11.{Style.RESET_ALL} 🔄 Refresh Screen")
+        print(f"{Fore.RED}12.{Style.RESET_ALL} 🚪 Exit")
         print()
 
     def get_user_input(self, prompt, input_type=str, validation_func=None):
@@ -132,9 +158,14 @@ class FinanceTrackerCLI:
         print(f"Date: {date_input}")
         print(f"Description: {description or 'None'}")
 
+        duplicate = find_duplicate(self.user_id, amount, category, date_input, description)
+        if duplicate is not None:
+            print(f"{Fore.YELLOW}⚠️ An identical transaction is already recorded (ID: {duplicate}).{Style.RESET_ALL}")
+
         if self.confirm_action("Save this transaction?"):
             success = save_transaction_with_budget_alert(
-                self.user_id, amount, category, date_input, description
+                self.user_id, amount, category, date_input, description,
+                allow_duplicate=duplicate is not None
             )
             if success:
                 print(f"\n{Fore.GREEN}✓ Transaction saved successfully!{Style.RESET_ALL}")
@@ -185,12 +216,7 @@ class FinanceTrackerCLI:
 
     def get_all_users(self):
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT user_id, name FROM users ORDER BY user_id")
-            users = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-            return users
+            return get_all_users()
         except Exception as e:
             print(f"{Fore.RED}Error fetching users: {e}{Style.RESET_ALL}")
             return [{'user_id': 1, 'name': 'Default User'}]
@@ -203,17 +229,13 @@ class FinanceTrackerCLI:
             self.user_name = "Default User"
             return
 
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO users (name) VALUES (?)", (name.strip(),))
-            self.user_id = cursor.lastrowid
+        user_id = create_user(name)
+        if user_id:
+            self.user_id = user_id
             self.user_name = name.strip()
-            conn.commit()
-            conn.close()
             print(f"{Fore.GREEN}✓ User '{self.user_name}' created successfully!{Style.RESET_ALL}")
-        except Exception as e:
-            print(f"{Fore.RED}✗ Error creating user: {e}{Style.RESET_ALL}")
+        else:
+            print(f"{Fore.RED}✗ Error creating user.{Style.RESET_ALL}")
             self.user_id = 1
             self.user_name = "Default User"
 
@@ -295,7 +317,8 @@ class FinanceTrackerCLI:
 
         transactions = []
         if choice == 1:
-            transactions = get_all_transactions(self.user_id)
+            self.page_transactions()
+            return
         elif choice == 2:
             now = datetime.now()
             transactions = get_all_transactions(self.user_id, now.month, now.year)
@@ -314,6 +337,20 @@ class FinanceTrackerCLI:
         self.display_transactions(transactions)
         input(f"\n{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
 
+    def page_transactions(self, page_size=20):
+        cursor = None
+        page_number = 1
+        while True:
+            transactions, cursor = get_transactions_page(self.user_id, page_size=page_size, cursor=cursor)
+            self.display_transactions(transactions)
+            if cursor is None:
+                break
+            more = input(f"\n{Fore.CYAN}Page {page_number}. Press Enter for more, or q to stop: {Style.RESET_ALL}")
+            if more.strip().lower() in ['q', 'quit', 'exit']:
+                return
+            page_number += 1
+        input(f"\n{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+
     def display_transactions(self, transactions):
         if not transactions:
             print(f"\n{Fore.YELLOW}📭 No transactions found.{Style.RESET_ALL}")
@@ -324,11 +361,11 @@ class FinanceTrackerCLI:
         print(f"{'ID':<4} {'Date':<12} {'Category':<15} {'Amount':<12} {'Description':<25}")
         print("─" * 80)
 
-        total_income = 0
-        total_expenses = 0
+        total_income = Money(0)
+        total_expenses = Money(0)
 
         for trans in transactions:
-            amount = float(trans['amount'])
+            amount = Money(trans['amount'])
             if amount > 0:
                 total_income += amount
                 amount_color = Fore.GREEN
@@ -349,6 +386,85 @@ class FinanceTrackerCLI:
         print(f"Total Expenses: {Fore.RED}-${total_expenses:.2f}{Style.RESET_ALL}")
         print(f"Net: {Fore.CYAN}${total_income - total_expenses:.2f}{Style.RESET_ALL}")
 
+    def view_period_report(self):
+        print(f"\n{Fore.GREEN}📅 PERIOD REPORTS{Style.RESET_ALL}")
+        print("─" * 20)
+
+        granularities = ['daily', 'weekly', 'monthly', 'yearly']
+        for i, name in enumerate(granularities, 1):
+            print(f"{i}. {name.capitalize()}")
+
+        choice = self.get_user_input("Choose period (1-4): ", int, lambda x: 1 <= x <= 4)
+        if choice is None:
+            return
+
+        start = self.get_user_input("From (YYYY-MM-DD) or press Enter for the beginning: ")
+        if start is None:
+            return
+        end = self.get_user_input("To (YYYY-MM-DD, exclusive) or press Enter for the latest: ")
+        if end is None:
+            return
+        if (start and not self.validate_date(start)) or (end and not self.validate_date(end)):
+            print(f"{Fore.RED}Invalid date format. Use YYYY-MM-DD{Style.RESET_ALL}")
+            input(f"\n{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+            return
+
+        rows = period_report(self.user_id, granularities[choice - 1], start or None, end or None)
+        if not rows:
+            print(f"\n{Fore.YELLOW}📭 No transactions found.{Style.RESET_ALL}")
+        else:
+            print("─" * 66)
+            print(f"{'Period':<12} {'Income':<13} {'Expenses':<13} {'Net':<13} {'Balance':<13}")
+            print("─" * 66)
+            for row in rows:
+                net_color = Fore.GREEN if row['net'] >= 0 else Fore.RED
+                print(f"{row['period']:<12} "
+                      f"{Fore.GREEN}{'+$' + format(row['income'], '.2f'):<13}{Style.RESET_ALL} "
+                      f"{Fore.RED}{'-$' + format(row['expense'], '.2f'):<13}{Style.RESET_ALL} "
+                      f"{net_color}{'$' + format(row['net'], '.2f'):<13}{Style.RESET_ALL} "
+                      f"{'$' + format(row['balance'], '.2f'):<13}")
+
+        input(f"\n{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+
+    def search_transactions(self):
+        print(f"\n{Fore.GREEN}🔍 SEARCH TRANSACTIONS{Style.RESET_ALL}")
+        print("─" * 25)
+
+        query = self.get_user_input("Search for: ")
+        if not query:
+            return
+        start = self.get_user_input("From (YYYY-MM-DD) or press Enter for any date: ")
+        if start is None:
+            return
+        end = self.get_user_input("To (YYYY-MM-DD, exclusive) or press Enter for any date: ")
+        if end is None:
+            return
+        if (start and not self.validate_date(start)) or (end and not self.validate_date(end)):
+            print(f"{Fore.RED}Invalid date format. Use YYYY-MM-DD{Style.RESET_ALL}")
+            input(f"\n{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+            return
+
+        filters = {name: value for name, value in (('start_date', start), ('end_date', end)) if value}
+        results = search_transactions(self.user_id, query, filters,
+                                      markers=(Fore.YELLOW, Style.RESET_ALL))
+        if not results:
+            print(f"\n{Fore.YELLOW}📭 No matching transactions.{Style.RESET_ALL}")
+        else:
+            print("─" * 80)
+            print(f"{'ID':<4} {'Date':<12} {'Category':<15} {'Amount':<12} {'Match':<35}")
+            print("─" * 80)
+            for trans in results:
+                amount = trans['amount']
+                amount_color = Fore.GREEN if amount > 0 else Fore.RED
+                amount_str = f"+${amount:.2f}" if amount > 0 else f"-${abs(amount):.2f}"
+                print(f"{trans['transaction_id']:<4} "
+                      f"{trans['date']:<12} "
+                      f"{trans['category']:<15} "
+                      f"{amount_color}{amount_str:<12}{Style.RESET_ALL} "
+                      f"{trans['snippet']}")
+
+        input(f"\n{Fore.CYAN}Press Enter to continue...{Style.RESET_ALL}")
+
     def view_balance(self):
         balance = calculate_balance(self.user_id)
 
@@ -587,16 +703,26 @@ class FinanceTrackerCLI:
         except ValueError:
             return None
 
+    def report_instrumentation(self):
+        if not instrument.ENABLED:
+            return
+        print(f"\n{Fore.CYAN}📊 QUERY PROFILE{Style.RESET_ALL}")
+        print(instrument.format_summary())
+        if instrument.EXPORT_PATH:
+            instrument.export_json(instrument.EXPORT_PATH)
+            print(f"Profile written to {instrument.EXPORT_PATH}")
+
     def run(self):
         while True:
             self.clear_screen()
             self.print_header()
             self.print_menu()
 
-            choice = self.get_user_input("Select an option (1-10): ", int, lambda x: 1 <= x <= 10)
+            choice = self.get_user_input("Select an option (1-12): ", int, lambda x: 1 <= x <= 12)
 
-            if choice is None or choice == 10:
+            if choice is None or choice == 12:
                 print(f"\n{Fore.GREEN}Thank you for using Personal Finance Tracker! 👋{Style.RESET_ALL}")
+                self.report_instrumentation()
                 break
 
             try:
@@ -617,6 +743,10 @@ class FinanceTrackerCLI:
                 elif choice == 8:
                     self.delete_transaction()
                 elif choice == 9:
+                    self.view_period_report()
+                elif choice == 10:
+                    self.search_transactions()
+                elif choice == 11:
                     continue
 
             except KeyboardInterrupt:
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Non-interactive subcommands for scripts and cron jobs, e.g.
+
+    python lib/cli.py add-transaction 1 -45.20 Food 2025-06-01 "Groceries"
+    python lib/cli.py balance 1 --as-of 2025-03-31
+
+Each handler imports only the modules it needs, and colour is used only
+when stdout is a terminal. main() runs setup_database() before every
+command to apply any pending migrations; on a database that is already
+current that costs one PRAGMA read.
+"""
+
+import argparse
+import sys
+
+
+def paint(text, color):
+    # Colours text with colorama only when writing to a terminal
+    if not sys.stdout.isatty():
+        return text
+    try:
+        from colorama import Fore, Style
+    except ImportError:
+        return text
+    return f"{getattr(Fore, color)}{text}{Style.RESET_ALL}"
+
+
+def amount(value):
+    # argparse type for money amounts; a ValueError becomes "invalid amount value"
+    from money import Money
+    return Money(value)
+
+
+def cmd_add_user(args):
+    from users import create_user
+
+    user_id = create_user(args.name)
+    if user_id is None:
+        return 1
+    print(f"Created user {args.name.strip()} (ID: {user_id})")
+    return 0
+
+
+def cmd_add_transaction(args):
+    if args.no_alert:
+        from transaction import save_transaction as save
+    else:
+        from transaction import save_transaction_with_budget_alert as save
+
+    return 0 if save(args.user_id, args.amount, args.category, args.date, args.description,
+                     allow_duplicate=args.allow_duplicate) else 1
+
+
+def cmd_balance(args):
+    from transaction import calculate_balance
+
+    balance = calculate_balance(args.user_id, args.as_of, include_projected=args.projected)
+    print(paint(f"{balance:.2f}", 'GREEN' if balance >= 0 else 'RED'))
+    return 0
+
+
+def cmd_summary(args):
+    from budget import get_budget_summary
+
+    summary = get_budget_summary(args.user_id)
+    if args.json:
+        import json
+        print(json.dumps([
+            {**item,
+             'limit': str(item['limit']) if item['limit'] is not None else None,
+             'spent': str(item['spent'])}
+            for item in summary
+        ], indent=2))
+        return 0
+
+    print(f"{'Category':<15} {'Limit':>12} {'Spent':>12} {'Status':<10}")
+    for item in summary:
+        limit = f"{item['limit']:.2f}" if item['limit'] is not None else "-"
+        color = {'OVER': 'RED', 'WARNING': 'YELLOW'}.get(item['status'], 'GREEN')
+        print(f"{item['category']:<15} {limit:>12} {item['spent']:>12.2f} "
+              f"{paint(item['status'], color)}")
+    return 0
+
+
+def cmd_report(args):
+    from reports import period_report
+
+    try:
+        rows = period_report(args.user_id, args.granularity, args.start, args.end)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        import json
+        print(json.dumps([
+            {key: str(value) if key in ('income', 'expense', 'net', 'balance') else value
+             for key, value in row.items()}
+            for row in rows
+        ], indent=2))
+        return 0
+
+    print(f"{'Period':<12} {'Income':>12} {'Expense':>12} {'Net':>12} {'Balance':>12}")
+    for row in rows:
+        net = paint(f"{row['net']:>12.2f}", 'GREEN' if row['net'] >= 0 else 'RED')
+        print(f"{row['period']:<12} {row['income']:>12.2f} {row['expense']:>12.2f} "
+              f"{net} {row['balance']:>12.2f}")
+    return 0
+
+
+def cmd_search(args):
+    from search import search_transactions
+
+    filters = {name: value for name, value in
+               (('category', args.category), ('start_date', args.start), ('end_date', args.end))
+               if value}
+    marker = ('\033[1m', '\033[0m') if sys.stdout.isatty() else ('', '')
+    results = search_transactions(args.user_id, args.query, filters, args.limit, marker)
+    if args.json:
+        import json
+        print(json.dumps([{**row, 'amount': str(row['amount'])} for row in results], indent=2))
+        return 0
+
+    for row in results:
+        print(f"{row['transaction_id']:<6} {row['date']:<12} {row['category']:<15} "
+              f"{row['amount']:>12.2f}  {row['snippet']}")
+    return 0 if results else 1
+
+
+def cmd_export(args):
+    import exporter
+
+    progress = None
+    if sys.stderr.isatty():
+        def progress(written, total):
+            print(f"\rExported {written}/{total} rows", end='', file=sys.stderr, flush=True)
+
+    try:
+        if args.output:
+            result = exporter.export_to_file(
+                args.user_id, args.output, args.format, args.since, args.cursor_file,
+                args.chunk_size, args.gzip or None, progress)
+        else:
+            if args.gzip:
+                print("Error: --gzip needs --output", file=sys.stderr)
+                return 1
+            cursor = exporter.read_cursor_file(args.cursor_file) if args.cursor_file else None
+            on_chunk = ((lambda token: exporter.write_cursor_file(args.cursor_file, token))
+                        if args.cursor_file else None)
+            result = exporter.export_transactions(
+                args.user_id, sys.stdout, args.format, args.since, cursor, args.chunk_size,
+                write_header=cursor is None, progress=progress, on_chunk=on_chunk)
+    except (OSError, ValueError) as e:
+        print(f"Error exporting: {e}", file=sys.stderr)
+        return 1
+
+    if progress:
+        print(file=sys.stderr)
+    if args.output:
+        print(f"Exported {result['rows']} transactions to {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_import(args):
+    from importer import import_csv
+
+    try:
+        report = import_csv(args.user_id, args.path, args.chunk_size)
+    except (OSError, ValueError) as e:
+        print(f"Error importing {args.path}: {e}", file=sys.stderr)
+        return 1
+
+    for error in report['errors']:
+        print(f"Row {error['row']}: {error['error']}", file=sys.stderr)
+    print(f"Imported {report['inserted']} transactions ({report['duplicates']} duplicates skipped, "
+          f"{report['failed']} rejected)")
+    return 0 if not report['failed'] else 2
+
+
+def cmd_recurring(args):
+    import recurring
+
+    if args.action == 'add':
+        rule_id = recurring.add_recurring_rule(
+            args.user_id, args.amount, args.category, args.frequency, args.start_date,
+            args.interval, args.day_of_month, args.until, args.description)
+        if rule_id is None:
+            return 1
+        print(f"Created recurring rule {rule_id}")
+        return 0
+
+    if args.action == 'list':
+        print(f"{'ID':<5} {'Amount':>12} {'Category':<15} {'Every':<12} {'Next':<12} {'Until':<12}")
+        for rule in recurring.get_recurring_rules(args.user_id):
+            every = f"{rule['interval']} {rule['frequency']}" if rule['interval'] > 1 else rule['frequency']
+            print(f"{rule['rule_id']:<5} {rule['amount']:>12.2f} {rule['category']:<15} {every:<12} "
+                  f"{rule['next_date'] or 'ended':<12} {rule['end_date'] or '-':<12}")
+        return 0
+
+    if args.action == 'delete':
+        return 0 if recurring.delete_recurring_rule(args.rule_id, args.user_id) else 1
+
+    count = recurring.materialize_due(args.through, args.user_id)
+    print(f"Materialized {count} recurring transactions")
+    return 0
+
+
+def cmd_alerts(args):
+    from alerts import run_budget_alerts
+
+    changes = run_budget_alerts(args.workers)
+    if args.json:
+        import json
+        print(json.dumps([{**change, 'spent': str(change['spent']), 'limit': str(change['limit'])}
+                          for change in changes], indent=2))
+        return 0
+
+    for change in changes:
+        color = {'OVER': 'RED', 'WARNING': 'YELLOW'}.get(change['status'], 'GREEN')
+        print(f"User {change['user_id']} {change['category']}: {change['previous']} -> "
+              f"{paint(change['status'], color)} (spent {change['spent']:.2f} of {change['limit']:.2f})")
+    print(f"{len(changes)} budget status changes", file=sys.stderr)
+    return 0
+
+
+def cmd_dedup(args):
+    from dedup import scan_duplicates
+    from money import Money
+
+    def report(rows):
+        for transaction_id, user_id, cents, day, description in rows:
+            print(f"Transaction {transaction_id} (user {user_id}, {day}, {Money.from_cents(cents)}, "
+                  f"{description!r}) repeats an earlier transaction")
+
+    result = scan_duplicates(args.user_id, args.delete, args.batch_size, report)
+    action = "deleted" if args.delete else "found"
+    print(f"Scanned {result['scanned']} transactions, {action} {result['duplicates']} duplicates",
+          file=sys.stderr)
+    return 0
+
+
+def cmd_statements(args):
+    from statements import run_statements
+
+    progress = None
+    if sys.stderr.isatty():
+        def progress(done, total):
+            print(f"\rBuilt {done}/{total} statements", end='', file=sys.stderr, flush=True)
+
+    try:
+        result = run_statements(args.output, args.month, args.year, args.workers,
+                                args.user_id or None, args.batch_size, progress)
+    except (OSError, ValueError) as e:
+        print(f"Error building statements: {e}", file=sys.stderr)
+        return 1
+
+    if progress:
+        print(file=sys.stderr)
+    for user_id, error in result['failed']:
+        print(f"User {user_id}: {paint('FAILED', 'RED')} {error}")
+    for pid, stats in sorted(result['workers'].items()):
+        rate = stats['statements'] / stats['seconds'] if stats['seconds'] else 0
+        print(f"Worker {pid}: {stats['statements']} statements, {rate:.0f}/s", file=sys.stderr)
+    print(f"Wrote {result['written']} statements to {args.output} in {result['seconds']:.1f}s"
+          f" ({len(result['failed'])} failed)", file=sys.stderr)
+    return 1 if result['failed'] else 0
+
+
+def cmd_shards(args):
+    import database
+
+    if not database.SHARDS:
+        print("Sharding is off; set FINANCE_TRACKER_SHARDS to the number of shards", file=sys.stderr)
+        return 1
+    import sharding
+
+    if args.action == 'move':
+        try:
+            copied = sharding.move_user(args.user_id, args.shard)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Moved user {args.user_id} to shard {args.shard} ({copied} rows copied)")
+        return 0
+
+    print(f"{'Shard':<6} {'Users':>8} {'Transactions':>14}  File")
+    for shard in sharding.shard_stats():
+        print(f"{shard['shard']:<6} {shard['users']:>8} {shard['transactions']:>14}  {shard['path']}")
+    return 0
+
+
+def cmd_serve(args):
+    from server import serve
+
+    serve(args.host, args.port, args.workers, args.verbose)
+    return 0
+
+
+def cmd_rollup(args):
+    from rollup import rebuild_spending_rollup, verify_spending_rollup
+    from money import Money
+
+    if args.action == 'rebuild':
+        count = rebuild_spending_rollup(args.user_id)
+        print(f"Rebuilt spending rollup ({count} rows)")
+        return 0
+
+    drift = verify_spending_rollup(args.user_id)
+    for row in drift:
+        print(f"User {row['user_id']} {row['category']} {row['year_month']}: "
+              f"expected {Money.from_cents(row['expected_total'])} ({row['expected_count']} txns), "
+              f"found {Money.from_cents(row['actual_total'] or 0)} ({row['actual_count'] or 0} txns)")
+    if drift:
+        print(f"Spending rollup has drifted in {len(drift)} rows; run 'rollup rebuild'")
+        return 1
+    print("Spending rollup matches transactions")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='finance-tracker')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    user_parser = subparsers.add_parser('add-user', help='Create a user')
+    user_parser.add_argument('name')
+    user_parser.set_defaults(func=cmd_add_user)
+
+    add_parser = subparsers.add_parser(
+        'add-transaction', help='Record a transaction (negative amounts are expenses)')
+    add_parser.add_argument('user_id', type=int)
+    add_parser.add_argument('amount', type=amount)
+    add_parser.add_argument('category')
+    add_parser.add_argument('date', help='YYYY-MM-DD')
+    add_parser.add_argument('description', nargs='?', default='')
+    add_parser.add_argument('--no-alert', action='store_true', help='Skip the budget checks')
+    add_parser.add_argument('--allow-duplicate', action='store_true',
+                            help='Record it even if an identical transaction exists')
+    add_parser.set_defaults(func=cmd_add_transaction)
+
+    balance_parser = subparsers.add_parser('balance', help='Print a user\'s balance')
+    balance_parser.add_argument('user_id', type=int)
+    balance_parser.add_argument('--as-of', help='Only count transactions up to this date (YYYY-MM-DD)')
+    balance_parser.add_argument('--projected', action='store_true',
+                                help='Include recurring transactions due by then but not yet recorded')
+    balance_parser.set_defaults(func=cmd_balance)
+
+    summary_parser = subparsers.add_parser('summary', help='Print the budget summary')
+    summary_parser.add_argument('user_id', type=int)
+    summary_parser.add_argument('--json', action='store_true')
+    summary_parser.set_defaults(func=cmd_summary)
+
+    report_parser = subparsers.add_parser(
+        'report', help='Print income, expense, net and balance per period')
+    report_parser.add_argument('user_id', type=int)
+    report_parser.add_argument('--granularity', choices=['daily', 'weekly', 'monthly', 'yearly'],
+                               default='monthly')
+    report_parser.add_argument('--from', dest='start', help='First day to include (YYYY-MM-DD)')
+    report_parser.add_argument('--to', dest='end', help='Day after the last one to include (YYYY-MM-DD)')
+    report_parser.add_argument('--json', action='store_true')
+    report_parser.set_defaults(func=cmd_report)
+
+    search_parser = subparsers.add_parser(
+        'search', help='Full-text search over transaction descriptions and categories')
+    search_parser.add_argument('user_id', type=int)
+    search_parser.add_argument('query')
+    search_parser.add_argument('--category')
+    search_parser.add_argument('--from', dest='start', help='First day to include (YYYY-MM-DD)')
+    search_parser.add_argument('--to', dest='end', help='Day after the last one to include (YYYY-MM-DD)')
+    search_parser.add_argument('--limit', type=int, default=20)
+    search_parser.add_argument('--json', action='store_true')
+    search_parser.set_defaults(func=cmd_search)
+
+    export_parser = subparsers.add_parser('export', help='Write a user\'s transactions as CSV or JSONL')
+    export_parser.add_argument('user_id', type=int)
+    export_parser.add_argument('--output', help='File to write (default: stdout); .gz names are gzipped')
+    export_parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    export_parser.add_argument('--gzip', action='store_true', help='Compress the output file')
+    export_parser.add_argument('--since', help='Only rows dated on or after this day (YYYY-MM-DD)')
+    export_parser.add_argument(
+        '--cursor-file', help='Resume after the cursor stored here, append to --output and '
+                              'update the cursor as rows are written')
+    export_parser.add_argument('--chunk-size', type=int, default=5000)
+    export_parser.set_defaults(func=cmd_export)
+
+    import_parser = subparsers.add_parser(
+        'import', help='Import transactions from a CSV file (date,amount,category,description[,external_id])')
+    import_parser.add_argument('user_id', type=int)
+    import_parser.add_argument('path')
+    import_parser.add_argument('--chunk-size', type=int, default=1000)
+    import_parser.set_defaults(func=cmd_import)
+
+    rollup_parser = subparsers.add_parser(
+        'rollup', help='Verify or rebuild the per-month spending rollup')
+    rollup_parser.add_argument('action', choices=['verify', 'rebuild'])
+    rollup_parser.add_argument('--user-id', type=int)
+    rollup_parser.set_defaults(func=cmd_rollup)
+
+    recurring_parser = subparsers.add_parser('recurring', help='Manage recurring transactions')
+    recurring_actions = recurring_parser.add_subparsers(dest='action', required=True)
+    rule_parser = recurring_actions.add_parser('add', help='Create a recurring rule')
+    rule_parser.add_argument('user_id', type=int)
+    rule_parser.add_argument('amount', type=amount)
+    rule_parser.add_argument('category')
+    rule_parser.add_argument('frequency', choices=['daily', 'weekly', 'monthly', 'yearly'])
+    rule_parser.add_argument('start_date', help='First occurrence (YYYY-MM-DD)')
+    rule_parser.add_argument('--interval', type=int, default=1, help='Repeat every N periods')
+    rule_parser.add_argument('--day-of-month', type=int, help='Monthly/yearly rules only')
+    rule_parser.add_argument('--until', help='Last day an occurrence may fall on (YYYY-MM-DD)')
+    rule_parser.add_argument('--description', default='')
+    list_parser = recurring_actions.add_parser('list', help='List a user\'s recurring rules')
+    list_parser.add_argument('user_id', type=int)
+    delete_parser = recurring_actions.add_parser('delete', help='Stop a recurring rule')
+    delete_parser.add_argument('user_id', type=int)
+    delete_parser.add_argument('rule_id', type=int)
+    run_parser = recurring_actions.add_parser(
+        'run', help='Record every occurrence that is due (safe to repeat)')
+    run_parser.add_argument('--through', help='Last day to materialize (default: today)')
+    run_parser.add_argument('--user-id', type=int)
+    recurring_parser.set_defaults(func=cmd_recurring)
+
+    alerts_parser = subparsers.add_parser(
+        'alerts', help='Report budget status changes for every user since the last run')
+    alerts_parser.add_argument('--workers', type=int, default=1,
+                               help='Evaluate this many user-id ranges in parallel')
+    alerts_parser.add_argument('--json', action='store_true')
+    alerts_parser.set_defaults(func=cmd_alerts)
+
+    dedup_parser = subparsers.add_parser(
+        'dedup', help='Find (or delete) existing transactions that repeat an earlier one')
+    dedup_parser.add_argument('--user-id', type=int)
+    dedup_parser.add_argument('--delete', action='store_true', help='Delete the later copies')
+    dedup_parser.add_argument('--batch-size', type=int, default=5000)
+    dedup_parser.set_defaults(func=cmd_dedup)
+
+    statements_parser = subparsers.add_parser(
+        'statements', help='Write a month-end statement file for every user, in parallel')
+    statements_parser.add_argument('--month', type=int, help='Default: the last complete month')
+    statements_parser.add_argument('--year', type=int)
+    statements_parser.add_argument('--output', default='statements', help='Directory to write to')
+    statements_parser.add_argument('--workers', type=int, help='Processes to use (default: one per CPU)')
+    statements_parser.add_argument('--user-id', type=int, action='append',
+                                   help='Only this user (repeatable)')
+    statements_parser.add_argument('--batch-size', type=int, default=50,
+                                   help='Users handed to a worker at a time')
+    statements_parser.set_defaults(func=cmd_statements)
+
+    shards_parser = subparsers.add_parser(
+        'shards', help='Inspect shards or move a user to another shard (sharded mode only)')
+    shard_actions = shards_parser.add_subparsers(dest='action', required=True)
+    shard_actions.add_parser('status', help='Show users and transactions per shard')
+    move_parser = shard_actions.add_parser(
+        'move', help='Move a user to another shard while the tracker keeps running')
+    move_parser.add_argument('user_id', type=int)
+    move_parser.add_argument('shard', type=int)
+    shards_parser.set_defaults(func=cmd_shards)
+
+    serve_parser = subparsers.add_parser('serve', help='Serve the tracker as JSON over HTTP')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8080)
+    serve_parser.add_argument('--workers', type=int, default=32)
+    serve_parser.add_argument('--verbose', action='store_true', help='Log every request')
+    serve_parser.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from database import setup_database
+    import instrument
+
+    try:
+        setup_database()
+    except RuntimeError as e:
+        # The database file does not match the sharding settings
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    status = args.func(args)
+    if instrument.ENABLED:
+        print(instrument.format_summary(), file=sys.stderr)
+        if instrument.EXPORT_PATH:
+            instrument.export_json(instrument.EXPORT_PATH)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
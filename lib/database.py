@@ -1,103 +1,898 @@
 import sqlite3
 import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
 
-def setup_database():
-    os.makedirs('database', exist_ok=True)
-    conn = sqlite3.connect('database/finance_tracker.db')
-    cursor = conn.cursor()
+import instrument
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS transactions (
-            transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            amount DECIMAL(10, 2) NOT NULL,
-            category VARCHAR(50) NOT NULL,
-            date DATE NOT NULL,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            
-            FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-            CHECK (amount != 0),
-            CHECK (user_id > 0),
-            CHECK (category != '')
-        )
-    """)
+DB_PATH = 'database/finance_tracker.db'
+POOL_SIZE = 8
+POOL_TIMEOUT = 30
+
+# Concurrency mode (FINANCE_TRACKER_CONCURRENT=1 or enable_concurrency()): WAL
+# journal so readers never block the writer, and writes funnelled through one
+# writer thread per process that group-commits queued jobs.
+CONCURRENT = bool(os.environ.get('FINANCE_TRACKER_CONCURRENT'))
+BUSY_TIMEOUT_MS = 5000
+WRITE_BATCH_SIZE = 64
+
+# Sharded mode (FINANCE_TRACKER_SHARDS=N or enable_sharding(N)): users are
+# spread across N database files and DB_PATH holds only the shard directory.
+# See sharding.py.
+SHARDS = int(os.environ.get('FINANCE_TRACKER_SHARDS') or 0)
+MOVED_USER_ERROR = 'user moved to another shard'
+
+# Read-only mode (enable_read_only()): pooled connections are opened with
+# mode=ro, for batch readers such as the statement workers in statements.py
+READ_ONLY = False
+
+# Aggregates expenses per user, category and month; used to (re)build spending_rollup
+SPENDING_ROLLUP_SELECT = """
+    SELECT user_id, category, substr(date, 1, 7) AS year_month,
+           SUM(-amount) AS total_spent, COUNT(*) AS txn_count
+    FROM transactions
+    WHERE amount < 0
+    GROUP BY user_id, category, year_month
+"""
+
+
+TRANSACTIONS_TABLE = """
+    CREATE TABLE IF NOT EXISTS transactions (
+        transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        amount INTEGER NOT NULL, -- cents
+        category VARCHAR(50) NOT NULL,
+        date DATE NOT NULL,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+        CHECK (amount != 0),
+        CHECK (user_id > 0),
+        CHECK (category != '')
+    )
+"""
+
+BUDGETS_TABLE = """
+    CREATE TABLE IF NOT EXISTS budgets (
+        budget_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        category VARCHAR(50) NOT NULL,
+        limit_amount INTEGER NOT NULL, -- cents
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+        FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+        CHECK (limit_amount > 0),
+        CHECK (user_id > 0),
+        CHECK (category != ''),
+        UNIQUE(user_id, category)
+    )
+"""
+
+DEFAULT_BUDGETS = [
+    (1, 'Food', 30000),
+    (1, 'Transport', 15000),
+    (1, 'Entertainment', 10000),
+    (1, 'Healthcare', 20000),
+    (1, 'Shopping', 25000),
+    (1, 'Utilities', 15000)
+]
+
+
+# Schema migrations. Each one takes a cursor and runs inside the transaction that
+# also bumps PRAGMA user_version, so a failed migration leaves the version alone.
+# Migrations are never edited once released; append a new one instead. They are
+# written to be safe on databases created before versioning existed (user_version
+# 0 but some or all of the schema already present).
 
+def migration_001_base_schema(cursor):
+    cursor.execute(TRANSACTIONS_TABLE)
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS users (
             user_id INTEGER PRIMARY KEY AUTOINCREMENT,
             name VARCHAR(100) NOT NULL,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            
+
             CHECK (name != ''),
             CHECK (user_id > 0)
         )
     """)
+    cursor.execute(BUDGETS_TABLE)
+
+
+def migration_002_amounts_to_cents(cursor):
+    migrate_amounts_to_cents(cursor)
+
+
+def migration_003_default_data(cursor):
+    # Runs after the cents conversion so seeded limits are never scaled twice
+    cursor.execute("INSERT OR IGNORE INTO users (user_id, name) VALUES (1, 'Default User')")
+    cursor.executemany("""
+        INSERT OR IGNORE INTO budgets (user_id, category, limit_amount)
+        VALUES (?, ?, ?)
+    """, DEFAULT_BUDGETS)
+
+
+def migration_004_indexes(cursor):
+    # idx_user_date_created also orders keyset pages by (date, created_at, id), and
+    # idx_user_category_date also serves date-range spending queries
+    cursor.execute("DROP INDEX IF EXISTS idx_user_date")
+    cursor.execute("DROP INDEX IF EXISTS idx_user_category")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_date_created ON transactions(user_id, date, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_category_date ON transactions(user_id, category, date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_budget_user ON budgets(user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_budget_category ON budgets(user_id, category)")
+
+
+def migration_005_spending_rollup(cursor):
+    # Per-user/category/month expense totals kept current by the triggers below
+    rollup_exists = cursor.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'spending_rollup'
+    """).fetchone()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS spending_rollup (
+            user_id INTEGER NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            year_month CHAR(7) NOT NULL,
+            total_spent INTEGER NOT NULL DEFAULT 0,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+
+            PRIMARY KEY (user_id, category, year_month)
+        ) WITHOUT ROWID
+    """)
+    if not rollup_exists:
+        cursor.execute("INSERT INTO spending_rollup " + SPENDING_ROLLUP_SELECT)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_insert
+        AFTER INSERT ON transactions WHEN NEW.amount < 0
+        BEGIN
+            INSERT INTO spending_rollup (user_id, category, year_month, total_spent, txn_count)
+            VALUES (NEW.user_id, NEW.category, substr(NEW.date, 1, 7), -NEW.amount, 1)
+            ON CONFLICT (user_id, category, year_month) DO UPDATE SET
+                total_spent = total_spent + excluded.total_spent,
+                txn_count = txn_count + 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_delete
+        AFTER DELETE ON transactions WHEN OLD.amount < 0
+        BEGIN
+            UPDATE spending_rollup
+            SET total_spent = total_spent + OLD.amount, txn_count = txn_count - 1
+            WHERE user_id = OLD.user_id AND category = OLD.category
+              AND year_month = substr(OLD.date, 1, 7);
+            DELETE FROM spending_rollup
+            WHERE user_id = OLD.user_id AND category = OLD.category
+              AND year_month = substr(OLD.date, 1, 7) AND txn_count <= 0;
+        END
+    """)
+    # An UPDATE is treated as removing the old row and adding the new one
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_update_old
+        AFTER UPDATE OF user_id, amount, category, date ON transactions WHEN OLD.amount < 0
+        BEGIN
+            UPDATE spending_rollup
+            SET total_spent = total_spent + OLD.amount, txn_count = txn_count - 1
+            WHERE user_id = OLD.user_id AND category = OLD.category
+              AND year_month = substr(OLD.date, 1, 7);
+            DELETE FROM spending_rollup
+            WHERE user_id = OLD.user_id AND category = OLD.category
+              AND year_month = substr(OLD.date, 1, 7) AND txn_count <= 0;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_update_new
+        AFTER UPDATE OF user_id, amount, category, date ON transactions WHEN NEW.amount < 0
+        BEGIN
+            INSERT INTO spending_rollup (user_id, category, year_month, total_spent, txn_count)
+            VALUES (NEW.user_id, NEW.category, substr(NEW.date, 1, 7), -NEW.amount, 1)
+            ON CONFLICT (user_id, category, year_month) DO UPDATE SET
+                total_spent = total_spent + excluded.total_spent,
+                txn_count = txn_count + 1;
+        END
+    """)
+
+
+def migration_006_balance_checkpoints(cursor):
+    # Month-end running balances; any change dated in or before a month discards
+    # that month's checkpoint and later ones, and ledger.py rebuilds them lazily
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS balance_checkpoints (
+            user_id INTEGER NOT NULL,
+            period CHAR(7) NOT NULL,
+            closing_balance INTEGER NOT NULL,
+
+            PRIMARY KEY (user_id, period)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkpoint_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            DELETE FROM balance_checkpoints
+            WHERE user_id = NEW.user_id AND period >= substr(NEW.date, 1, 7);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkpoint_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            DELETE FROM balance_checkpoints
+            WHERE user_id = OLD.user_id AND period >= substr(OLD.date, 1, 7);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkpoint_update
+        AFTER UPDATE OF user_id, amount, date ON transactions
+        BEGIN
+            DELETE FROM balance_checkpoints
+            WHERE user_id = OLD.user_id AND period >= substr(OLD.date, 1, 7);
+            DELETE FROM balance_checkpoints
+            WHERE user_id = NEW.user_id AND period >= substr(NEW.date, 1, 7);
+        END
+    """)
+
+
+def migration_007_user_revisions(cursor):
+    # Per-user change counter, bumped by every write to a user's transactions or
+    # budgets. Readers use it to tell whether cached results are still current.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_revisions (
+            user_id INTEGER PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    bump = """
+        INSERT INTO user_revisions (user_id, revision) VALUES ({row}.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+    """
+    for table in ('transactions', 'budgets'):
+        for event, rows in (('INSERT', ['NEW']), ('DELETE', ['OLD']), ('UPDATE', ['OLD', 'NEW'])):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_revision_{table}_{event.lower()}
+                AFTER {event} ON {table}
+                BEGIN
+                    {''.join(bump.format(row=row) for row in rows)}
+                END
+            """)
+
 
+def migration_008_export_index(cursor):
+    # Lets incremental exports seek to "this user's rows after transaction_id N"
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_transaction ON transactions(user_id, transaction_id)")
+
+
+def migration_009_search_index(cursor):
+    # Full-text index over descriptions and categories for search.py. It is an
+    # external-content table, so it stores only the index and reads the text back
+    # from transactions; the triggers keep it in step with every write. user_id is
+    # indexed too so a search only ranks the searching user's rows, and the rank
+    # function gives it no weight.
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                description, category, user_id,
+                content = 'transactions', content_rowid = 'transaction_id',
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5; search.py falls back to LIKE scans
+        return
+    cursor.execute("INSERT INTO transactions_fts (transactions_fts, rank) VALUES ('rank', 'bm25(1.0, 0.5, 0.0)')")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_search_insert
+        AFTER INSERT ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (rowid, description, category, user_id)
+            VALUES (NEW.transaction_id, NEW.description, NEW.category, NEW.user_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_search_delete
+        AFTER DELETE ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category, user_id)
+            VALUES ('delete', OLD.transaction_id, OLD.description, OLD.category, OLD.user_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_search_update
+        AFTER UPDATE OF description, category, user_id ON transactions
+        BEGIN
+            INSERT INTO transactions_fts (transactions_fts, rowid, description, category, user_id)
+            VALUES ('delete', OLD.transaction_id, OLD.description, OLD.category, OLD.user_id);
+            INSERT INTO transactions_fts (rowid, description, category, user_id)
+            VALUES (NEW.transaction_id, NEW.description, NEW.category, NEW.user_id);
+        END
+    """)
+    cursor.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+def migration_010_recurring_rules(cursor):
+    # Repeating transactions. next_date is the first occurrence not yet written to
+    # transactions (NULL once the rule has ended); recurring.py advances it in the
+    # same transaction that inserts the occurrences, and the unique (rule_id, date)
+    # index turns a repeated run into a no-op.
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS budgets (
-            budget_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        CREATE TABLE IF NOT EXISTS recurring_rules (
+            rule_id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL, -- cents
             category VARCHAR(50) NOT NULL,
-            limit_amount DECIMAL(10, 2) NOT NULL,
+            description TEXT,
+            frequency VARCHAR(10) NOT NULL,
+            interval INTEGER NOT NULL DEFAULT 1,
+            day_of_month INTEGER, -- monthly/yearly only; clamped to short months
+            start_date DATE NOT NULL,
+            end_date DATE, -- last day an occurrence may fall on
+            next_date DATE,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            
+
             FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-            CHECK (limit_amount > 0),
-            CHECK (user_id > 0),
+            CHECK (amount != 0),
             CHECK (category != ''),
-            UNIQUE(user_id, category)
+            CHECK (frequency IN ('daily', 'weekly', 'monthly', 'yearly')),
+            CHECK (interval > 0),
+            CHECK (day_of_month BETWEEN 1 AND 31)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recurring_user ON recurring_rules(user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_recurring_next ON recurring_rules(next_date)")
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(transactions)")]
+    if 'rule_id' not in columns:
+        cursor.execute("""
+            ALTER TABLE transactions
+            ADD COLUMN rule_id INTEGER REFERENCES recurring_rules(rule_id) ON DELETE SET NULL
+        """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transaction_rule_date
+        ON transactions(rule_id, date) WHERE rule_id IS NOT NULL
+    """)
+
+
+def migration_011_alert_state(cursor):
+    # Last budget status reported per (user, category); a missing row means OK
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alert_state (
+            user_id INTEGER NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            status VARCHAR(10) NOT NULL,
+            spent INTEGER NOT NULL, -- cents
+            limit_amount INTEGER NOT NULL, -- cents
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+
+            PRIMARY KEY (user_id, category)
+        ) WITHOUT ROWID
+    """)
+
+
+def migration_012_moved_users(cursor):
+    # Users moved to another shard by sharding.move_user(). Their rows are gone
+    # from this file, and a write still routed here is refused so the caller
+    # re-routes it instead of leaving it on the old shard.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS moved_users (
+            user_id INTEGER PRIMARY KEY,
+            shard INTEGER NOT NULL,
+            moved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     """)
+    for table in ('users', 'transactions', 'budgets', 'recurring_rules', 'alert_state'):
+        for event, row in (('INSERT', 'NEW'), ('UPDATE', 'OLD'), ('DELETE', 'OLD')):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_moved_{table}_{event.lower()}
+                BEFORE {event} ON {table}
+                WHEN EXISTS (SELECT 1 FROM moved_users WHERE user_id = {row}.user_id)
+                BEGIN
+                    SELECT RAISE(ABORT, '{MOVED_USER_ERROR}');
+                END
+            """)
 
 
+def migration_013_transaction_fingerprints(cursor):
+    # Duplicate detection (dedup.py): a hash of user, date, amount, description and
+    # external id, unique per user. Rows written before this migration have none
+    # until dedup.scan_duplicates() fills them in.
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(transactions)")]
+    if 'fingerprint' not in columns:
+        cursor.execute("ALTER TABLE transactions ADD COLUMN fingerprint TEXT")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_transaction_fingerprint
+        ON transactions(user_id, fingerprint) WHERE fingerprint IS NOT NULL
+    """)
 
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_date ON transactions(user_id, date)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_category ON transactions(user_id, category)")
 
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_date ON transactions(user_id, date)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_category ON transactions(user_id, category)")
-    
-    # Create indexes for budgets table
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_budget_user ON budgets(user_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_budget_category ON budgets(user_id, category)")
+def migration_014_revision_data_columns(cursor):
+    # Readers only care about the data itself, so setting a fingerprint (the
+    # dedup.scan_duplicates backfill) no longer bumps the user's revision and
+    # throws away their cached results.
+    cursor.execute("DROP TRIGGER IF EXISTS trg_revision_transactions_update")
+    cursor.execute("""
+        CREATE TRIGGER trg_revision_transactions_update
+        AFTER UPDATE OF user_id, amount, category, date, description, created_at, rule_id
+        ON transactions
+        BEGIN
+            INSERT INTO user_revisions (user_id, revision) VALUES (OLD.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+            INSERT INTO user_revisions (user_id, revision) VALUES (NEW.user_id, 1)
+            ON CONFLICT (user_id) DO UPDATE SET revision = revision + 1;
+        END
+    """)
+
+
+# user_version N means the first N entries have been applied
+MIGRATIONS = [
+    migration_001_base_schema,
+    migration_002_amounts_to_cents,
+    migration_003_default_data,
+    migration_004_indexes,
+    migration_005_spending_rollup,
+    migration_006_balance_checkpoints,
+    migration_007_user_revisions,
+    migration_008_export_index,
+    migration_009_search_index,
+    migration_010_recurring_rules,
+    migration_011_alert_state,
+    migration_012_moved_users,
+    migration_013_transaction_fingerprints,
+    migration_014_revision_data_columns,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path=None, migrations=MIGRATIONS):
+    """Bring the database at path up to date with migrations; returns the ones applied.
+
+    On a current database this is a single PRAGMA read. Raises RuntimeError if
+    path is the shard directory of a sharded database (see sharding.py).
+    """
+    path = path or DB_PATH
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        if schema_version(conn) >= len(migrations):
+            return []
+        cursor = conn.cursor()
+        # Concurrent starters serialize on the write lock and re-read the version
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if cursor.execute("""
+                SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'shard_directory'
+            """).fetchone():
+                raise RuntimeError(f"{path} is the shard directory of a sharded database; "
+                                   f"set FINANCE_TRACKER_SHARDS to its shard count")
+            pending = migrations[schema_version(conn):]
+            for migration in pending:
+                migration(cursor)
+            if pending:
+                cursor.execute(f"PRAGMA user_version = {len(migrations)}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return [migration.__name__ for migration in pending]
+    finally:
+        conn.close()
+
 
-    # Insert default user (user_id=1) if not exists
+def setup_database():
+    # Kept as the start-up entry point; a no-op beyond one PRAGMA read once current
+    if SHARDS:
+        from sharding import setup_shards
+        return setup_shards()
+    return migrate()
+
+
+def migrate_amounts_to_cents(cursor):
+    # Databases created before amounts were stored as integer cents declare
+    # DECIMAL(10, 2) columns holding floats. Rebuild those tables with INTEGER
+    # cents; later migrations recreate the indexes and derived tables.
+    columns = {row[1]: row[2] for row in cursor.execute("PRAGMA table_info(transactions)")}
+    if not columns.get('amount', '').upper().startswith('DECIMAL'):
+        return False
+
+    cursor.execute("ALTER TABLE transactions RENAME TO transactions_legacy")
+    cursor.execute("ALTER TABLE budgets RENAME TO budgets_legacy")
+    cursor.execute(TRANSACTIONS_TABLE)
+    cursor.execute(BUDGETS_TABLE)
+    cursor.execute("""
+        INSERT INTO transactions (transaction_id, user_id, amount, category, date, description, created_at)
+        SELECT transaction_id, user_id, CAST(ROUND(amount * 100) AS INTEGER), category, date, description, created_at
+        FROM transactions_legacy
+    """)
     cursor.execute("""
-        INSERT OR IGNORE INTO users (user_id, name) 
-        VALUES (1, 'Default User')
+        INSERT INTO budgets (budget_id, user_id, category, limit_amount, created_at)
+        SELECT budget_id, user_id, category, CAST(ROUND(limit_amount * 100) AS INTEGER), created_at
+        FROM budgets_legacy
     """)
+    cursor.execute("DROP TABLE transactions_legacy")
+    cursor.execute("DROP TABLE budgets_legacy")
+    # Derived tables are rebuilt from the converted rows
+    cursor.execute("DROP TABLE IF EXISTS spending_rollup")
+    cursor.execute("DROP TABLE IF EXISTS balance_checkpoints")
+    return True
 
-    default_budgets = [
-        (1, 'Food', 300.00),
-        (1, 'Transport', 150.00),
-        (1, 'Entertainment', 100.00),
-        (1, 'Healthcare', 200.00),
-        (1, 'Shopping', 250.00),
-        (1, 'Utilities', 150.00)
-    ]
 
-    
-    
-    for user_id, category, limit_amount in default_budgets:
-        cursor.execute("""
-            INSERT OR IGNORE INTO budgets (user_id, category, limit_amount) 
-            VALUES (?, ?, ?)
-        """, (user_id, category, limit_amount))
-    
+def database_path(user_id=None):
+    # The file holding user_id's rows: DB_PATH, or the user's shard in sharded mode
+    if not SHARDS:
+        return DB_PATH
+    if user_id is None:
+        raise ValueError("a user_id is required to pick a shard; use data_paths() to visit every shard")
+    from sharding import shard_path, shard_for
+    return shard_path(shard_for(user_id))
+
+
+def data_paths():
+    # Every file holding user data, for operations that span all users
+    if not SHARDS:
+        return [DB_PATH]
+    from sharding import shard_path
+    return [shard_path(index) for index in range(SHARDS)]
 
-    conn.commit()
-    conn.close()
 
-def get_db_connection():
-    conn = sqlite3.connect('database/finance_tracker.db')
+def get_db_connection(user_id=None):
+    # Opens a standalone connection the caller must close. Prefer db_connection().
+    conn = sqlite3.connect(database_path(user_id))
     conn.row_factory = sqlite3.Row
     return conn
 
 
+class ConnectionPool:
+    """Bounded pool of long-lived connections to one database file.
+
+    A thread that checks out a connection keeps it until its outermost
+    ``with`` block exits, so nested helpers running on that thread reuse the
+    same connection instead of opening their own.
+    """
+
+    def __init__(self, path, max_size=POOL_SIZE, timeout=POOL_TIMEOUT, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._active = {}
+        self.opened = 0
+        self.reused = 0
+
+    def _open(self):
+        if self.read_only:
+            # Imported here: urllib.request costs more to load than the rest of this module
+            from urllib.request import pathname2url
+            uri = f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        else:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            configure_concurrency(conn)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _acquire(self):
+        with self._cond:
+            if not self._cond.wait_for(
+                    lambda: self._idle or self._size < self.max_size, self.timeout):
+                raise sqlite3.OperationalError(
+                    f"Timed out waiting for a connection to {self.path}")
+            if self._idle:
+                self.reused += 1
+                return self._idle.pop()
+            self._size += 1
+        try:
+            conn = self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.opened += 1
+        return conn
+
+    def _release(self, conn):
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        local = self._local
+        if getattr(local, 'conn', None) is not None:
+            local.depth += 1
+            try:
+                yield local.conn
+            finally:
+                local.depth -= 1
+            return
+
+        conn = self._acquire()
+        if instrument.ENABLED or conn.row_factory is not sqlite3.Row:
+            instrument.configure_connection(conn)
+        local.conn = conn
+        local.depth = 1
+        thread_id = threading.get_ident()
+        self._active[thread_id] = conn
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            self._active.pop(thread_id, None)
+            local.conn = None
+            local.depth = 0
+            self._release(conn)
+
+    def interrupt(self, thread_id):
+        # Aborts the statement running on the connection checked out by that thread,
+        # which then fails with OperationalError("interrupted"). Returns False if the
+        # thread holds no connection.
+        conn = self._active.get(thread_id)
+        if conn is None:
+            return False
+        conn.interrupt()
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                'opened': self.opened,
+                'reused': self.reused,
+                'in_use': self._size - len(self._idle),
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn in idle:
+            conn.close()
+
+
+def configure_concurrency(conn):
+    # Wait for locks held by other connections and processes instead of failing
+    # straight away with "database is locked".
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    if CONCURRENT:
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Durable at each WAL checkpoint rather than each commit; safe in WAL mode
+        conn.execute("PRAGMA synchronous = NORMAL")
+
+
+class WriterQueue:
+    """Single thread that applies queued write jobs to one database file.
+
+    Each job is a callable taking a connection. Jobs that arrive while a batch
+    is being written are committed together in one transaction, each inside
+    its own SAVEPOINT, so a failing job is rolled back without affecting the
+    others in its batch. Callers block until their batch has committed.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, batch_size=WRITE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.batches = 0
+        self.jobs = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"writer:{path}", daemon=True)
+        self._thread.start()
+
+    def submit(self, job):
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("write jobs cannot submit further write jobs")
+        future = Future()
+        self._queue.put((job, future))
+        return future.result()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        while len(batch) < self.batch_size and batch[-1] is not self._STOP:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        configure_concurrency(conn)
+        try:
+            while True:
+                batch = self._next_batch()
+                stop = batch[-1] is self._STOP
+                if stop:
+                    batch.pop()
+                if batch:
+                    self._write(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    results.append((future, job(conn), None))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.jobs += len(batch)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def close(self):
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+
+_pools = {}
+_writers = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    path = path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path, read_only=READ_ONLY)
+        return pool
+
+
+def db_connection(user_id=None):
+    # Context manager yielding a pooled connection; commits on success, rolls back on error.
+    # In sharded mode user_id picks the shard.
+    return get_pool(database_path(user_id)).connection()
+
+
+def get_writer(path=None):
+    path = path or DB_PATH
+    with _pools_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = WriterQueue(path)
+        return writer
+
+
+def _write(path, job):
+    if CONCURRENT:
+        return get_writer(path).submit(job)
+    with get_pool(path).connection() as conn:
+        result = job(conn)
+        conn.commit()
+    return result
+
+
+def run_write(job, user_id=None, path=None):
+    """Run job(conn) as one committed write and return its result.
+
+    In concurrency mode the job goes through the writer thread; otherwise it
+    runs on the calling thread's pooled connection. The write goes to path,
+    or to user_id's shard in sharded mode; a write that reaches a shard the
+    user has just been moved off is retried once on the new shard.
+    """
+    try:
+        return _write(path or database_path(user_id), job)
+    except sqlite3.IntegrityError as e:
+        if path or not SHARDS or MOVED_USER_ERROR not in str(e):
+            raise
+        return _write(database_path(user_id), job)
+
+
+def enable_concurrency():
+    # Switches this process to WAL + writer-queue mode. WAL is persistent in the
+    # database file, so other processes pick it up on their next connection.
+    global CONCURRENT
+    close_pools()
+    CONCURRENT = True
+
+
+def enable_sharding(count):
+    # Switches this process to `count` shard files beside DB_PATH. Every process
+    # sharing the database must use the same count; setup_database() checks it.
+    global SHARDS
+    close_pools()
+    SHARDS = count
+
+
+def enable_read_only():
+    # Reopens this process's pooled connections read-only. Writes then fail with
+    # "attempt to write a readonly database", and ledger checkpoints are not stored.
+    global READ_ONLY
+    close_pools()
+    READ_ONLY = True
+
+
+def interrupt(thread_id):
+    # Aborts the statement running on whichever pooled connection that thread has
+    # checked out; see ConnectionPool.interrupt()
+    with _pools_lock:
+        pools = list(_pools.values())
+    return any(pool.interrupt(thread_id) for pool in pools)
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        writers = list(_writers.values())
+        _pools.clear()
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+    for pool in pools:
+        pool.close()
+    if 'sharding' in sys.modules:
+        sys.modules['sharding'].close_router()
+
+
+def set_database_path(path):
+    global DB_PATH
+    close_pools()
+    DB_PATH = path
+
+
+def user_revision(conn, user_id):
+    # 0 for a user whose data has never been written
+    row = conn.execute("SELECT revision FROM user_revisions WHERE user_id = ?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+
+def explain_query_plan(query, params=(), user_id=None):
+    # Returns the EXPLAIN QUERY PLAN detail lines for a query, e.g. to confirm an index is used.
+    with db_connection(user_id) as conn:
+        rows = conn.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+    return [row["detail"] for row in rows]
+
+
 def reset_database():
-    if os.path.exists('database/finance_tracker.db'):
-        os.remove('database/finance_tracker.db')
+    close_pools()
+    paths = [DB_PATH] + (data_paths() if SHARDS else [])
+    if any(os.path.exists(path) for path in paths):
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
         print("Existing database deleted")
     setup_database()
 
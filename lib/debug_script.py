@@ -3,9 +3,11 @@
 Debug script to check database operations
 """
 
-from database import get_db_connection, setup_database
-from transaction import save_transaction_with_budget_alert
+from database import db_connection, setup_database, pool_stats, explain_query_plan, DB_PATH
+from transaction import save_transaction_with_budget_alert, transactions_query
 from budget import set_budget_limit, update_budget_limit
+from helper import spending_query
+from money import Money
 from datetime import date
 
 def check_database_tables():
@@ -13,44 +15,43 @@ def check_database_tables():
     print("=== DATABASE TABLES CHECK ===")
     
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        # In sharded mode this shows the shard holding the default user
+        with db_connection(1) as conn:
+            cursor = conn.cursor()
         
-        # Check users table
-        print("\n1. USERS TABLE:")
-        cursor.execute("SELECT * FROM users")
-        users = cursor.fetchall()
-        if users:
-            for user in users:
-                print(f"   User ID: {user['user_id']}, Name: {user['name']}")
-        else:
-            print("   No users found!")
-        
-        # Check transactions table
-        print("\n2. TRANSACTIONS TABLE:")
-        cursor.execute("SELECT COUNT(*) as count FROM transactions")
-        tx_count = cursor.fetchone()['count']
-        print(f"   Total transactions: {tx_count}")
+            # Check users table
+            print("\n1. USERS TABLE:")
+            cursor.execute("SELECT * FROM users")
+            users = cursor.fetchall()
+            if users:
+                for user in users:
+                    print(f"   User ID: {user['user_id']}, Name: {user['name']}")
+            else:
+                print("   No users found!")
         
-        if tx_count > 0:
-            cursor.execute("SELECT * FROM transactions ORDER BY created_at DESC LIMIT 5")
-            transactions = cursor.fetchall()
-            print("   Recent transactions:")
-            for tx in transactions:
-                print(f"   - ID: {tx['transaction_id']}, Amount: {tx['amount']}, Category: {tx['category']}, Date: {tx['date']}")
+            # Check transactions table
+            print("\n2. TRANSACTIONS TABLE:")
+            cursor.execute("SELECT COUNT(*) as count FROM transactions")
+            tx_count = cursor.fetchone()['count']
+            print(f"   Total transactions: {tx_count}")
         
-        # Check budgets table
-        print("\n3. BUDGETS TABLE:")
-        cursor.execute("SELECT * FROM budgets")
-        budgets = cursor.fetchall()
-        if budgets:
-            print("   Budgets:")
-            for budget in budgets:
-                print(f"   - Category: {budget['category']}, Limit: {budget['limit_amount']}")
-        else:
-            print("   No budgets found!")
+            if tx_count > 0:
+                cursor.execute("SELECT * FROM transactions ORDER BY created_at DESC LIMIT 5")
+                transactions = cursor.fetchall()
+                print("   Recent transactions:")
+                for tx in transactions:
+                    print(f"   - ID: {tx['transaction_id']}, Amount: {Money.from_cents(tx['amount'])}, Category: {tx['category']}, Date: {tx['date']}")
         
-        conn.close()
+            # Check budgets table
+            print("\n3. BUDGETS TABLE:")
+            cursor.execute("SELECT * FROM budgets")
+            budgets = cursor.fetchall()
+            if budgets:
+                print("   Budgets:")
+                for budget in budgets:
+                    print(f"   - Category: {budget['category']}, Limit: {Money.from_cents(budget['limit_amount'])}")
+            else:
+                print("   No budgets found!")
         
     except Exception as e:
         print(f"Error checking database: {e}")
@@ -71,12 +72,11 @@ def test_transaction_save():
         print(f"Transaction save result: {result}")
         
         # Check if it was actually saved
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) as count FROM transactions WHERE description = 'Test transaction'")
-        count = cursor.fetchone()['count']
+        with db_connection(1) as conn:
+            count = conn.execute(
+                "SELECT COUNT(*) as count FROM transactions WHERE description = 'Test transaction'"
+            ).fetchone()['count']
         print(f"Test transactions in database: {count}")
-        conn.close()
         
     except Exception as e:
         print(f"Error testing transaction: {e}")
@@ -97,14 +97,11 @@ def test_budget_operations():
         print(f"Update budget result: {result2}")
         
         # Check if budgets were saved
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM budgets WHERE user_id = 1")
-        budgets = cursor.fetchall()
+        with db_connection(1) as conn:
+            budgets = conn.execute("SELECT * FROM budgets WHERE user_id = 1").fetchall()
         print("Current budgets in database:")
         for budget in budgets:
-            print(f"   - {budget['category']}: ${budget['limit_amount']}")
-        conn.close()
+            print(f"   - {budget['category']}: ${Money.from_cents(budget['limit_amount'])}")
         
     except Exception as e:
         print(f"Error testing budgets: {e}")
@@ -114,7 +111,7 @@ def check_database_file():
     print("\n=== DATABASE FILE CHECK ===")
     
     import os
-    db_path = "database/finance_tracker.db"
+    db_path = DB_PATH
     
     if os.path.exists(db_path):
         print(f"✅ Database file exists at: {os.path.abspath(db_path)}")
@@ -129,6 +126,29 @@ def check_database_file():
         else:
             print("❌ Failed to create database!")
 
+def check_connection_pool():
+    """Show how many connections were opened vs. reused from the pool"""
+    print("\n=== CONNECTION POOL ===")
+    stats = pool_stats()
+    print(f"   Opened: {stats['opened']}, Reused: {stats['reused']}, "
+          f"Idle: {stats['idle']}/{stats['max_size']}")
+
+def check_query_plans():
+    """Confirm monthly filters seek on an index instead of scanning every row"""
+    print("\n=== QUERY PLANS ===")
+    today = date.today()
+    queries = {
+        "Monthly transactions": transactions_query(1, today.month, today.year),
+        "Monthly category spending": spending_query(1, "Food", today.month, today.year),
+    }
+    for label, (query, params) in queries.items():
+        plan = explain_query_plan(query, params, user_id=1)
+        uses_index = not any(line.startswith("SCAN") for line in plan)
+        marker = "✅" if uses_index else "❌"
+        print(f"{marker} {label}:")
+        for line in plan:
+            print(f"   {line}")
+
 def main():
     """Run all debug checks"""
     print("🔍 FINANCE TRACKER DEBUG SCRIPT")
@@ -138,6 +158,8 @@ def main():
     check_database_tables()
     test_transaction_save()
     test_budget_operations()
+    check_query_plans()
+    check_connection_pool()
     
     print("\n" + "=" * 40)
     print("Debug complete! Check the output above for any issues.")
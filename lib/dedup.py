@@ -0,0 +1,195 @@
+"""
+Duplicate detection for imports and repeated entries.
+
+Transactions saved through save_transaction, save_transactions_bulk (CSV
+imports) and the HTTP service carry a fingerprint. It is a hash of the user,
+date, amount, normalized description and, when the source provides one,
+the bank's external id. A unique partial index on (user_id, fingerprint)
+means a second copy costs one index probe to reject. Re-running an import
+skips the rows it already wrote, and a double-submitted entry is refused
+unless the caller asks for it to be recorded again.
+
+Identical rows can be genuine (two coffees on the same day), so each one
+after the first gets an occurrence number in its fingerprint. Rows written
+before fingerprints existed are checked by scan_duplicates().
+"""
+
+import hashlib
+import json
+import re
+from collections import Counter
+
+from database import data_paths, database_path, run_write
+from instrument import count_rows, timed
+
+SCAN_BATCH_SIZE = 5000
+
+
+def normalize_description(text):
+    # Case, punctuation and spacing differences do not make a different transaction
+    return ' '.join(re.findall(r'\w+', (text or '').lower()))
+
+
+def transaction_fingerprint(user_id, day, cents, description, external_id=None, occurrence=0):
+    key = f"{user_id}|{day}|{cents}|{normalize_description(description)}|{external_id or ''}|{occurrence}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def row_fingerprint(row, external_id=None, occurrence=0):
+    # row as returned by validate_transaction: (user_id, cents, category, date, description)
+    user_id, cents, _, day, description = row
+    return transaction_fingerprint(user_id, day, cents, description, external_id, occurrence)
+
+
+class OccurrenceCounter:
+    """Numbers identical rows within one import, so repeats in the file are kept.
+
+    The first copy of a row gets the plain fingerprint and the nth repeat
+    occurrence n, counted over the whole import wherever the repeats fall, so
+    importing the same file again produces the same fingerprints. The counts
+    live in a temporary table on the import's connection (SQLite keeps it in
+    a temporary file), so memory is bounded by one chunk however long the
+    import. close() drops the table.
+    """
+
+    __slots__ = ('conn',)
+
+    def __init__(self, conn):
+        self.conn = conn
+        conn.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS import_occurrences (
+                fingerprint TEXT PRIMARY KEY,
+                seen INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+        # Left behind by an import on this pooled connection that failed before close()
+        conn.execute("DELETE FROM temp.import_occurrences")
+
+    def fingerprints(self, rows):
+        # rows: (row, external_id) pairs for one chunk; returns their fingerprints in order
+        bases = [None if external_id else row_fingerprint(row) for row, external_id in rows]
+        counts = Counter(base for base in bases if base)
+        seen = dict(self.conn.execute(
+            "SELECT fingerprint, seen FROM temp.import_occurrences "
+            "WHERE fingerprint IN (SELECT value FROM json_each(?))", (json.dumps(list(counts)),)))
+        self.conn.executemany("""
+            INSERT INTO temp.import_occurrences (fingerprint, seen) VALUES (?, ?)
+            ON CONFLICT (fingerprint) DO UPDATE SET seen = seen + excluded.seen
+        """, counts.items())
+
+        fingerprints = []
+        for (row, external_id), base in zip(rows, bases):
+            if base is None:
+                fingerprints.append(row_fingerprint(row, external_id))
+                continue
+            occurrence = seen.get(base, 0)
+            seen[base] = occurrence + 1
+            fingerprints.append(base if occurrence == 0 else row_fingerprint(row, occurrence=occurrence))
+        return fingerprints
+
+    def close(self):
+        self.conn.execute("DROP TABLE IF EXISTS temp.import_occurrences")
+
+
+def _occurrence(conn, transaction_id, owner, cents, day, description):
+    # How many copies of this transaction were recorded before it: earlier rows with the
+    # same user, date, amount and normalized description that are unfingerprinted or
+    # carry one of this transaction's numbered fingerprints (not an external id's).
+    normalized = normalize_description(description)
+    # The unary + keeps SQLite on the (user_id, date) index rather than walking every
+    # earlier row of the user through (user_id, transaction_id)
+    earlier = [fingerprint for text, fingerprint in conn.execute("""
+        SELECT description, fingerprint FROM transactions
+        WHERE user_id = ? AND date = ? AND amount = ? AND rule_id IS NULL AND +transaction_id < ?
+    """, (owner, day, cents, transaction_id)) if normalize_description(text) == normalized]
+    numbered = {transaction_fingerprint(owner, day, cents, description, occurrence=occurrence)
+                for occurrence in range(len(earlier))}
+    return sum(1 for fingerprint in earlier if fingerprint is None or fingerprint in numbered)
+
+
+def _scan_batch(conn, after_id, user_id, batch_size, delete):
+    # Fingerprints the next batch of unfingerprinted rows. Identical rows are numbered
+    # in transaction_id order, as OccurrenceCounter numbers an import; numbers already
+    # taken by earlier copies are stepped over, so nothing is carried between batches
+    # or runs. When a newer row holds the fingerprint, that row is the duplicate: it is
+    # deleted (and the fingerprint moved here) if delete is set, otherwise both rows are
+    # left for a later run. Returns (rows read, duplicate rows).
+    query = """
+        SELECT transaction_id, user_id, amount, date, description FROM transactions
+        WHERE transaction_id > ? AND fingerprint IS NULL AND rule_id IS NULL
+    """
+    params = [after_id]
+    if user_id is not None:
+        query += " AND user_id = ?"
+        params.append(user_id)
+    cursor = conn.execute(query + " ORDER BY transaction_id LIMIT ?", params + [batch_size])
+    cursor.row_factory = None
+    rows = cursor.fetchall()
+    count_rows(len(rows))
+
+    duplicates = []
+    for transaction_id, owner, cents, day, description in rows:
+        occurrence = 0
+        while True:
+            fingerprint = transaction_fingerprint(owner, day, cents, description, occurrence=occurrence)
+            # UPDATE OR IGNORE leaves the row untouched when the fingerprint is taken
+            if conn.execute("UPDATE OR IGNORE transactions SET fingerprint = ? WHERE transaction_id = ?",
+                            (fingerprint, transaction_id)).rowcount:
+                break
+            holder = tuple(conn.execute("""
+                SELECT transaction_id, user_id, amount, date, description FROM transactions
+                WHERE user_id = ? AND fingerprint = ?
+            """, (owner, fingerprint)).fetchone())
+            if holder[0] < transaction_id:
+                # An earlier copy already has this number
+                occurrence += 1
+                continue
+            # Earlier copies left unfingerprinted by a run without delete also count
+            earlier = _occurrence(conn, transaction_id, owner, cents, day, description)
+            if earlier > occurrence:
+                occurrence = earlier
+                continue
+            duplicates.append(holder)
+            if delete:
+                conn.execute("DELETE FROM transactions WHERE transaction_id = ?", (holder[0],))
+                conn.execute("UPDATE transactions SET fingerprint = ? WHERE transaction_id = ?",
+                             (fingerprint, transaction_id))
+            break
+    return rows, duplicates
+
+
+@timed
+def scan_duplicates(user_id=None, delete=False, batch_size=SCAN_BATCH_SIZE, on_duplicates=None):
+    """Fingerprint existing transactions and find the ones that repeat an earlier row.
+
+    Walks every row without a fingerprint (all users, or just user_id) in
+    insertion order, batch_size rows per write, so it can run against a large
+    table while the tracker is in use and can be interrupted and re-run.
+    Identical rows are numbered in that order exactly as an import numbers
+    them, so genuine repeats (two coffees on one day) are all kept. A
+    duplicate is a newer transaction that already holds the fingerprint one
+    of these rows should get; the older row is always the one kept.
+    Duplicates are passed to on_duplicates(rows) as (transaction_id, user_id,
+    cents, date, description) tuples and removed if delete is set; without
+    delete nothing is changed for them, so a later run reports them again.
+    Recurring rows are skipped; their own index already prevents repeats.
+    Returns {'scanned', 'duplicates', 'deleted'} counts.
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    result = {'scanned': 0, 'duplicates': 0, 'deleted': 0}
+    for path in data_paths() if user_id is None else [database_path(user_id)]:
+        after_id = 0
+        while True:
+            rows, duplicates = run_write(
+                lambda conn: _scan_batch(conn, after_id, user_id, batch_size, delete), path=path)
+            result['scanned'] += len(rows)
+            result['duplicates'] += len(duplicates)
+            if delete:
+                result['deleted'] += len(duplicates)
+            if duplicates and on_duplicates:
+                on_duplicates(duplicates)
+            if len(rows) < batch_size:
+                break
+            after_id = rows[-1][0]
+    return result
@@ -0,0 +1,162 @@
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+
+from database import db_connection
+from helper import date_range_clause
+from instrument import count_rows, timed
+from money import Money
+
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_FIELDS = ('transaction_id', 'date', 'amount', 'category', 'description')
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def encode_export_cursor(transaction_id):
+    # Opaque token for "every row added after this one"
+    return base64.urlsafe_b64encode(json.dumps({'after': transaction_id}).encode()).decode()
+
+
+def decode_export_cursor(token):
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(token.encode()))['after'])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError(f"Invalid export cursor: {token!r}") from None
+
+
+def read_cursor_file(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return f.read().strip() or None
+
+
+def write_cursor_file(path, token):
+    # Written beside the target and renamed over it, so a crash never leaves half a token
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(token + "\n")
+    os.replace(temp_path, path)
+
+
+def export_query(user_id, since=None, after_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # Rows in insertion order, so "after the last exported id" is exactly what was added since
+    clause, params = date_range_clause(start_date=since)
+    query = f"""
+        SELECT transaction_id, date, amount, category, description
+        FROM transactions
+        WHERE user_id = ? AND transaction_id > ?{clause}
+        ORDER BY transaction_id LIMIT ?
+    """
+    return query, [user_id, after_id or 0] + params + [chunk_size]
+
+
+def count_pending(user_id, since=None, after_id=None):
+    clause, params = date_range_clause(start_date=since)
+    with db_connection(user_id) as conn:
+        return conn.execute(
+            f"SELECT COUNT(*) FROM transactions WHERE user_id = ? AND transaction_id > ?{clause}",
+            [user_id, after_id or 0] + params).fetchone()[0]
+
+
+def iter_export_chunks(user_id, since=None, after_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # Yields lists of plain tuples with amounts in cents. Each chunk is its own keyset
+    # query, so no connection (or read lock) is held while the caller writes it out.
+    while True:
+        query, params = export_query(user_id, since, after_id, chunk_size)
+        with db_connection(user_id) as conn:
+            cursor = conn.execute(query, params)
+            cursor.row_factory = None
+            chunk = cursor.fetchall()
+        count_rows(len(chunk))
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        after_id = chunk[-1][0]
+
+
+def _csv_writer(stream, write_header):
+    writer = csv.writer(stream)
+    if write_header:
+        writer.writerow(EXPORT_FIELDS)
+
+    def write(chunk):
+        writer.writerows(
+            (transaction_id, day, Money.from_cents(amount), category, description)
+            for transaction_id, day, amount, category, description in chunk)
+    return write
+
+
+def _jsonl_writer(stream, write_header):
+    def write(chunk):
+        stream.write(''.join(
+            json.dumps({'transaction_id': transaction_id, 'date': day,
+                        'amount': str(Money.from_cents(amount)),
+                        'category': category, 'description': description}) + "\n"
+            for transaction_id, day, amount, category, description in chunk))
+    return write
+
+
+WRITERS = {'csv': _csv_writer, 'jsonl': _jsonl_writer}
+
+
+@timed
+def export_transactions(user_id, stream, fmt='csv', since=None, cursor=None,
+                        chunk_size=EXPORT_CHUNK_SIZE, write_header=True,
+                        progress=None, on_chunk=None):
+    """Stream a user's transactions to a text stream as CSV or JSONL.
+
+    Rows are exported oldest-inserted first, chunk_size at a time, so memory
+    stays bounded by one chunk. since (YYYY-MM-DD) keeps rows dated on or
+    after it; cursor resumes after the last row of an earlier export.
+    progress(written, total) and on_chunk(cursor) are called after each chunk
+    is written. Returns {'rows': n, 'cursor': token}, where token is the
+    cursor to pass next time (unchanged when nothing new was exported).
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    after_id = decode_export_cursor(cursor) if cursor else 0
+    total = count_pending(user_id, since, after_id) if progress else None
+    write = WRITERS[fmt](stream, write_header)
+    written = 0
+    for chunk in iter_export_chunks(user_id, since, after_id, chunk_size):
+        write(chunk)
+        stream.flush()
+        written += len(chunk)
+        cursor = encode_export_cursor(chunk[-1][0])
+        if on_chunk:
+            on_chunk(cursor)
+        if progress:
+            progress(written, total)
+    return {'rows': written, 'cursor': cursor}
+
+
+def open_export_stream(path, append=False, compress=None):
+    # Text stream for path; gzip when compress is set or the name ends in .gz. Appending
+    # to a gzip file adds a new member, which gzip readers treat as one stream.
+    compress = path.endswith('.gz') if compress is None else compress
+    mode = 'a' if append else 'w'
+    if compress:
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8', newline='')
+    return open(path, mode, newline='', encoding='utf-8')
+
+
+def export_to_file(user_id, path, fmt='csv', since=None, cursor_file=None,
+                   chunk_size=EXPORT_CHUNK_SIZE, compress=None, progress=None):
+    # With a cursor file the export resumes after the cursor it holds and appends to
+    # path; the file is updated after every chunk, so an interrupted run picks up
+    # where it stopped and a nightly job only emits rows added since the last run.
+    cursor = read_cursor_file(cursor_file) if cursor_file else None
+    append = cursor_file is not None and os.path.exists(path) and os.path.getsize(path) > 0
+    on_chunk = (lambda token: write_cursor_file(cursor_file, token)) if cursor_file else None
+    with open_export_stream(path, append, compress) as stream:
+        return export_transactions(user_id, stream, fmt, since, cursor, chunk_size,
+                                   write_header=not append, progress=progress, on_chunk=on_chunk)
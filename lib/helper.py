@@ -1,81 +1,155 @@
-from database import get_db_connection
+from database import db_connection
+from money import Money
+from instrument import timed
+from recurring import projected_total
 from datetime import date
 import logging
 
 logging.basicConfig(level=logging.INFO)
 
+@timed
 def get_budget_limit(user_id, category):
     #Fetches the budget limit for a specific user and category.
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT limit_amount FROM budgets 
-            WHERE user_id = ? AND category = ?
-        """, (user_id, category))
-        row = cursor.fetchone()
-        conn.close()
-        return float(row["limit_amount"]) if row else None
+        with db_connection(user_id) as conn:
+            row = conn.execute("""
+                SELECT limit_amount FROM budgets 
+                WHERE user_id = ? AND category = ?
+            """, (user_id, category)).fetchone()
+        return Money.from_cents(row["limit_amount"]) if row else None
     except Exception as e:
         logging.error(f"Error fetching budget limit: {e}")
         return None
 
 
-def get_spending_by_category(user_id, category, month=None, year=None):
-    #Returns the total spending (as a positive float) for a given category
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
+def period_bounds(month=None, year=None):
+    #Returns the half-open [start, end) ISO date range for a month or a whole year.
+    if year is None:
+        return None, None
+    if month is None:
+        return f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+    if month == 12:
+        return f"{year:04d}-12-01", f"{year + 1:04d}-01-01"
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month + 1:02d}-01"
+
+
+def date_bounds(month=None, year=None, start_date=None, end_date=None):
+    #Returns the half-open [lower, upper) ISO range covered by the filters; None means unbounded.
+    lower, upper = period_bounds(month, year)
+    if start_date is not None:
+        start_date = start_date.isoformat() if isinstance(start_date, date) else start_date
+        lower = max(lower, start_date) if lower else start_date
+    if end_date is not None:
+        end_date = end_date.isoformat() if isinstance(end_date, date) else end_date
+        upper = min(upper, end_date) if upper else end_date
+    return lower, upper
+
+
+def date_range_clause(month=None, year=None, start_date=None, end_date=None, column="date"):
+    #Builds an index-friendly "AND date >= ? AND date < ?" filter and its params.
+    #start_date is inclusive and end_date exclusive; month/year narrow the range further.
+    lower, upper = date_bounds(month, year, start_date, end_date)
+
+    clause = ""
+    params = []
+    if lower is not None:
+        clause += f" AND {column} >= ?"
+        params.append(lower)
+    if upper is not None:
+        clause += f" AND {column} < ?"
+        params.append(upper)
+    return clause, params
+
+
+def spending_query(user_id, category, month=None, year=None, start_date=None, end_date=None):
+    #Whole-month filters read the spending_rollup table; arbitrary date ranges scan transactions.
+    if start_date is None and end_date is None:
         query = """
-            SELECT COALESCE(SUM(ABS(amount)), 0) as total_spent
-            FROM transactions 
-            WHERE user_id = ? AND category = ? AND amount < 0
+            SELECT COALESCE(SUM(total_spent), 0) as total_spent
+            FROM spending_rollup
+            WHERE user_id = ? AND category = ?
         """
+        lower, upper = period_bounds(month if year is not None else None, year)
         params = [user_id, category]
-
-        if month is not None and year is not None:
-            query += " AND strftime('%m', date) = ? AND strftime('%Y', date) = ?"
-            params.extend([f"{month:02d}", str(year)])
-        elif year is not None:
-            query += " AND strftime('%Y', date) = ?"
-            params.append(str(year))
-
-        cursor.execute(query, params)
-        total = float(cursor.fetchone()["total_spent"])
-        conn.close()
+        if lower is not None:
+            query += " AND year_month >= ? AND year_month < ?"
+            params.extend([lower[:7], upper[:7]])
+        return query, params
+
+    query = """
+        SELECT COALESCE(SUM(ABS(amount)), 0) as total_spent
+        FROM transactions 
+        WHERE user_id = ? AND category = ? AND amount < 0
+    """
+    clause, params = date_range_clause(
+        month if year is not None else None, year, start_date, end_date)
+    return query + clause, [user_id, category] + params
+
+
+@timed
+def get_spending_by_category(user_id, category, month=None, year=None, start_date=None, end_date=None,
+                             include_projected=False):
+    #Returns the total spending (as positive Money) for a given category.
+    #include_projected adds recurring expenses in the range that have not been written yet
+    #(through today when the range has no end), e.g. to check next month's budget.
+    try:
+        query, params = spending_query(
+            user_id, category, month, year, start_date, end_date)
+
+        with db_connection(user_id) as conn:
+            total = Money.from_cents(conn.execute(query, params).fetchone()["total_spent"])
+            if include_projected:
+                lower, upper = date_bounds(
+                    month if year is not None else None, year, start_date, end_date)
+                total -= Money.from_cents(
+                    projected_total(user_id, lower, upper, category, expenses_only=True))
         return total
     except Exception as e:
         logging.error(f"Error calculating spending by category: {e}")
-        return 0.0
+        return Money(0)
 
 
+@timed
 def get_transaction_categories(user_id):
     #Returns a list of unique categories the user has transactions in.
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT DISTINCT category FROM transactions 
-            WHERE user_id = ? ORDER BY category
-        """, (user_id,))
-        categories = [row["category"] for row in cursor.fetchall()]
-        conn.close()
+        with db_connection(user_id) as conn:
+            rows = conn.execute("""
+                SELECT DISTINCT category FROM transactions 
+                WHERE user_id = ? ORDER BY category
+            """, (user_id,)).fetchall()
+        categories = [row["category"] for row in rows]
         return categories
     except Exception as e:
         logging.error(f"Error fetching transaction categories: {e}")
         return []
 
 
+@timed
+def get_budget_and_spending(user_id, category):
+    #Returns (limit, spent) from a single lookup of the budget and the spending rollup.
+    #limit is None when the category has no budget.
+    with db_connection(user_id) as conn:
+        row = conn.execute("""
+            SELECT b.limit_amount,
+                   (SELECT COALESCE(SUM(total_spent), 0) FROM spending_rollup r
+                    WHERE r.user_id = b.user_id AND r.category = b.category) AS total_spent
+            FROM budgets b
+            WHERE b.user_id = ? AND b.category = ?
+        """, (user_id, category)).fetchone()
+    if row is None:
+        return None, Money(0)
+    return Money.from_cents(row["limit_amount"]), Money.from_cents(row["total_spent"])
+
+
+@timed
 def check_transaction_budget_impact(user_id, category, amount):
     #Checks the impact of a new transaction on the user's budget.Returns one of: "OVER", "WARNING", "OK", "NO BUDGET"
     
     try:
-        limit = get_budget_limit(user_id, category)
+        limit, spent = get_budget_and_spending(user_id, category)
         if limit is None:
             return "NO BUDGET"
-
-        spent = get_spending_by_category(user_id, category)
         predicted_total = spent + abs(amount)
 
         if predicted_total > limit:
@@ -89,16 +163,15 @@ def check_transaction_budget_impact(user_id, category, amount):
         return "ERROR"
 
 
+@timed
 def check_current_budget_status(user_id, category):
     #Returns a user-friendly message about their current budget statusfor a given category.
     
     try:
-        limit = get_budget_limit(user_id, category)
+        limit, spent = get_budget_and_spending(user_id, category)
         if limit is None:
             return "No Budget Set"
 
-        spent = get_spending_by_category(user_id, category)
-
         if spent > limit:
             return f"OVER BUDGET: Spent {spent:.2f} of {limit:.2f}"
         elif spent >= 0.9 * limit:
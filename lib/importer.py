@@ -0,0 +1,25 @@
+import csv
+
+from transaction import save_transactions_bulk, BULK_CHUNK_SIZE
+
+CSV_FIELDS = ('date', 'amount', 'category', 'description', 'external_id')
+
+
+def read_transactions_csv(path):
+    # Yields one dict per CSV row without loading the file into memory.
+    # Expects a header row naming date, amount, category and (optionally) description and
+    # external_id, the bank's own id for the row, which makes duplicate detection exact.
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames is None:
+            return
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        missing = [name for name in CSV_FIELDS[:3] if name not in reader.fieldnames]
+        if missing:
+            raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+        for row in reader:
+            yield {name: (row.get(name) or '').strip() for name in CSV_FIELDS}
+
+
+def import_csv(user_id, path, chunk_size=BULK_CHUNK_SIZE):
+    return save_transactions_bulk(user_id, read_transactions_csv(path), chunk_size)
@@ -0,0 +1,140 @@
+"""
+Opt-in query and latency instrumentation.
+
+Set FINANCE_TRACKER_PROFILE=1 (or call enable()) to record, for every
+function decorated with @timed, the number of calls, SQL statements
+executed, rows fetched and wall time. Set FINANCE_TRACKER_PROFILE_JSON to a
+path to have the CLI export the numbers there on exit. When disabled the
+decorator costs one global flag check per call and pooled connections carry
+no trace callback.
+"""
+
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+
+ENABLED = bool(os.environ.get('FINANCE_TRACKER_PROFILE'))
+EXPORT_PATH = os.environ.get('FINANCE_TRACKER_PROFILE_JSON')
+
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def _frames():
+    frames = getattr(_local, 'frames', None)
+    if frames is None:
+        frames = _local.frames = []
+    return frames
+
+
+TRANSACTION_CONTROL = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+
+def _on_statement(statement):
+    # SQLite reports each trigger program and each executemany() row as a repeat of
+    # the statement that caused it, so consecutive repeats count as one query.
+    frames = getattr(_local, 'frames', None)
+    if not frames or statement == getattr(_local, 'last_statement', None):
+        return
+    _local.last_statement = statement
+    if not statement.lstrip().upper().startswith(TRANSACTION_CONTROL):
+        frames[-1][0] += 1
+
+
+def _counting_row(cursor, row):
+    frames = getattr(_local, 'frames', None)
+    if frames:
+        frames[-1][1] += 1
+    return sqlite3.Row(cursor, row)
+
+
+def count_rows(count):
+    # For cursors read with row_factory = None, which bypass _counting_row
+    frames = getattr(_local, 'frames', None)
+    if frames:
+        frames[-1][1] += count
+
+
+def configure_connection(conn):
+    # Called by the connection pool on checkout to attach or detach the hooks.
+    if ENABLED:
+        conn.set_trace_callback(_on_statement)
+        conn.row_factory = _counting_row
+    else:
+        conn.set_trace_callback(None)
+        conn.row_factory = sqlite3.Row
+
+
+def timed(func):
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return func(*args, **kwargs)
+
+        frames = _frames()
+        frame = [0, 0]
+        frames.append(frame)
+        _local.last_statement = None
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            frames.pop()
+            if frames:
+                # Callers are charged for the queries their callees ran
+                frames[-1][0] += frame[0]
+                frames[-1][1] += frame[1]
+            with _lock:
+                entry = _stats.setdefault(name, {'calls': 0, 'queries': 0, 'rows': 0, 'wall_ms': 0.0})
+                entry['calls'] += 1
+                entry['queries'] += frame[0]
+                entry['rows'] += frame[1]
+                entry['wall_ms'] += elapsed
+
+    return wrapper
+
+
+def get_stats():
+    with _lock:
+        return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def format_summary():
+    stats = sorted(get_stats().items(), key=lambda item: item[1]['wall_ms'], reverse=True)
+    lines = [
+        f"{'Function':<50} {'Calls':>6} {'Queries':>8} {'Rows':>8} {'Total ms':>10} {'Avg ms':>8}",
+        "─" * 95,
+    ]
+    for name, entry in stats:
+        lines.append(f"{name:<50} {entry['calls']:>6} {entry['queries']:>8} {entry['rows']:>8} "
+                     f"{entry['wall_ms']:>10.2f} {entry['wall_ms'] / entry['calls']:>8.3f}")
+    if not stats:
+        lines.append("No instrumented calls recorded.")
+    return "\n".join(lines)
+
+
+def export_json(path):
+    with open(path, 'w') as f:
+        json.dump(get_stats(), f, indent=2)
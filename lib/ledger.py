@@ -0,0 +1,105 @@
+import logging
+import sqlite3
+from datetime import date, datetime
+
+import database
+from database import db_connection
+from money import Money
+
+
+def _month_start(period):
+    return f"{period}-01"
+
+
+def _next_month_start(period):
+    year, month = int(period[:4]), int(period[5:7])
+    if month == 12:
+        return f"{year + 1:04d}-01-01"
+    return f"{year:04d}-{month + 1:02d}-01"
+
+
+def _previous_period(day):
+    if day.month == 1:
+        return f"{day.year - 1:04d}-12"
+    return f"{day.year:04d}-{day.month - 1:02d}"
+
+
+def _latest_checkpoint(conn, user_id, period):
+    return conn.execute("""
+        SELECT period, closing_balance FROM balance_checkpoints
+        WHERE user_id = ? AND period <= ?
+        ORDER BY period DESC LIMIT 1
+    """, (user_id, period)).fetchone()
+
+
+def ensure_checkpoints(conn, user_id, through_period):
+    # Returns the closing balance in cents of the given closed month ("YYYY-MM"),
+    # storing any missing checkpoints up to it. Only months after the latest
+    # surviving checkpoint are summed, so repairs after a back-dated change stay small.
+    row = _latest_checkpoint(conn, user_id, through_period)
+    if row and row["period"] == through_period:
+        return row["closing_balance"]
+
+    revision = database.user_revision(conn, user_id)
+    balance = row["closing_balance"] if row else 0
+    lower = _next_month_start(row["period"]) if row else ""
+    monthly = conn.execute("""
+        SELECT substr(date, 1, 7) AS period, SUM(amount) AS net
+        FROM transactions
+        WHERE user_id = ? AND date >= ? AND date < ?
+        GROUP BY period ORDER BY period
+    """, (user_id, lower, _next_month_start(through_period))).fetchall()
+
+    checkpoints = []
+    for month in monthly:
+        balance += month["net"]
+        checkpoints.append((user_id, month["period"], balance))
+    if not checkpoints or checkpoints[-1][1] != through_period:
+        checkpoints.append((user_id, through_period, balance))
+
+    if database.READ_ONLY:
+        logging.debug(f"Balance checkpoints for user {user_id} not stored: read-only connection")
+        return balance
+    try:
+        database.run_write(lambda writer: _store_checkpoints(writer, user_id, revision, checkpoints),
+                           user_id=user_id)
+    except sqlite3.OperationalError as e:
+        # Checkpoints are only a cache: if another writer holds the lock past the
+        # busy timeout, return the computed balance and let a later call store it.
+        logging.warning(f"Balance checkpoints for user {user_id} not stored: {e}")
+    return balance
+
+
+def _store_checkpoints(conn, user_id, revision, checkpoints):
+    # Runs as a write job. Any write to the user's transactions since the sums were
+    # read bumps the revision, and the checkpoints are dropped instead of stored stale.
+    if database.user_revision(conn, user_id) != revision:
+        return False
+    conn.executemany("""
+        INSERT OR REPLACE INTO balance_checkpoints (user_id, period, closing_balance)
+        VALUES (?, ?, ?)
+    """, checkpoints)
+    return True
+
+
+def balance_as_of(user_id, as_of=None):
+    # Balance of every transaction dated on or before as_of (all of them when as_of is None):
+    # the closing balance of the last closed month plus a sum over the remaining tail.
+    if isinstance(as_of, str):
+        as_of = datetime.strptime(as_of, '%Y-%m-%d').date()
+
+    today = date.today()
+    through_period = _previous_period(min(as_of, today) if as_of else today)
+
+    with db_connection(user_id) as conn:
+        balance = ensure_checkpoints(conn, user_id, through_period)
+        query = """
+            SELECT COALESCE(SUM(amount), 0) AS tail
+            FROM transactions WHERE user_id = ? AND date >= ?
+        """
+        params = [user_id, _next_month_start(through_period)]
+        if as_of is not None:
+            query += " AND date <= ?"
+            params.append(as_of.isoformat())
+        balance += conn.execute(query, params).fetchone()["tail"]
+    return Money.from_cents(balance)
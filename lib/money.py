@@ -0,0 +1,163 @@
+import sqlite3
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+
+class Money:
+    """An exact amount of money stored as integer cents.
+
+    Money(12.34), Money('12.34') and Money(Decimal('12.34')) all hold 1234
+    cents; use Money.from_cents() for values read back from the database.
+    Plain numbers mixed into arithmetic are converted to cents first. Compared
+    with a plain number, Money compares (and hashes) as its exact decimal
+    value, so Money(1) == 1 and both are the same dict key, while
+    Money('0.10') != 0.1 because the float is not exactly ten cents. Existing
+    code that compares amounts with 0 or formats them with :.2f keeps working.
+    """
+
+    __slots__ = ('cents',)
+
+    def __init__(self, value=0):
+        if isinstance(value, Money):
+            self.cents = value.cents
+        elif isinstance(value, int) and not isinstance(value, bool):
+            self.cents = value * 100
+        else:
+            self.cents = _to_cents(value)
+
+    @classmethod
+    def from_cents(cls, cents):
+        money = object.__new__(cls)
+        money.cents = int(cents)
+        return money
+
+    @property
+    def amount(self):
+        return Decimal(self.cents).scaleb(-2)
+
+    def __float__(self):
+        return self.cents / 100
+
+    def __int__(self):
+        # Truncates toward zero, like int() of a float, without going through one
+        return int(self.amount)
+
+    def __bool__(self):
+        return self.cents != 0
+
+    def __hash__(self):
+        # Equal to the hash of the int, float or Decimal it compares equal to
+        return hash(self.amount)
+
+    def __str__(self):
+        return str(self.amount)
+
+    def __repr__(self):
+        return f"Money('{self.amount}')"
+
+    def __format__(self, spec):
+        return format(self.amount, spec)
+
+    def __neg__(self):
+        return Money.from_cents(-self.cents)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        return Money.from_cents(abs(self.cents))
+
+    def __add__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        return Money.from_cents(self.cents + other.cents)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        return Money.from_cents(self.cents - other.cents)
+
+    def __rsub__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        return Money.from_cents(other.cents - self.cents)
+
+    def __mul__(self, factor):
+        if isinstance(factor, Money):
+            return NotImplemented
+        if isinstance(factor, int):
+            return Money.from_cents(self.cents * factor)
+        try:
+            return Money.from_cents(
+                (Decimal(self.cents) * Decimal(str(factor))).quantize(Decimal(1), ROUND_HALF_UP))
+        except InvalidOperation:
+            return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        # Money / Money is a plain ratio; Money / number is a smaller amount of money
+        if isinstance(other, Money):
+            return self.cents / other.cents
+        return self * (1 / Decimal(str(other)))
+
+    def _operands(self, other):
+        # (left, right) to compare: cents for two Money values, else the exact amount
+        if isinstance(other, Money):
+            return self.cents, other.cents
+        if isinstance(other, (int, float, Decimal)) and not isinstance(other, bool):
+            return self.amount, other
+        return None
+
+    def __eq__(self, other):
+        operands = self._operands(other)
+        return NotImplemented if operands is None else operands[0] == operands[1]
+
+    def __lt__(self, other):
+        operands = self._operands(other)
+        return NotImplemented if operands is None else operands[0] < operands[1]
+
+    def __le__(self, other):
+        operands = self._operands(other)
+        return NotImplemented if operands is None else operands[0] <= operands[1]
+
+    def __gt__(self, other):
+        operands = self._operands(other)
+        return NotImplemented if operands is None else operands[0] > operands[1]
+
+    def __ge__(self, other):
+        operands = self._operands(other)
+        return NotImplemented if operands is None else operands[0] >= operands[1]
+
+
+def _to_cents(value):
+    try:
+        amount = Decimal(value if isinstance(value, (str, Decimal)) else repr(float(value)))
+        if not amount.is_finite():
+            raise ValueError
+        return int(amount.quantize(CENT, ROUND_HALF_UP).scaleb(2))
+    except (InvalidOperation, TypeError, ValueError):
+        raise ValueError(f"Invalid amount '{value}'") from None
+
+
+def _coerce(value):
+    if isinstance(value, Money):
+        return value
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return Money(value)
+    return NotImplemented
+
+
+def to_cents(value):
+    # Accepts Money or anything Money() accepts; used when binding amounts to SQL.
+    return value.cents if isinstance(value, Money) else Money(value).cents
+
+
+# Money binds to SQL parameters as its integer number of cents
+sqlite3.register_adapter(Money, lambda money: money.cents)
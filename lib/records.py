@@ -0,0 +1,123 @@
+"""
+Compact result types for large query results.
+
+Transaction and User are slotted records, so each row costs one small
+object rather than a dict. They also implement the read-only mapping
+protocol with the same keys the old dict rows had. Code that does
+row['amount'], dict(row) or {**row} keeps working unchanged.
+
+TransactionBatch stores a result set as parallel typed arrays: ids, dates
+as days since 1970-01-01, amounts in cents, and category codes into a name
+table. That is about 30 bytes per row, plus one shared string per distinct
+description. Indexing or iterating it produces Transaction records.
+"""
+
+from array import array
+from collections.abc import Mapping
+from datetime import date, timedelta
+
+from money import Money
+
+EPOCH = date(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+
+class Record(Mapping):
+    """Base for slotted rows that read like dicts; FIELDS are the mapping keys."""
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+class Transaction(Record):
+    # amount is built from cents on access, so rows that are never read as
+    # Money do not carry a Money object each
+
+    __slots__ = ('transaction_id', 'cents', 'category', 'date', 'description')
+    FIELDS = ('transaction_id', 'amount', 'category', 'date', 'description')
+
+    def __init__(self, transaction_id, cents, category, date, description):
+        self.transaction_id = transaction_id
+        self.cents = cents
+        self.category = category
+        self.date = date
+        self.description = description
+
+    @property
+    def amount(self):
+        return Money.from_cents(self.cents)
+
+
+class User(Record):
+    __slots__ = ('user_id', 'name')
+    FIELDS = ('user_id', 'name')
+
+    def __init__(self, user_id, name):
+        self.user_id = user_id
+        self.name = name
+
+
+class TransactionBatch:
+    """Transactions as parallel arrays; batch[i] and iteration yield Transaction records."""
+
+    __slots__ = ('ids', 'days', 'amounts', 'categories', 'category_names', 'descriptions')
+
+    def __init__(self):
+        self.ids = array('q')
+        self.days = array('i')        # days since 1970-01-01
+        self.amounts = array('q')     # cents; negative for expenses
+        self.categories = array('H')  # index into category_names
+        self.category_names = []
+        self.descriptions = []        # one shared str per distinct description
+
+    @classmethod
+    def from_rows(cls, rows):
+        # rows: (transaction_id, amount in cents, category, date, description) tuples
+        batch = cls()
+        codes = {}
+        days = {}
+        texts = {}
+        for transaction_id, cents, category, day, description in rows:
+            code = codes.get(category)
+            if code is None:
+                code = codes[category] = len(batch.category_names)
+                batch.category_names.append(category)
+            number = days.get(day)
+            if number is None:
+                number = days[day] = date.fromisoformat(day).toordinal() - EPOCH_ORDINAL
+            batch.ids.append(transaction_id)
+            batch.days.append(number)
+            batch.amounts.append(cents)
+            batch.categories.append(code)
+            batch.descriptions.append(texts.setdefault(description, description))
+        return batch
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        return Transaction(self.ids[index], self.amounts[index],
+                           self.category_names[self.categories[index]],
+                           (EPOCH + timedelta(days=self.days[index])).isoformat(),
+                           self.descriptions[index])
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def total(self):
+        return Money.from_cents(sum(self.amounts))
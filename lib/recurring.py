@@ -0,0 +1,251 @@
+"""
+Recurring transactions (rent, salaries, subscriptions).
+
+A rule repeats every `interval` days, weeks, months or years from its
+start date, optionally on a fixed day of the month (clamped to the last day
+of shorter months) and up to an inclusive end date. Occurrences are only
+written to transactions by materialize_due(), which the interactive CLI runs
+on start-up and `recurring run` runs from cron. Anything not yet written can
+be projected with projected_total(), which counts occurrences in a date
+range arithmetically instead of expanding them.
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+
+from database import data_paths, database_path, db_connection, run_write
+from instrument import timed
+from money import Money
+
+# (days, months) per step of interval 1
+FREQUENCIES = {
+    'daily': (1, 0),
+    'weekly': (7, 0),
+    'monthly': (0, 1),
+    'yearly': (0, 12),
+}
+MATERIALIZE_BATCH_SIZE = 500
+
+
+def _to_date(value):
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+class Rule:
+    """Occurrence arithmetic for one recurring_rules row.
+
+    Occurrence k (k >= 0) is the k-th date in the rule's schedule counted
+    from its start date; dates before start_date are never produced.
+    """
+
+    __slots__ = ('rule_id', 'user_id', 'amount', 'category', 'description',
+                 'start', 'next', 'step_days', 'step_months', 'day', 'end_index')
+
+    def __init__(self, row):
+        self.rule_id = row['rule_id']
+        self.user_id = row['user_id']
+        self.amount = row['amount']
+        self.category = row['category']
+        self.description = row['description']
+        self.start = _to_date(row['start_date'])
+        self.next = _to_date(row['next_date'])
+        days, months = FREQUENCIES[row['frequency']]
+        self.step_days = days * row['interval']
+        self.step_months = months * row['interval']
+        self.day = row['day_of_month'] or self.start.day
+        end = _to_date(row['end_date'])
+        self.end_index = None if end is None else self.first_index(end + timedelta(days=1))
+
+    def occurrence(self, k):
+        if self.step_days:
+            return self.start + timedelta(days=k * self.step_days)
+        year, month = divmod(_month_index(self.start) + k * self.step_months, 12)
+        return date(year, month + 1, min(self.day, calendar.monthrange(year, month + 1)[1]))
+
+    def first_index(self, day):
+        # Smallest k whose occurrence falls on or after day, in O(1)
+        day = max(day, self.start)
+        if self.step_days:
+            return -(-(day - self.start).days // self.step_days)
+        k = -(-(_month_index(day) - _month_index(self.start)) // self.step_months)
+        return k + 1 if self.occurrence(k) < day else k
+
+    def stop_index(self, before):
+        # One past the last occurrence dated before `before` (and within end_date)
+        stop = self.first_index(before)
+        return stop if self.end_index is None else min(stop, self.end_index)
+
+    def count_between(self, start, end):
+        # Occurrences in [start, end) that have not been materialized yet
+        if self.next is None:
+            return 0
+        first = self.first_index(max(start, self.next) if start else self.next)
+        return max(0, self.stop_index(end) - first)
+
+
+def rule_query(where, params, limit=None):
+    query = f"""
+        SELECT rule_id, user_id, amount, category, description, frequency, interval,
+               day_of_month, start_date, end_date, next_date
+        FROM recurring_rules WHERE {where}
+        ORDER BY rule_id
+    """
+    if limit is not None:
+        query += " LIMIT ?"
+        params = params + [limit]
+    return query, params
+
+
+@timed
+def add_recurring_rule(user_id, amount, category, frequency, start_date, interval=1,
+                       day_of_month=None, end_date=None, description=''):
+    # Returns the new rule_id, or None (after printing why) if the rule is invalid.
+    from transaction import validate_transaction
+
+    values, error = validate_transaction(user_id, amount, category, start_date, description)
+    if error is None and frequency not in FREQUENCIES:
+        error = f"Error: Frequency must be one of {', '.join(FREQUENCIES)}"
+    if error is None and (not isinstance(interval, int) or interval <= 0):
+        error = "Error: Interval must be a positive whole number"
+    if error is None and day_of_month is not None and (
+            frequency not in ('monthly', 'yearly') or not 1 <= day_of_month <= 31):
+        error = "Error: Day of month must be 1-31 and only applies to monthly or yearly rules"
+    try:
+        end_date = _to_date(end_date)
+    except ValueError as e:
+        error = error or f"Error: Invalid end date. Use YYYY-MM-DD. Details: {e}"
+    if error:
+        print(error)
+        return None
+
+    _, cents, category, start, description = values
+    rule = Rule({'rule_id': None, 'user_id': user_id, 'amount': cents, 'category': category,
+                 'description': description, 'frequency': frequency, 'interval': interval,
+                 'day_of_month': day_of_month, 'start_date': start, 'end_date': end_date,
+                 'next_date': start})
+    first = rule.first_index(rule.start)
+    if rule.end_index is not None and first >= rule.end_index:
+        print("Error: The rule has no occurrences before its end date")
+        return None
+
+    try:
+        return run_write(lambda conn: conn.execute("""
+            INSERT INTO recurring_rules (user_id, amount, category, description, frequency,
+                                         interval, day_of_month, start_date, end_date, next_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, cents, category, description, frequency, interval, day_of_month, start,
+              end_date.isoformat() if end_date else None,
+              rule.occurrence(first).isoformat())).lastrowid, user_id=user_id)
+    except Exception as e:
+        print(f"Error saving recurring rule: {e}")
+        return None
+
+
+@timed
+def get_recurring_rules(user_id):
+    with db_connection(user_id) as conn:
+        rows = conn.execute("""
+            SELECT rule_id, amount, category, description, frequency, interval,
+                   day_of_month, start_date, end_date, next_date
+            FROM recurring_rules WHERE user_id = ? ORDER BY rule_id
+        """, (user_id,)).fetchall()
+    rules = []
+    for row in rows:
+        rule = dict(row)
+        rule['amount'] = Money.from_cents(rule['amount'])
+        rules.append(rule)
+    return rules
+
+
+@timed
+def delete_recurring_rule(rule_id, user_id):
+    # Stops future occurrences; transactions already written are kept.
+    try:
+        deleted = run_write(lambda conn: conn.execute(
+            "DELETE FROM recurring_rules WHERE rule_id = ? AND user_id = ?",
+            (rule_id, user_id)).rowcount, user_id=user_id)
+        if not deleted:
+            print("Error: Recurring rule not found or does not belong to user.")
+        return bool(deleted)
+    except Exception as e:
+        print(f"Error deleting recurring rule: {e}")
+        return False
+
+
+def _materialize_batch(conn, where, params, batch_size, through):
+    # Reads the next batch of due rules, writes their occurrences through `through`
+    # and advances next_date, all inside one write. Returns (inserted, rules read).
+    rules = [Rule(row) for row in conn.execute(*rule_query(where, params, batch_size))]
+    before = through + timedelta(days=1)
+    rows = []
+    advanced = []
+    for rule in rules:
+        stop = rule.stop_index(before)
+        for k in range(rule.first_index(rule.next), stop):
+            rows.append((rule.user_id, rule.amount, rule.category,
+                         rule.occurrence(k).isoformat(), rule.description, rule.rule_id))
+        ended = rule.end_index is not None and stop >= rule.end_index
+        advanced.append((None if ended else rule.occurrence(stop).isoformat(), rule.rule_id))
+    # Dates already written for a rule are skipped by its unique (rule_id, date) index
+    inserted = conn.executemany("""
+        INSERT OR IGNORE INTO transactions (user_id, amount, category, date, description, rule_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows).rowcount
+    conn.executemany("UPDATE recurring_rules SET next_date = ? WHERE rule_id = ?", advanced)
+    return inserted, rules
+
+
+@timed
+def materialize_due(through=None, user_id=None, batch_size=MATERIALIZE_BATCH_SIZE):
+    """Write every occurrence dated on or before through (default today).
+
+    Due rules are found through the next_date index and processed batch_size
+    at a time. Each batch reads its rules, inserts their occurrences and
+    advances next_date in one write, so an interrupted or concurrent run never
+    duplicates a transaction. Returns the number of transactions inserted.
+    """
+    through = _to_date(through) or date.today()
+    where = "next_date IS NOT NULL AND next_date <= ? AND rule_id > ?"
+    if user_id is not None:
+        where += " AND user_id = ?"
+    inserted = 0
+    # In sharded mode rule ids are per shard, so each shard is walked separately
+    for path in data_paths() if user_id is None else [database_path(user_id)]:
+        last_rule_id = 0
+        while True:
+            # Keyset over rule_id, so each batch starts after the rules already handled
+            params = [through.isoformat(), last_rule_id] + ([user_id] if user_id is not None else [])
+            count, rules = run_write(
+                lambda conn: _materialize_batch(conn, where, params, batch_size, through), path=path)
+            inserted += count
+            if len(rules) < batch_size:
+                break
+            last_rule_id = rules[-1].rule_id
+    return inserted
+
+
+def projected_total(user_id, start_date=None, end_date=None, category=None, expenses_only=False):
+    """Sum, in cents, of occurrences in [start_date, end_date) not yet materialized.
+
+    end_date defaults to tomorrow, i.e. everything due through today. Each
+    rule is counted arithmetically, so the cost does not grow with the length
+    of the range.
+    """
+    start = _to_date(start_date)
+    end = _to_date(end_date) or date.today() + timedelta(days=1)
+    where = "user_id = ? AND next_date IS NOT NULL AND next_date < ?"
+    params = [user_id, end.isoformat()]
+    if category is not None:
+        where += " AND category = ?"
+        params.append(category)
+    if expenses_only:
+        where += " AND amount < 0"
+    with db_connection(user_id) as conn:
+        rules = [Rule(row) for row in conn.execute(*rule_query(where, params))]
+    return sum(rule.amount * rule.count_between(start, end) for rule in rules)
@@ -0,0 +1,155 @@
+"""
+Time-bucketed income/expense reports.
+
+period_report() returns one row per day, week (Monday to Sunday), month or
+year with income, expense, net and the running balance at the end of the
+period. A single query groups the transactions into buckets, fills empty
+periods with a recursive CTE and carries the balance forward with a window
+function; the opening balance comes from the month-end checkpoints in
+ledger.py.
+
+Reports are cached per (user, granularity, date range) and reused until the
+user's revision counter changes, i.e. until their transactions (or budgets)
+are written again.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from database import db_connection, user_revision
+from helper import date_range_clause
+from instrument import timed
+from ledger import balance_as_of
+from money import Money
+
+# SQL for the first day of the period containing {column}, and the step to the next one
+GRANULARITIES = {
+    'daily': ("date({column})", '+1 day'),
+    'weekly': ("date({column}, '-6 days', 'weekday 1')", '+7 days'),
+    'monthly': ("date({column}, 'start of month')", '+1 month'),
+    'yearly': ("date({column}, 'start of year')", '+1 year'),
+}
+REPORT_CACHE_SIZE = 256
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def report_query(user_id, granularity, start_date=None, end_date=None):
+    # start_date is inclusive and end_date exclusive. Without them the report runs
+    # from the first to the last period the user has transactions in.
+    bucket, step = GRANULARITIES[granularity]
+    clause, params = date_range_clause(start_date=start_date, end_date=end_date)
+    query = f"""
+        WITH totals AS (
+            SELECT {bucket.format(column='date')} AS period_start,
+                   SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) AS income,
+                   SUM(CASE WHEN amount < 0 THEN -amount ELSE 0 END) AS expense,
+                   COUNT(*) AS txn_count
+            FROM transactions
+            WHERE user_id = ?{clause}
+            GROUP BY period_start
+        ),
+        bounds AS (
+            SELECT COALESCE({bucket.format(column='?')}, MIN(period_start)) AS first_period,
+                   COALESCE({bucket.format(column="date(?, '-1 day')")}, MAX(period_start)) AS last_period
+            FROM totals
+        ),
+        periods(period_start) AS (
+            SELECT first_period FROM bounds WHERE first_period IS NOT NULL
+            UNION ALL
+            SELECT date(period_start, '{step}') FROM periods, bounds
+            WHERE date(period_start, '{step}') <= bounds.last_period
+        )
+        SELECT p.period_start,
+               COALESCE(t.income, 0) AS income,
+               COALESCE(t.expense, 0) AS expense,
+               COALESCE(t.txn_count, 0) AS txn_count,
+               SUM(COALESCE(t.income - t.expense, 0))
+                   OVER (ORDER BY p.period_start ROWS UNBOUNDED PRECEDING) AS running_net
+        FROM periods p LEFT JOIN totals t ON t.period_start = p.period_start
+        ORDER BY p.period_start
+    """
+    return query, [user_id] + params + [_iso(start_date), _iso(end_date)]
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def period_label(period_start, granularity):
+    if granularity == 'daily':
+        return period_start
+    if granularity == 'weekly':
+        year, week, _ = datetime.strptime(period_start, '%Y-%m-%d').isocalendar()
+        return f"{year:04d}-W{week:02d}"
+    if granularity == 'monthly':
+        return period_start[:7]
+    return period_start[:4]
+
+
+def _opening_balance(user_id, start_date):
+    # Balance of everything dated before the report starts
+    if start_date is None:
+        return Money(0)
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+    return balance_as_of(user_id, start_date - timedelta(days=1))
+
+
+def _cache_get(key, revision):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] != revision:
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_put(key, revision, rows):
+    with _cache_lock:
+        _cache[key] = (revision, rows)
+        _cache.move_to_end(key)
+        if len(_cache) > REPORT_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear_report_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+@timed
+def period_report(user_id, granularity='monthly', start_date=None, end_date=None):
+    """Income, expense, net and closing balance per period.
+
+    granularity is one of GRANULARITIES. Each row is a dict with period (a
+    label such as '2025-06' or '2025-W23'), start (ISO date of the period's
+    first day), income, expense, net, balance (Money) and txn_count. Periods
+    without transactions are included with zero totals.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+
+    key = (user_id, granularity, _iso(start_date), _iso(end_date))
+    with db_connection(user_id) as conn:
+        revision = user_revision(conn, user_id)
+        rows = _cache_get(key, revision)
+        if rows is None:
+            opening = _opening_balance(user_id, start_date)
+            query, params = report_query(user_id, granularity, start_date, end_date)
+            rows = tuple(
+                {
+                    'period': period_label(row['period_start'], granularity),
+                    'start': row['period_start'],
+                    'income': Money.from_cents(row['income']),
+                    'expense': Money.from_cents(row['expense']),
+                    'net': Money.from_cents(row['income'] - row['expense']),
+                    'balance': opening + Money.from_cents(row['running_net']),
+                    'txn_count': row['txn_count'],
+                }
+                for row in conn.execute(query, params)
+            )
+            _cache_put(key, revision, rows)
+    return [dict(row) for row in rows]
@@ -0,0 +1,58 @@
+from database import data_paths, database_path, get_pool, SPENDING_ROLLUP_SELECT
+
+
+def _user_paths(user_id):
+    # The one file holding user_id, or every file (every shard) for all users
+    return data_paths() if user_id is None else [database_path(user_id)]
+
+
+def rebuild_spending_rollup(user_id=None):
+    # Recomputes spending_rollup from the transactions table; returns the number of rows written.
+    written = 0
+    for path in _user_paths(user_id):
+        with get_pool(path).connection() as conn:
+            if user_id is None:
+                conn.execute("DELETE FROM spending_rollup")
+                cursor = conn.execute("INSERT INTO spending_rollup " + SPENDING_ROLLUP_SELECT)
+            else:
+                conn.execute("DELETE FROM spending_rollup WHERE user_id = ?", (user_id,))
+                cursor = conn.execute(
+                    "INSERT INTO spending_rollup SELECT * FROM (" + SPENDING_ROLLUP_SELECT + ") WHERE user_id = ?",
+                    (user_id,))
+            conn.commit()
+            written += cursor.rowcount
+    return written
+
+
+def verify_spending_rollup(user_id=None):
+    # Returns one dict per (user, category, month) where the rollup disagrees with the raw rows.
+    mismatches = [mismatch for path in _user_paths(user_id) for mismatch in _verify(path, user_id)]
+    return sorted(mismatches, key=lambda row: (row['user_id'], row['category'], row['year_month']))
+
+
+def _verify(path, user_id):
+    user_filter = "" if user_id is None else " WHERE user_id = ?"
+    params = () if user_id is None else (user_id, user_id)
+    with get_pool(path).connection() as conn:
+        rows = conn.execute(f"""
+            WITH raw AS (SELECT * FROM ({SPENDING_ROLLUP_SELECT}){user_filter}),
+                 rollup AS (SELECT * FROM spending_rollup{user_filter})
+            SELECT raw.user_id, raw.category, raw.year_month,
+                   raw.total_spent AS expected_total, raw.txn_count AS expected_count,
+                   rollup.total_spent AS actual_total, rollup.txn_count AS actual_count
+            FROM raw LEFT JOIN rollup
+              ON rollup.user_id = raw.user_id AND rollup.category = raw.category
+             AND rollup.year_month = raw.year_month
+            WHERE rollup.user_id IS NULL
+               OR rollup.txn_count != raw.txn_count
+               OR rollup.total_spent != raw.total_spent
+            UNION ALL
+            SELECT rollup.user_id, rollup.category, rollup.year_month,
+                   0, 0, rollup.total_spent, rollup.txn_count
+            FROM rollup LEFT JOIN raw
+              ON raw.user_id = rollup.user_id AND raw.category = rollup.category
+             AND raw.year_month = rollup.year_month
+            WHERE raw.user_id IS NULL
+            ORDER BY 1, 2, 3
+        """, params).fetchall()
+    return [dict(row) for row in rows]
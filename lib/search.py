@@ -0,0 +1,107 @@
+import re
+
+from database import data_paths, db_connection, get_pool
+from helper import date_range_clause
+from instrument import timed
+from money import Money
+from transaction import TRANSACTION_FILTERS
+
+SEARCH_LIMIT = 20
+SNIPPET_TOKENS = 12
+
+
+def fts_query(user_id, text):
+    # Turns free text into an FTS5 query over one user's rows: every word must
+    # match the description or category as a prefix, so "uber ride" finds "Uber
+    # rides home". Quoting each word keeps punctuation and FTS5 operators typed by
+    # the user from being parsed as query syntax.
+    words = ' '.join(f'"{word}"*' for word in re.findall(r'\w+', text))
+    return f'user_id : "{int(user_id)}" AND {{description category}} : ({words})'
+
+
+def search_filters_clause(filters):
+    filters = filters or {}
+    unknown = set(filters) - set(TRANSACTION_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown transaction filters: {', '.join(sorted(unknown))}")
+
+    year = filters.get('year')
+    clause, params = date_range_clause(
+        filters.get('month') if year else None, year or None,
+        filters.get('start_date'), filters.get('end_date'), column="t.date")
+    if filters.get('category'):
+        clause += " AND t.category = ?"
+        params.append(filters['category'])
+    return clause, params
+
+
+def search_index_exists(conn):
+    return conn.execute("""
+        SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transactions_fts'
+    """).fetchone() is not None
+
+
+def rebuild_search_index():
+    # Re-reads every description into the full-text index, e.g. after a bulk load
+    # that ran with the triggers dropped. Returns False when FTS5 is unavailable.
+    for path in data_paths():
+        with get_pool(path).connection() as conn:
+            if not search_index_exists(conn):
+                return False
+            conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+            conn.commit()
+    return True
+
+
+def _search_fts(conn, user_id, match, clause, params, limit, markers):
+    return conn.execute(f"""
+        SELECT t.transaction_id, t.amount, t.category, t.date, t.description,
+               snippet(transactions_fts, 0, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet
+        FROM transactions_fts
+        JOIN transactions t ON t.transaction_id = transactions_fts.rowid
+        WHERE transactions_fts MATCH ? AND t.user_id = ?{clause}
+        ORDER BY transactions_fts.rank
+        LIMIT ?
+    """, [markers[0], markers[1], match, user_id] + params + [limit]).fetchall()
+
+
+def _search_like(conn, user_id, words, clause, params, limit):
+    # Fallback for SQLite builds without FTS5: newest matches first, no ranking
+    conditions = " AND (t.description LIKE ? OR t.category LIKE ?)" * len(words)
+    patterns = [pattern for word in words for pattern in (f"%{word}%",) * 2]
+    return conn.execute(f"""
+        SELECT t.transaction_id, t.amount, t.category, t.date, t.description,
+               t.description AS snippet
+        FROM transactions t
+        WHERE t.user_id = ?{conditions}{clause}
+        ORDER BY t.date DESC, t.transaction_id DESC
+        LIMIT ?
+    """, [user_id] + patterns + params + [limit]).fetchall()
+
+
+@timed
+def search_transactions(user_id, query, filters=None, limit=SEARCH_LIMIT, markers=('[', ']')):
+    """Return up to limit of a user's transactions matching query, best first.
+
+    Every word in query must appear (as a word prefix) in the description or
+    category. filters takes the same keys as get_transactions_page. Each
+    result is a transaction dict plus 'snippet', the matching part of the
+    description with matched words wrapped in markers.
+    """
+    clause, params = search_filters_clause(filters)
+    words = re.findall(r'\w+', query or '')
+    if not words:
+        return []
+
+    with db_connection(user_id) as conn:
+        if search_index_exists(conn):
+            rows = _search_fts(conn, user_id, fts_query(user_id, query), clause, params, limit, markers)
+        else:
+            rows = _search_like(conn, user_id, words, clause, params, limit)
+
+    results = []
+    for row in rows:
+        result = dict(row)
+        result['amount'] = Money.from_cents(result['amount'])
+        results.append(result)
+    return results
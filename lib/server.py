@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Stdlib-only HTTP/JSON service over the tracker, e.g.
+
+    python lib/server.py --port 8080 --workers 32
+    python lib/cli.py serve --port 8080
+
+Endpoints (amounts are decimal strings such as "-12.50"):
+
+    GET    /users
+    GET    /users/<id>/transactions?page_size=&cursor=&month=&year=&start_date=&end_date=&category=
+    POST   /users/<id>/transactions                 {"amount", "category", "date", "description",
+                                                     "external_id", "allow_duplicate"}
+    DELETE /users/<id>/transactions/<transaction_id>
+    GET    /users/<id>/balance[?as_of=YYYY-MM-DD]
+    GET    /users/<id>/budgets
+    PUT    /users/<id>/budgets/<category>           {"limit"}
+    GET    /users/<id>/summary
+
+Connections are kept alive (HTTP/1.1) and served by a fixed pool of worker
+threads; writes go through the database writer queue. Per-user GET
+responses carry an ETag built from the user's revision counter, so a
+request with a matching If-None-Match costs one primary-key lookup and gets
+a 304, and recently built bodies are reused until the user's data changes.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import database
+from budget import get_budget_summary, set_budget_limit, update_budget_limit, validate_amount
+from ledger import balance_as_of
+from money import Money
+from records import Record
+from transaction import (
+    TRANSACTION_FILTERS,
+    delete_transaction,
+    get_transactions_page,
+    insert_transaction,
+    validate_transaction,
+)
+from users import get_all_users
+
+DEFAULT_WORKERS = 32
+KEEPALIVE_TIMEOUT = 5  # seconds an idle connection may hold a worker
+MAX_PAGE_SIZE = 500
+MAX_BODY_BYTES = 64 * 1024
+BODY_CACHE_SIZE = 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_default(value):
+    if isinstance(value, Money):
+        return str(value)
+    if isinstance(value, Record):
+        return dict(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _int_param(query, name, default=None):
+    value = query.get(name, default)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be an integer") from None
+
+
+# Route handlers take (user_id, *path_args, query=..., body=...) and return
+# (status, payload).
+
+def list_users(query, body):
+    return 200, get_all_users()
+
+
+def list_transactions(user_id, query, body):
+    page_size = min(_int_param(query, 'page_size', 50), MAX_PAGE_SIZE)
+    if page_size <= 0:
+        raise HTTPError(400, "page_size must be positive")
+    filters = {name: query[name] for name in TRANSACTION_FILTERS if name in query}
+    for name in ('month', 'year'):
+        if name in filters:
+            filters[name] = _int_param(filters, name)
+    transactions, next_cursor = get_transactions_page(user_id, filters, page_size, query.get('cursor'))
+    return 200, {'transactions': transactions, 'next_cursor': next_cursor}
+
+
+def create_transaction(user_id, query, body):
+    try:
+        row, error = validate_transaction(user_id, body.get('amount'), body.get('category'),
+                                          body.get('date'), body.get('description', ''))
+    except (TypeError, ValueError) as e:
+        row, error = None, f"Error: {e}"
+    if error:
+        raise HTTPError(400, error)
+    # A retried or double-submitted POST finds the first copy and is refused
+    transaction_id = insert_transaction(row, body.get('external_id'), bool(body.get('allow_duplicate')))
+    if transaction_id is None:
+        raise HTTPError(409, "An identical transaction is already recorded; "
+                             "send allow_duplicate to record it again")
+    return 201, {'transaction_id': transaction_id}
+
+
+def remove_transaction(user_id, transaction_id, query, body):
+    if not delete_transaction(int(transaction_id), user_id):
+        raise HTTPError(404, "Transaction not found")
+    return 200, {'deleted': int(transaction_id)}
+
+
+def get_balance(user_id, query, body):
+    return 200, {'user_id': user_id, 'as_of': query.get('as_of'),
+                 'balance': balance_as_of(user_id, query.get('as_of'))}
+
+
+def list_budgets(user_id, query, body):
+    return 200, get_budget_summary(user_id)
+
+
+def put_budget(user_id, category, query, body):
+    try:
+        limit = Money(body.get('limit'))
+    except (TypeError, ValueError):
+        limit = None
+    if limit is None or not validate_amount(limit):
+        raise HTTPError(400, "limit must be a positive amount")
+    category = unquote(category)
+    if set_budget_limit(user_id, category, limit):
+        return 201, {'category': category, 'limit': limit}
+    update_budget_limit(user_id, category, limit)
+    return 200, {'category': category, 'limit': limit}
+
+
+def get_summary(user_id, query, body):
+    return 200, {'user_id': user_id, 'balance': balance_as_of(user_id),
+                 'budgets': get_budget_summary(user_id)}
+
+
+# (method, path pattern, handler, cacheable); the first group of a /users/<id>
+# route is always the user id
+ROUTES = [
+    ('GET', r'/users', list_users, False),
+    ('GET', r'/users/(\d+)/transactions', list_transactions, True),
+    ('POST', r'/users/(\d+)/transactions', create_transaction, False),
+    ('DELETE', r'/users/(\d+)/transactions/(\d+)', remove_transaction, False),
+    ('GET', r'/users/(\d+)/balance', get_balance, True),
+    ('GET', r'/users/(\d+)/budgets', list_budgets, True),
+    ('PUT', r'/users/(\d+)/budgets/([^/]+)', put_budget, False),
+    ('GET', r'/users/(\d+)/summary', get_summary, True),
+]
+ROUTES = [(method, re.compile(pattern), handler, cacheable)
+          for method, pattern, handler, cacheable in ROUTES]
+
+
+class BodyCache:
+    """Small LRU of encoded response bodies keyed by (URL, ETag)."""
+
+    def __init__(self, max_size=BODY_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._items[key] = body
+            self._items.move_to_end(key)
+            if len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class TrackerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FinanceTracker/1.0'
+    timeout = KEEPALIVE_TIMEOUT
+    # Headers and body are separate writes; without TCP_NODELAY the body waits
+    # for the client's delayed ACK (~40 ms) on every kept-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def dispatch(self, method):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            body = self.read_body()
+            matches = [(route_method, match, handler, cacheable)
+                       for route_method, pattern, handler, cacheable in ROUTES
+                       for match in [pattern.fullmatch(url.path)] if match]
+            if not matches:
+                raise HTTPError(404, f"No route for {url.path}")
+            route = next((route for route in matches if route[0] == method), None)
+            if route is None:
+                raise HTTPError(405, f"{method} not allowed on {url.path}")
+            _, match, handler, cacheable = route
+            args = [int(match.group(1))] + list(match.groups()[1:]) if match.groups() else []
+
+            if not cacheable:
+                status, payload = handler(*args, query=query, body=body)
+                self.send_json(status, json.dumps(payload, default=_json_default).encode())
+                return
+
+            etag = self.etag(args[0])
+            if etag in self.if_none_match():
+                self.send_json(304, None, etag)
+                return
+            key = (self.path, etag)
+            encoded = self.server.cache.get(key)
+            if encoded is None:
+                status, payload = handler(*args, query=query, body=body)
+                encoded = json.dumps(payload, default=_json_default).encode()
+                self.server.cache.put(key, encoded)
+            self.send_json(200, encoded, etag)
+        except HTTPError as e:
+            self.send_json(e.status, json.dumps({'error': str(e)}).encode())
+        except ValueError as e:
+            # Bad cursors, filters and dates are rejected by the library with ValueError
+            self.send_json(400, json.dumps({'error': str(e)}).encode())
+        except Exception as e:
+            self.log_error("Error handling %s %s: %r", method, self.path, e)
+            self.send_json(500, json.dumps({'error': 'Internal server error'}).encode())
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise HTTPError(413, "Request body too large")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON") from None
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return body
+
+    def etag(self, user_id):
+        # Responses depend on the user's data and, for month-based figures, the date
+        with database.db_connection(user_id) as conn:
+            revision = database.user_revision(conn, user_id)
+        return f'"{user_id}-{revision}-{date.today().isoformat()}"'
+
+    def if_none_match(self):
+        header = self.headers.get('If-None-Match', '')
+        return {tag.strip() for tag in header.split(',') if tag.strip()}
+
+    def send_json(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        else:
+            self.send_header('Content-Length', '0')
+        self.end_headers()
+        if body is not None:
+            self.wfile.write(body)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each accepted connection to a fixed worker pool.
+
+    A kept-alive connection occupies its worker until the client closes it
+    or it sits idle for KEEPALIVE_TIMEOUT; further connections queue.
+    """
+
+    request_queue_size = 128
+
+    def __init__(self, address, handler=TrackerHandler, workers=DEFAULT_WORKERS, verbose=False):
+        super().__init__(address, handler)
+        self.verbose = verbose
+        self.cache = BodyCache()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='finance-http')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_worker, request, client_address)
+
+    def process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def make_server(host='127.0.0.1', port=8080, workers=DEFAULT_WORKERS, verbose=False):
+    database.setup_database()
+    # Request threads write concurrently, so use WAL and the group-committing writer
+    database.enable_concurrency()
+    return PooledHTTPServer((host, port), TrackerHandler, workers, verbose)
+
+
+def serve(host='127.0.0.1', port=8080, workers=DEFAULT_WORKERS, verbose=False):
+    server = make_server(host, port, workers, verbose)
+    print(f"Serving on http://{host}:{server.server_address[1]} with {workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        database.close_pools()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the finance tracker as JSON over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--db', help='Database file (default: %(default)s)', default=database.DB_PATH)
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args(argv)
+
+    database.set_database_path(args.db)
+    serve(args.host, args.port, args.workers, args.verbose)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
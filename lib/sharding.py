@@ -0,0 +1,344 @@
+"""
+Sharded storage: users spread across several SQLite files.
+
+With FINANCE_TRACKER_SHARDS=N (or database.enable_sharding(N)) each user's
+rows live in one of N shard files beside DB_PATH, and DB_PATH itself holds
+only the shard directory: which shard each user is on, plus the counter that
+hands out user ids. Every shard has its own write lock (and its own writer
+thread in concurrency mode), so writes for users on different shards never
+wait for each other.
+
+database.db_connection(user_id) and run_write(job, user_id) route through
+shard_for(); operations over every user (listing users, rebuilding the
+rollup, materializing recurring rules, budget alerts) visit each file in
+database.data_paths() and merge the results. move_user() relocates one user
+to another shard while the application keeps running.
+"""
+
+import os
+import sqlite3
+import threading
+
+import database
+from instrument import timed
+
+# Tables copied by move_user(), in copy order; the spending rollup, balance
+# checkpoints, revisions and search index follow from the target's triggers
+USER_TABLES = ('users', 'recurring_rules', 'transactions', 'budgets', 'alert_state')
+# Ids that are per shard, so the target shard assigns new ones on a move
+ID_COLUMNS = {'recurring_rules': 'rule_id', 'transactions': 'transaction_id', 'budgets': 'budget_id'}
+DERIVED_TABLES = ('spending_rollup', 'balance_checkpoints', 'user_revisions')
+
+
+def catalog_001_shard_directory(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS shard_config (
+            key VARCHAR(50) PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+    # AUTOINCREMENT makes this the one source of user ids across all shards
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS shard_directory (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            shard INTEGER NOT NULL,
+            moved_at TIMESTAMP
+        )
+    """)
+
+
+# Applied to DB_PATH only; the shards get database.MIGRATIONS. The directory's
+# version is stored in shard_config under CATALOG_VERSION_KEY, not in PRAGMA
+# user_version, which numbers database.MIGRATIONS; a data file and a directory
+# can then never be mistaken for each other.
+CATALOG_MIGRATIONS = [
+    catalog_001_shard_directory,
+]
+CATALOG_VERSION_KEY = 'catalog_version'
+
+
+def shard_path(index):
+    base, ext = os.path.splitext(database.DB_PATH)
+    return f"{base}.shard{index:02d}{ext or '.db'}"
+
+
+def home_shard(user_id, count=None):
+    # Where a user is placed when created; user 1 (the seeded default user) lands on shard 0
+    return (user_id - 1) % (count or database.SHARDS)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {database.BUSY_TIMEOUT_MS}")
+    return conn
+
+
+class ShardRouter:
+    """Cached user -> shard lookups against the shard directory in DB_PATH.
+
+    The cache is dropped whenever another connection commits to the directory
+    (PRAGMA data_version changes), e.g. when move_user() runs in another
+    process. Users missing from the directory are on their home shard.
+    """
+
+    def __init__(self, path, count):
+        self.path = path
+        self.count = count
+        self._conn = _connect(path)
+        self._lock = threading.Lock()
+        self._shards = {}
+        self._version = None
+
+    def shard_for(self, user_id):
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._version:
+                self._shards.clear()
+                self._version = version
+            shard = self._shards.get(user_id)
+            if shard is None:
+                row = self._conn.execute(
+                    "SELECT shard FROM shard_directory WHERE user_id = ?", (user_id,)).fetchone()
+                shard = self._shards[user_id] = row[0] if row else home_shard(user_id, self.count)
+            return shard
+
+    def allocate_user_id(self):
+        # Reserves the next user id and records its home shard
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                user_id = self._conn.execute(
+                    "INSERT INTO shard_directory (shard) VALUES (-1)").lastrowid
+                shard = home_shard(user_id, self.count)
+                self._conn.execute("UPDATE shard_directory SET shard = ? WHERE user_id = ?",
+                                   (shard, user_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._shards[user_id] = shard
+            return user_id
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    global _router
+    with _router_lock:
+        if _router is None or _router.path != database.DB_PATH or _router.count != database.SHARDS:
+            if _router is not None:
+                _router.close()
+            _router = ShardRouter(database.DB_PATH, database.SHARDS)
+        return _router
+
+
+def close_router():
+    global _router
+    with _router_lock:
+        router, _router = _router, None
+    if router is not None:
+        router.close()
+
+
+def shard_for(user_id):
+    return get_router().shard_for(user_id)
+
+
+def allocate_user_id():
+    return get_router().allocate_user_id()
+
+
+def _catalog_version(conn, path):
+    # Applied catalog migrations; raises if path holds an unsharded database
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if 'transactions' in tables:
+        raise RuntimeError(f"{path} is an unsharded database; sharding can only be enabled "
+                           f"on a new database file")
+    if 'shard_config' not in tables:
+        return 0
+    row = conn.execute("SELECT value FROM shard_config WHERE key = ?", (CATALOG_VERSION_KEY,)).fetchone()
+    return row[0] if row else 0
+
+
+def migrate_catalog(path=None):
+    """Bring the shard directory at path (default DB_PATH) up to date; returns the migrations applied.
+
+    Raises RuntimeError if path is an existing unsharded database.
+    """
+    path = path or database.DB_PATH
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    conn = _connect(path)
+    try:
+        if _catalog_version(conn, path) >= len(CATALOG_MIGRATIONS):
+            return []
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            pending = CATALOG_MIGRATIONS[_catalog_version(conn, path):]
+            for migration in pending:
+                migration(cursor)
+            if pending:
+                cursor.execute("INSERT OR REPLACE INTO shard_config (key, value) VALUES (?, ?)",
+                               (CATALOG_VERSION_KEY, len(CATALOG_MIGRATIONS)))
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        return [migration.__name__ for migration in pending]
+    finally:
+        conn.close()
+
+
+def _drop_default_user(path):
+    # migration_003 seeds user 1 into every file; only its home shard keeps it
+    conn = _connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for table in ('budgets', 'users') + DERIVED_TABLES:
+            conn.execute(f"DELETE FROM {table} WHERE user_id = 1")
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def setup_shards():
+    """Create or migrate the shard directory and every shard; returns the migrations applied.
+
+    Raises RuntimeError if the directory was created with a different shard count,
+    or if DB_PATH already holds an unsharded database.
+    """
+    count = database.SHARDS
+    applied = migrate_catalog()
+    conn = _connect(database.DB_PATH)
+    try:
+        stored = conn.execute("SELECT value FROM shard_config WHERE key = 'shards'").fetchone()
+        if stored is None:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT OR IGNORE INTO shard_config (key, value) VALUES ('shards', ?)", (count,))
+            conn.execute("INSERT OR IGNORE INTO shard_directory (user_id, shard) VALUES (1, ?)",
+                         (home_shard(1, count),))
+            stored = conn.execute("SELECT value FROM shard_config WHERE key = 'shards'").fetchone()
+            conn.execute("COMMIT")
+        stored = stored[0]
+    finally:
+        conn.close()
+    if stored != count:
+        raise RuntimeError(f"{database.DB_PATH} is split into {stored} shards, not {count}")
+
+    for index in range(count):
+        path = shard_path(index)
+        done = database.migrate(path)
+        if 'migration_003_default_data' in done and index != home_shard(1, count):
+            _drop_default_user(path)
+        applied += done
+    return applied
+
+
+def _copy_rows(source, target, table, user_id, rule_ids):
+    # Copies a user's rows in id order, letting the target assign new ids; rule_ids
+    # collects old -> new rule ids so copied transactions keep pointing at their rule
+    id_column = ID_COLUMNS.get(table)
+    order = f" ORDER BY {id_column}" if id_column else ""
+    cursor = source.execute(f"SELECT * FROM {table} WHERE user_id = ?{order}", (user_id,))
+    columns = [column[0] for column in cursor.description]
+    keep = [i for i, column in enumerate(columns) if column != id_column]
+    insert = (f"INSERT INTO {table} ({', '.join(columns[i] for i in keep)}) "
+              f"VALUES ({', '.join('?' * len(keep))})")
+    if table == 'recurring_rules':
+        rows = cursor.fetchall()
+        for row in rows:
+            rule_ids[row[columns.index(id_column)]] = target.execute(insert, [row[i] for i in keep]).lastrowid
+        return len(rows)
+    rule_index = columns.index('rule_id') if 'rule_id' in columns else None
+    rows = []
+    for row in cursor:
+        values = [row[i] for i in keep]
+        if rule_index is not None and row[rule_index] is not None:
+            values[keep.index(rule_index)] = rule_ids.get(row[rule_index])
+        rows.append(values)
+    return target.executemany(insert, rows).rowcount
+
+
+def _delete_user_rows(conn, user_id, tables):
+    for table in tables:
+        conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+
+
+@timed
+def move_user(user_id, target_shard):
+    """Move a user's rows to target_shard; returns the number of rows copied.
+
+    Writes to the source shard wait while the rows are copied (reads carry
+    on). The shard directory is switched before the source shard commits, so
+    a writer that was waiting on the old shard finds the user gone, is
+    refused by the moved_users trigger and run_write() retries it on the new
+    shard. Transaction, budget and rule ids are reassigned by the target
+    shard (in their original order), so export cursors issued before the move
+    no longer apply.
+    """
+    count = database.SHARDS
+    if not 0 <= target_shard < count:
+        raise ValueError(f"target shard must be between 0 and {count - 1}")
+    source_shard = shard_for(user_id)
+    if source_shard == target_shard:
+        return 0
+
+    source = _connect(shard_path(source_shard))
+    target = _connect(shard_path(target_shard))
+    catalog = _connect(database.DB_PATH)
+    try:
+        source.execute("BEGIN IMMEDIATE")
+        target.execute("BEGIN IMMEDIATE")
+        try:
+            if source.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is None:
+                raise ValueError(f"User {user_id} not found on shard {source_shard}")
+            revision = database.user_revision(source, user_id)
+
+            # Clears the tombstone and any partial copy left by an earlier move
+            target.execute("DELETE FROM moved_users WHERE user_id = ?", (user_id,))
+            _delete_user_rows(target, user_id, USER_TABLES[::-1] + DERIVED_TABLES)
+            rule_ids = {}
+            copied = sum(_copy_rows(source, target, table, user_id, rule_ids) for table in USER_TABLES)
+            # Carries the revision forward so cached results and ETags from the source stay stale
+            target.execute("""
+                INSERT INTO user_revisions (user_id, revision) VALUES (?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET revision = revision + excluded.revision
+            """, (user_id, revision + 1))
+
+            _delete_user_rows(source, user_id, USER_TABLES[::-1] + DERIVED_TABLES)
+            source.execute("INSERT OR REPLACE INTO moved_users (user_id, shard) VALUES (?, ?)",
+                           (user_id, target_shard))
+
+            target.execute("COMMIT")
+            catalog.execute("""
+                INSERT INTO shard_directory (user_id, shard, moved_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (user_id) DO UPDATE SET shard = excluded.shard, moved_at = excluded.moved_at
+            """, (user_id, target_shard))
+            source.execute("COMMIT")
+        except Exception:
+            for conn in (source, target):
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            raise
+    finally:
+        for conn in (source, target, catalog):
+            conn.close()
+    return copied
+
+
+@timed
+def shard_stats():
+    # One dict per shard: its file, user count and transaction count
+    stats = []
+    for index, path in enumerate(database.data_paths()):
+        with database.get_pool(path).connection() as conn:
+            users = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+            transactions = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+        stats.append({'shard': index, 'path': path, 'users': users, 'transactions': transactions})
+    return stats
@@ -0,0 +1,143 @@
+"""
+Month-end statements for every user, built in parallel.
+
+run_statements() splits the users into batches and hands them to a pool of
+worker processes. Each worker switches its connection pool to read-only
+(database.enable_read_only()), builds the statements in its batch from
+balance_as_of, budget_summary and fetch_transactions, and writes
+each one to its own JSON file as soon as it is ready, so memory use does not
+depend on the number of users. A user whose statement fails is reported and
+the rest of the batch carries on. The helpers used here raise on database
+errors rather than returning zero or an empty list, so a statement is
+either complete or reported as failed.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+
+import database
+from budget import budget_summary
+from instrument import timed
+from ledger import balance_as_of
+from transaction import fetch_transactions
+from users import get_all_users
+
+STATEMENT_BATCH_SIZE = 50
+
+
+def previous_month(today=None):
+    # (month, year) of the last complete month
+    first = (today or date.today()).replace(day=1)
+    last = first - timedelta(days=1)
+    return last.month, last.year
+
+
+def statement_path(output_dir, user_id, month, year):
+    return os.path.join(output_dir, f"statement-{year:04d}-{month:02d}-user{user_id}.json")
+
+
+def build_statement(user, month, year):
+    """Return one user's statement for a month as a JSON-ready dict."""
+    user_id = user['user_id']
+    first = date(year, month, 1)
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return {
+        'user_id': user_id,
+        'name': user['name'],
+        'period': f"{year:04d}-{month:02d}",
+        'opening_balance': str(balance_as_of(user_id, first - timedelta(days=1))),
+        'closing_balance': str(balance_as_of(user_id, following - timedelta(days=1))),
+        'budgets': [{**item, 'limit': None if item['limit'] is None else str(item['limit']),
+                     'spent': str(item['spent'])}
+                    for item in budget_summary(user_id)],
+        'transactions': [{**transaction, 'amount': str(transaction['amount'])}
+                         for transaction in fetch_transactions(user_id, month, year)],
+    }
+
+
+def write_statement(path, statement):
+    # Written beside the target and renamed over it, so a reader never sees half a file
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(statement, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def _init_worker(db_path, shards):
+    # Runs once in each worker process: its own pools, opened read-only
+    database.set_database_path(db_path)
+    if shards:
+        database.enable_sharding(shards)
+    database.enable_read_only()
+
+
+def _write_batch(users, month, year, output_dir):
+    # Returns (pid, seconds, written paths, [(user_id, error), ...]) for one batch
+    started = time.perf_counter()
+    written = []
+    failed = []
+    for user in users:
+        try:
+            path = statement_path(output_dir, user['user_id'], month, year)
+            write_statement(path, build_statement(user, month, year))
+            written.append(path)
+        except Exception as e:
+            failed.append((user['user_id'], f"{type(e).__name__}: {e}"))
+    return os.getpid(), time.perf_counter() - started, written, failed
+
+
+@timed
+def run_statements(output_dir, month=None, year=None, workers=None, user_ids=None,
+                   batch_size=STATEMENT_BATCH_SIZE, progress=None):
+    """Write a statement file per user for a month (default: the last complete month).
+
+    Users (all of them, or just user_ids) are processed batch_size at a time
+    on `workers` processes (default: one per CPU); workers=1 runs in this
+    process. progress(done, total) is called after each batch. Returns
+    {'written': n, 'failed': [(user_id, error)], 'seconds': wall time,
+    'workers': {pid: {'statements': n, 'seconds': busy time}}}.
+    """
+    if month is None or year is None:
+        month, year = previous_month()
+    if not 1 <= month <= 12:
+        raise ValueError("month must be between 1 and 12")
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    workers = workers or os.cpu_count() or 1
+
+    users = get_all_users()
+    if user_ids is not None:
+        wanted = set(user_ids)
+        users = [user for user in users if user['user_id'] in wanted]
+    batches = [users[i:i + batch_size] for i in range(0, len(users), batch_size)]
+    os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    result = {'written': 0, 'failed': [], 'seconds': 0.0, 'workers': {}}
+
+    def record(pid, seconds, written, failed):
+        stats = result['workers'].setdefault(pid, {'statements': 0, 'seconds': 0.0})
+        stats['statements'] += len(written)
+        stats['seconds'] += seconds
+        result['written'] += len(written)
+        result['failed'] += failed
+        if progress:
+            progress(result['written'] + len(result['failed']), len(users))
+
+    if workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            record(*_write_batch(batch, month, year, output_dir))
+    else:
+        # Connections must not be inherited by forked workers; each opens its own
+        database.close_pools()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(database.DB_PATH, database.SHARDS)) as executor:
+            futures = [executor.submit(_write_batch, batch, month, year, output_dir)
+                       for batch in batches]
+            for future in as_completed(futures):
+                record(*future.result())
+    result['seconds'] = time.perf_counter() - started
+    return result
@@ -1,69 +1,184 @@
-from datetime import datetime, date
-from database import get_db_connection
-from helper import check_transaction_budget_impact, check_current_budget_status, get_budget_limit, get_spending_by_category
+import base64
+import json
+from datetime import datetime, date, timedelta
+from itertools import count, islice
+from database import db_connection, run_write
+from dedup import OccurrenceCounter, row_fingerprint
+from ledger import balance_as_of
+from recurring import projected_total
+from money import Money
+from records import Transaction, TransactionBatch
+from instrument import count_rows, timed
+from helper import check_transaction_budget_impact, check_current_budget_status, get_budget_limit, get_spending_by_category, date_range_clause
 
 
-def save_transaction(user_id, amount, category, date_input, description=''):
+BULK_CHUNK_SIZE = 1000
+
+
+def validate_transaction(user_id, amount, category, date_input, description=''):
+    # Returns (row, None) with the values ready for INSERT, or (None, error message).
+    if user_id <= 0:
+        return None, "Error:Invalid user id"
     try:
-        if user_id <= 0:
-            print("Error:Invalid user id")
-            return False
-        if amount == 0:
-            print("Error: Amount cannot be zero")
-            return False
-        if not category.strip():
-            print("Error: Category cannot be empty")
-            return False
+        amount = Money(amount)
+    except ValueError:
+        return None, f"Error: Invalid amount '{amount}'"
+    if amount == 0:
+        return None, "Error: Amount cannot be zero"
+    if not category or not category.strip():
+        return None, "Error: Category cannot be empty"
 
-        if isinstance(date_input, str):
-            try:
-                transaction_date = datetime.strptime(
-                    date_input, '%Y-%m-%d').date()
-            except ValueError as e:
-                print(
-                    f"Error: Invalid date format. Use YYYY-MM-DD. Details: {e}")
-                return False
-        elif isinstance(date_input, date):
-            transaction_date = date_input
-        else:
-            print("Error: Date must be a string (YYYY-MM-DD) or date object")
+    if isinstance(date_input, str):
+        try:
+            transaction_date = datetime.strptime(
+                date_input, '%Y-%m-%d').date()
+        except ValueError as e:
+            return None, f"Error: Invalid date format. Use YYYY-MM-DD. Details: {e}"
+    elif isinstance(date_input, date):
+        transaction_date = date_input
+    else:
+        return None, "Error: Date must be a string (YYYY-MM-DD) or date object"
+
+    return (user_id, amount.cents, category.strip(), transaction_date.isoformat(),
+            (description or '').strip()), None
+
+
+INSERT_TRANSACTION = """
+    INSERT INTO transactions (user_id, amount, category, date, description, fingerprint)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, fingerprint) WHERE fingerprint IS NOT NULL DO NOTHING
+"""
+
+DUPLICATE_MESSAGE = "Error: An identical transaction is already recorded; it was not saved again."
+
+
+def insert_transaction(row, external_id=None, allow_duplicate=False):
+    # Inserts a row returned by validate_transaction and returns its transaction_id, or
+    # None if the user already has the same transaction (see dedup.py). allow_duplicate
+    # records it anyway, as the next occurrence of that fingerprint.
+    def insert(conn, fingerprint):
+        cursor = conn.execute(INSERT_TRANSACTION, row + (fingerprint,))
+        return cursor.lastrowid if cursor.rowcount else None
+
+    for occurrence in count():
+        fingerprint = row_fingerprint(row, external_id, occurrence)
+        transaction_id = run_write(lambda conn: insert(conn, fingerprint), user_id=row[0])
+        if transaction_id is not None or not allow_duplicate:
+            return transaction_id
+
+
+def find_duplicate(user_id, amount, category, date_input, description=''):
+    # transaction_id of an already recorded identical transaction, or None
+    row, error = validate_transaction(user_id, amount, category, date_input, description)
+    if error:
+        return None
+    with db_connection(user_id) as conn:
+        found = conn.execute("SELECT transaction_id FROM transactions WHERE user_id = ? AND fingerprint = ?",
+                             (user_id, row_fingerprint(row))).fetchone()
+    return found[0] if found else None
+
+
+@timed
+def save_transaction(user_id, amount, category, date_input, description='', allow_duplicate=False):
+    try:
+        row, error = validate_transaction(
+            user_id, amount, category, date_input, description)
+        if error:
+            print(error)
             return False
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO transactions (user_id, amount, category, date, description)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, amount, category.strip(), transaction_date, description.strip()))
-        conn.commit()
-        conn.close()
+        if insert_transaction(row, allow_duplicate=allow_duplicate) is None:
+            print(DUPLICATE_MESSAGE)
+            return False
         print("Transaction saved successfully")
         return True
     except Exception as e:
         print(f"Error saving transaction:{e}")
         return False
 
+
+def _bulk_row_fields(row):
+    if isinstance(row, dict):
+        return (row.get('amount'), row.get('category'), row.get('date'),
+                row.get('description') or '', row.get('external_id') or None)
+    row = tuple(row)
+    return row[:4] + ('',) * (4 - len(row)) + (row[4] if len(row) > 4 else None,)
+
+
+@timed
+def save_transactions_bulk(user_id, rows, chunk_size=BULK_CHUNK_SIZE):
+    """Insert many transactions for one user in a single database transaction.
+
+    ``rows`` may be any iterable (including a generator) of dicts with
+    amount/category/date/description[/external_id] keys or of (amount,
+    category, date[, description[, external_id]]) tuples. Rows are validated
+    and inserted ``chunk_size`` at a time, so memory stays bounded regardless
+    of input size. Invalid rows are skipped and reported by their 1-based
+    position in ``rows``. Rows the user already has (see dedup.py), e.g. from
+    importing the same file twice, are skipped and counted as duplicates.
+    """
+    report = {'inserted': 0, 'duplicates': 0, 'failed': 0, 'errors': []}
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    rows = iter(rows)
+    position = 0
+    with db_connection(user_id) as conn:
+        occurrences = OccurrenceCounter(conn)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            valid = []
+            for raw in chunk:
+                position += 1
+                try:
+                    amount, category, date_input, description, external_id = _bulk_row_fields(raw)
+                    values, error = validate_transaction(
+                        user_id, amount, category, date_input, description)
+                except (TypeError, ValueError) as e:
+                    values, error = None, f"Error: Malformed row: {e}"
+                if error:
+                    report['failed'] += 1
+                    report['errors'].append({'row': position, 'error': error})
+                else:
+                    valid.append((values, external_id))
+
+            valid = [values + (fingerprint,)
+                     for (values, _), fingerprint in zip(valid, occurrences.fingerprints(valid))]
+            inserted = conn.executemany(INSERT_TRANSACTION, valid).rowcount
+            report['inserted'] += inserted
+            report['duplicates'] += len(valid) - inserted
+        conn.commit()
+        occurrences.close()
+    return report
+
 # result = save_transaction(1, 2000, "Fare", "2025-04-18", "Transport")
 # print(result)
 
 
-def save_transaction_with_budget_alert(user_id, amount, category, date_input, description=''):
-    if amount < 0:
-        print("Checking budget impact...")
-        impact = check_transaction_budget_impact(user_id, category, amount)
-        print(f"Impact: {impact}")
-        if impact == "OVER":
-            print(
-                f"WARNING: This transaction will exceed your {category} budget!")
-        elif impact == "WARNING":
-            print(
-                f"CAUTION: This transaction will put you near your {category} budget limit!")
-    result = save_transaction(
-        user_id, amount, category, date_input, description)
-    if result and amount < 0:
-        print("Checking current budget status...")
-        current_status = check_current_budget_status(user_id, category)
-        print(f" {category} budget status: {current_status}")
+@timed
+def save_transaction_with_budget_alert(user_id, amount, category, date_input, description='',
+                                       allow_duplicate=False):
+    # Holds one pooled connection so the checks and the insert below share it.
+    with db_connection(user_id):
+        if amount < 0:
+            print("Checking budget impact...")
+            impact = check_transaction_budget_impact(user_id, category, amount)
+            print(f"Impact: {impact}")
+            if impact == "OVER":
+                print(
+                    f"WARNING: This transaction will exceed your {category} budget!")
+            elif impact == "WARNING":
+                print(
+                    f"CAUTION: This transaction will put you near your {category} budget limit!")
+        result = save_transaction(
+            user_id, amount, category, date_input, description, allow_duplicate)
+        if result and amount < 0:
+            print("Checking current budget status...")
+            current_status = check_current_budget_status(user_id, category)
+            print(f" {category} budget status: {current_status}")
 
     return result
 
@@ -83,104 +198,191 @@ def save_transaction_with_budget_alert(user_id, amount, category, date_input, de
 # print(result)
 
 
-def get_all_transactions(user_id, month=None, year=None):
+def transactions_query(user_id, month=None, year=None, start_date=None, end_date=None):
+    query = """
+        SELECT transaction_id, amount, category, date, description
+        FROM transactions WHERE user_id = ?
+    """
+    clause, params = date_range_clause(
+        month if year else None, year or None, start_date, end_date)
+    query += clause + " ORDER BY date DESC, created_at DESC, transaction_id DESC"
+    return query, [user_id] + params
+
+
+def _transaction_dict(row):
+    transaction = dict(row)
+    transaction['amount'] = Money.from_cents(transaction['amount'])
+    return transaction
+
+
+def fetch_transactions(user_id, month=None, year=None, start_date=None, end_date=None, batch=False):
+    # get_all_transactions without the argument checks; database errors propagate.
+    query, params = transactions_query(
+        user_id, month, year, start_date, end_date)
+    with db_connection(user_id) as conn:
+        cursor = conn.execute(query, params)
+        # Plain tuples; the records replace the per-row sqlite3.Row
+        cursor.row_factory = None
+        if batch:
+            result = TransactionBatch.from_rows(cursor)
+        else:
+            # Categories and dates repeat across rows, so each distinct value is stored once
+            shared = {}.setdefault
+            result = [Transaction(transaction_id, cents, shared(category, category), shared(day, day),
+                                  description)
+                      for transaction_id, cents, category, day, description in cursor]
+    count_rows(len(result))
+    return result
+
+
+@timed
+def get_all_transactions(user_id, month=None, year=None, start_date=None, end_date=None, batch=False):
+    # start_date is inclusive and end_date exclusive (YYYY-MM-DD strings or date objects).
+    # Returns a list of Transaction records, or one TransactionBatch when batch is set.
+    empty = TransactionBatch() if batch else []
     try:
         if user_id <= 0:
             print("Error: User ID must be positive")
-            return []
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        query = """
-            SELECT transaction_id, amount, category, date, description
-            FROM transactions WHERE user_id = ?
-        """
-        params = [user_id]
-
-        if month is not None and year is not None:
-            if not (1 <= month <= 12):
-                print("Error: Month must be between 1 and 12")
-                return []
-            query += " AND strftime('%m', date) = ? AND strftime('%Y', date) = ?"
-            params.extend([f"{month:02d}", str(year)])
-        elif year:
-            query += " AND strftime('%Y', date) = ?"
-            params.append(str(year))
-
-        query += " ORDER BY date DESC, created_at DESC"
-        cursor.execute(query, params)
-        transactions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return transactions
+            return empty
+
+        if month is not None and year is not None and not (1 <= month <= 12):
+            print("Error: Month must be between 1 and 12")
+            return empty
+
+        return fetch_transactions(user_id, month, year, start_date, end_date, batch)
     except Exception as e:
         print(f"Database error: {e}")
-        return []
+        return empty
 # transactions = get_all_transactions(-1)
 # transactions = get_all_transactions(1, 0,0)
 # print(transactions)
 
 
-def calculate_balance(user_id):
+PAGE_SIZE = 500
+TRANSACTION_FILTERS = ('month', 'year', 'start_date', 'end_date', 'category')
+
+
+def encode_cursor(transaction):
+    # Opaque token for the position just after this row in (date, created_at, id) order.
+    key = [transaction['date'], transaction['created_at'], transaction['transaction_id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(token):
+    try:
+        day, created_at, transaction_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return str(day), str(created_at), int(transaction_id)
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid page cursor: {token!r}") from None
+
+
+def page_query(user_id, filters=None, page_size=PAGE_SIZE, cursor=None):
+    filters = filters or {}
+    unknown = set(filters) - set(TRANSACTION_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown transaction filters: {', '.join(sorted(unknown))}")
+
+    query = """
+        SELECT transaction_id, amount, category, date, description, created_at
+        FROM transactions WHERE user_id = ?
+    """
+    year = filters.get('year')
+    clause, params = date_range_clause(
+        filters.get('month') if year else None, year or None,
+        filters.get('start_date'), filters.get('end_date'))
+    query += clause
+    params = [user_id] + params
+    if filters.get('category'):
+        query += " AND category = ?"
+        params.append(filters['category'])
+    if cursor is not None:
+        # Keyset pagination: seek past the last row seen instead of using OFFSET
+        query += " AND (date, created_at, transaction_id) < (?, ?, ?)"
+        params.extend(decode_cursor(cursor))
+    query += " ORDER BY date DESC, created_at DESC, transaction_id DESC LIMIT ?"
+    params.append(page_size + 1)
+    return query, params
+
+
+@timed
+def get_transactions_page(user_id, filters=None, page_size=50, cursor=None):
+    """Return (transactions, next_cursor) for one page, newest first.
+
+    filters may contain month, year, start_date, end_date and category.
+    Pass next_cursor back in to fetch the following page; it is None on the
+    last page. Each page costs an index seek regardless of how deep it is.
+    """
+    if page_size <= 0:
+        raise ValueError("page_size must be positive")
+    query, params = page_query(user_id, filters, page_size, cursor)
+    with db_connection(user_id) as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return [_transaction_dict(row) for row in rows[:page_size]], next_cursor
+
+
+def iter_transactions(user_id, filters=None, page_size=PAGE_SIZE):
+    # Yields transactions one at a time, holding at most one page in memory and
+    # no connection between pages.
+    cursor = None
+    while True:
+        page, cursor = get_transactions_page(user_id, filters, page_size, cursor)
+        yield from page
+        if cursor is None:
+            return
+
+
+@timed
+def calculate_balance(user_id, as_of=None, include_projected=False):
+    # as_of (YYYY-MM-DD or date) limits the balance to transactions dated on or before it.
+    # include_projected adds recurring occurrences up to as_of (or today) not yet written.
     try:
         if user_id <= 0:
             print("Error: User ID must be positive")
-            return 0.0
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT COALESCE(SUM(amount), 0) as balance
-            FROM transactions WHERE user_id = ?
-        """, (user_id,))
-        balance = float(cursor.fetchone()['balance'])
-        conn.close()
+            return Money(0)
+        balance = balance_as_of(user_id, as_of)
+        if include_projected:
+            through = datetime.strptime(as_of, '%Y-%m-%d').date() if isinstance(as_of, str) else as_of
+            balance += Money.from_cents(
+                projected_total(user_id, end_date=(through or date.today()) + timedelta(days=1)))
         return balance
     except:
-        return 0.0
+        return Money(0)
 
 
+@timed
 def get_recent_transactions(user_id, limit=5):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT transaction_id, amount, category, date, description
-            FROM transactions WHERE user_id = ?
-            ORDER BY date DESC, created_at DESC LIMIT ?
-        """, (user_id, limit))
-        transactions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        with db_connection(user_id) as conn:
+            cursor = conn.execute("""
+                SELECT transaction_id, amount, category, date, description
+                FROM transactions WHERE user_id = ?
+                ORDER BY date DESC, created_at DESC, transaction_id DESC LIMIT ?
+            """, (user_id, limit))
+            cursor.row_factory = None
+            transactions = [Transaction(*row) for row in cursor]
+        count_rows(len(transactions))
         return transactions
     except:
         return []
 
 
+@timed
 def delete_transaction(transaction_id, user_id):
     try:
         if transaction_id <= 0 or user_id <= 0:
             print("Error: Invalid transaction ID or user ID")
             return False
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Check if transaction exists and belongs to the user
-        cursor.execute("""
-            SELECT * FROM transactions WHERE transaction_id = ? AND user_id = ?
-        """, (transaction_id, user_id))
-        transaction = cursor.fetchone()
-        if not transaction:
+        # The user check is part of the DELETE, so no row means not found or not theirs
+        deleted = run_write(lambda conn: conn.execute("""
+            DELETE FROM transactions WHERE transaction_id = ? AND user_id = ?
+        """, (transaction_id, user_id)).rowcount, user_id=user_id)
+        if not deleted:
             print("Error: Transaction not found or does not belong to user.")
-            conn.close()
             return False
 
-        # Proceed to delete
-        cursor.execute("""
-            DELETE FROM transactions WHERE transaction_id = ? AND user_id = ?
-        """, (transaction_id, user_id))
-        conn.commit()
-        conn.close()
-
         print("Transaction deleted successfully.")
         return True
     except Exception as e:
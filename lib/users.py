@@ -0,0 +1,43 @@
+import heapq
+
+import database
+from database import db_connection, get_pool
+from instrument import count_rows, timed
+from records import User
+
+
+@timed
+def create_user(name):
+    # Returns the new user's id, or None if the name is empty or the insert fails.
+    if not name or not name.strip():
+        print("Error: User name cannot be empty")
+        return None
+    try:
+        if not database.SHARDS:
+            with db_connection() as conn:
+                cursor = conn.execute("INSERT INTO users (name) VALUES (?)", (name.strip(),))
+                conn.commit()
+                return cursor.lastrowid
+        # Sharded: the id comes from the shard directory, which also decides the shard
+        from sharding import allocate_user_id
+        user_id = allocate_user_id()
+        with db_connection(user_id) as conn:
+            conn.execute("INSERT INTO users (user_id, name) VALUES (?, ?)", (user_id, name.strip()))
+            conn.commit()
+            return user_id
+    except Exception as e:
+        print(f"Error creating user: {e}")
+        return None
+
+
+@timed
+def get_all_users():
+    # Each shard returns its users in id order; merging keeps the overall order
+    per_shard = []
+    for path in database.data_paths():
+        with get_pool(path).connection() as conn:
+            cursor = conn.execute("SELECT user_id, name FROM users ORDER BY user_id")
+            cursor.row_factory = None
+            per_shard.append([User(*row) for row in cursor])
+        count_rows(len(per_shard[-1]))
+    return list(heapq.merge(*per_shard, key=lambda user: user.user_id))
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# lib/ modules import each other by bare name, as when run from lib/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+import database
+import instrument
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, migrated database file in tmp_path; returns its path."""
+    monkeypatch.setattr(database, 'CONCURRENT', False)
+    monkeypatch.setattr(database, 'SHARDS', 0)
+    monkeypatch.setattr(database, 'READ_ONLY', False)
+    path = str(tmp_path / 'finance_tracker.db')
+    database.set_database_path(path)
+    database.setup_database()
+    yield path
+    database.close_pools()
+
+
+@pytest.fixture
+def user(db):
+    from users import create_user
+    return create_user('Test User')
+
+
+@pytest.fixture
+def profiling():
+    """Turns on @timed instrumentation with empty stats for one test."""
+    instrument.reset()
+    instrument.enable()
+    database.close_pools()
+    yield instrument
+    instrument.disable()
+    instrument.reset()
+    database.close_pools()
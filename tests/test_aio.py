@@ -0,0 +1,79 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+import aio
+import database
+
+
+@pytest.fixture
+def async_db(db):
+    yield db
+    aio.shutdown()
+
+
+def test_async_write_then_read(user, async_db):
+    async def scenario():
+        assert await aio.save_transaction(user, -12, 'Food', '2025-01-01', 'Lunch')
+        assert await aio.set_budget_limit(user, 'Food', 100)
+        transactions = await aio.get_all_transactions(user)
+        summary = await aio.get_budget_summary(user)
+        pages = [row async for row in aio.iter_transactions(user, page_size=1)]
+        return transactions, summary, pages
+
+    transactions, summary, pages = asyncio.run(scenario())
+    assert [t['amount'] for t in transactions] == [-12]
+    assert summary[0]['spent'] == 12
+    assert len(pages) == 1
+
+
+def test_identical_concurrent_reads_share_one_call(user, async_db):
+    calls = []
+    gate = threading.Event()
+
+    def slow_read(user_id):
+        calls.append(user_id)
+        gate.wait(5)
+        return object()
+
+    read = aio._read(slow_read)
+
+    async def scenario():
+        tasks = [asyncio.ensure_future(read(user)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        gate.set()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_cancelling_interrupts_the_running_query(user, async_db):
+    started = threading.Event()
+    outcome = []
+
+    def endless(user_id):
+        with database.db_connection(user_id) as conn:
+            started.set()
+            try:
+                conn.execute("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+                             "SELECT COUNT(*) FROM n").fetchone()
+            except sqlite3.OperationalError as e:
+                outcome.append(str(e))
+                raise
+
+    async def scenario():
+        task = asyncio.ensure_future(aio._read(endless)(user))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    aio.shutdown()
+    assert outcome == ['interrupted']
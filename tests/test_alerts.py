@@ -0,0 +1,42 @@
+from alerts import evaluate_budget_alerts, run_budget_alerts, user_id_ranges
+from budget import set_budget_limit
+from transaction import delete_transaction, get_all_transactions, save_transactions_bulk
+from users import create_user
+
+
+def transitions(changes):
+    return [(c['user_id'], c['category'], c['previous'], c['status']) for c in changes]
+
+
+def test_status_changes_are_reported_once(user):
+    set_budget_limit(user, 'Food', 100)
+    set_budget_limit(user, 'Fun', 100)
+    save_transactions_bulk(user, [(-95, 'Food', '2025-01-01'), (-10, 'Fun', '2025-01-01')])
+    first = evaluate_budget_alerts(user, user)
+    assert transitions(first) == [(user, 'Food', 'OK', 'WARNING')]
+    assert first[0]['spent'] == 95 and first[0]['limit'] == 100
+    assert evaluate_budget_alerts(user, user) == []
+
+    save_transactions_bulk(user, [(-5, 'Food', '2025-01-02')])
+    assert transitions(evaluate_budget_alerts(user, user)) == [(user, 'Food', 'WARNING', 'OVER')]
+
+    for t in get_all_transactions(user):
+        if t['category'] == 'Food':
+            delete_transaction(t['transaction_id'], user)
+    assert transitions(evaluate_budget_alerts(user, user)) == [(user, 'Food', 'OVER', 'OK')]
+    assert evaluate_budget_alerts(user, user) == []
+
+
+def test_ranges_cover_every_user_and_workers_agree(db):
+    users = [create_user(f"User {i}") for i in range(7)]
+    for user_id in users:
+        set_budget_limit(user_id, 'Food', 10)
+        save_transactions_bulk(user_id, [(-20, 'Food', '2025-01-01')])
+    ranges = user_id_ranges(3)
+    assert ranges[0][0] == 1 and ranges[-1][1] == users[-1]
+    assert all(a[1] + 1 == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    changes = run_budget_alerts(workers=3)
+    assert sorted(c['user_id'] for c in changes) == users
+    assert run_budget_alerts(workers=3) == []
+    assert evaluate_budget_alerts(5, 4) == []
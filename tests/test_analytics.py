@@ -0,0 +1,64 @@
+import pytest
+
+import analytics
+import instrument
+from transaction import save_transactions_bulk
+
+
+@pytest.fixture
+def history(user):
+    save_transactions_bulk(user, [
+        (1000, 'Salary', '2024-01-05'),
+        (-100, 'Food', '2024-01-10'),
+        (-50, 'Rent', '2024-01-20'),
+        (-30, 'Food', '2024-03-02'),
+        (1000, 'Salary', '2025-01-05'),
+        (-200, 'Food', '2025-01-09'),
+    ])
+    return user
+
+
+def test_pure_python_report(history, monkeypatch):
+    monkeypatch.setattr(analytics, 'np', None)
+    report = analytics.user_report(history, window=2)
+    months = report['months']
+    assert [m['month'] for m in months][:3] == ['2024-01', '2024-02', '2024-03']
+    assert len(months) == 13
+    assert (months[0]['income'], months[0]['expense'], months[0]['net']) == (1000, 150, 850)
+    assert months[1]['expense'] == 0
+    assert months[0]['expense_average'] is None
+    assert months[1]['expense_average'] == 75
+    assert months[2]['net_average'] == -15
+    assert months[12]['net_change_yoy'] == 800 - 850
+    assert months[11]['net_change_yoy'] is None
+
+    categories = {c['category']: c for c in report['categories']}
+    assert list(categories) == ['Food', 'Rent']
+    assert categories['Food']['total'] == 330
+    assert categories['Food']['monthly'][2] == 30
+
+
+def test_date_range_and_empty_reports(history, monkeypatch):
+    monkeypatch.setattr(analytics, 'np', None)
+    report = analytics.user_report(history, start_date='2025-01-01')
+    assert [m['month'] for m in report['months']] == ['2025-01']
+    assert analytics.user_report(history, start_date='2030-01-01') == {'months': [], 'categories': []}
+
+
+def test_moving_average_and_year_over_year():
+    assert analytics.moving_average([3, 6, 9, 12], 3) == [None, None, 6, 9]
+    assert analytics.moving_average([5], 3) == [None]
+    assert analytics.year_over_year(list(range(14)))[12:] == [12, 12]
+
+
+@pytest.mark.skipif(analytics.np is None, reason="NumPy is not installed")
+def test_numpy_and_python_paths_agree(history, monkeypatch):
+    vectorized = analytics.user_report(history)
+    monkeypatch.setattr(analytics, 'np', None)
+    assert analytics.user_report(history) == vectorized
+
+
+def test_loaded_rows_are_counted(history, profiling):
+    instrument.reset()
+    assert len(analytics.load_transactions(history)) == 6
+    assert instrument.get_stats()['analytics.load_transactions']['rows'] == 6 + 3
@@ -0,0 +1,73 @@
+import os
+import queue
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+import database
+from bench_cli_startup import commands, time_command
+from compare import compare
+from generate import generate
+from rollup import verify_spending_rollup
+from run import benchmark_cases, summarize
+from stress import writer
+
+
+@pytest.fixture
+def generated(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'SHARDS', 0)
+    monkeypatch.setattr(database, 'CONCURRENT', False)
+    result = generate(str(tmp_path / 'bench.db'), users=3, categories=4, transactions=500, seed=7)
+    yield result
+    database.close_pools()
+
+
+def test_generate_writes_the_requested_rows_and_restores_triggers(generated):
+    assert generated['user_ids'] == [2, 3, 4]
+    with database.db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == 500
+        triggers = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' "
+                                "AND tbl_name = 'transactions'").fetchone()[0]
+    assert triggers > 0
+    assert verify_spending_rollup() == []
+
+
+def test_summarize_percentiles():
+    stats = summarize([float(ms) for ms in range(1, 101)])
+    assert stats['iterations'] == 100
+    assert stats['min_ms'] == 1 and stats['max_ms'] == 100
+    assert stats['p50_ms'] == pytest.approx(50.5)
+    assert stats['p99_ms'] == pytest.approx(99.01)
+    assert summarize([3.0])['p95_ms'] == 3.0
+
+
+def test_compare_flags_only_gated_regressions():
+    def report(**results):
+        return {'results': {name: dict(zip(('p50_ms', 'p95_ms', 'p99_ms'), values))
+                            for name, values in results.items()}}
+    rows = compare(report(a=(10, 20, 30), b=(10, 20, 30)),
+                   report(a=(10.5, 20, 90), b=(12, 20, 30)), 0.10)
+    assert {row['name']: row['regressed'] for row in rows} == {'a': False, 'b': True}
+
+
+def test_cli_startup_commands_can_be_repeated(tmp_path):
+    # time_command runs with check=True, so a refused duplicate entry would raise
+    argv = commands(str(tmp_path / 'import.csv'), str(tmp_path / 'export.csv'))['add-transaction']
+    assert len(time_command(argv, str(tmp_path), 2)) == 2
+
+
+def test_benchmark_saves_are_inserts(user):
+    # Amounts repeat within 100 calls, so a fixed description would hit the duplicate check
+    save = benchmark_cases([user], ['Food'], random.Random(1))['save_transaction']
+    assert all(save() for _ in range(200))
+
+
+def test_stress_writer_counts_duplicates_apart_from_errors(db, user):
+    results = queue.Queue()
+    writer(db, False, [user], ['Food'], 0.3, 1, results)
+    role, ops, errors, locked, duplicates = results.get()
+    assert ops > 100
+    assert (errors, locked, duplicates) == (0, 0, 0)
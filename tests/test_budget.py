@@ -0,0 +1,45 @@
+import instrument
+from budget import budget_status, get_budget_summary, set_budget_limit, update_budget_limit
+from money import Money
+from transaction import save_transactions_bulk
+
+
+def test_budget_status_thresholds():
+    assert budget_status(Money(89), Money(100)) == "OK"
+    assert budget_status(Money(90), Money(100)) == "WARNING"
+    assert budget_status(Money(100), Money(100)) == "OVER"
+
+
+def test_summary_covers_budgeted_and_unbudgeted_categories(user):
+    set_budget_limit(user, 'Food', 100)
+    set_budget_limit(user, 'Travel', 500)
+    save_transactions_bulk(user, [
+        (-60, 'Food', '2025-01-01'),
+        (-35, 'Food', '2025-01-02'),
+        (-20, 'Books', '2025-01-03'),
+        (1000, 'Salary', '2025-01-04'),
+    ])
+    summary = {item['category']: item for item in get_budget_summary(user)}
+    assert summary['Food']['spent'] == 95
+    assert summary['Food']['status'] == "WARNING"
+    assert summary['Travel']['spent'] == 0
+    assert summary['Travel']['status'] == "OK"
+    assert summary['Books']['limit'] is None
+    assert summary['Books']['status'] == "No Budget"
+    assert summary['Salary']['spent'] == 0
+    assert list(summary) == sorted(summary)
+
+
+def test_summary_is_one_query(user, profiling):
+    for category in ('Food', 'Travel', 'Rent'):
+        set_budget_limit(user, category, 100)
+    instrument.reset()
+    get_budget_summary(user)
+    assert instrument.get_stats()['budget.get_budget_summary']['queries'] == 1
+
+
+def test_set_and_update_limits(user):
+    assert set_budget_limit(user, 'Food', 100)
+    assert not set_budget_limit(user, 'Food', 200)
+    assert update_budget_limit(user, 'Food', Money('150.25'))
+    assert get_budget_summary(user)[0]['limit'] == Money('150.25')
@@ -0,0 +1,48 @@
+import json
+import os
+import subprocess
+import sys
+
+from commands import main
+
+LIB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+
+def test_add_user_and_transaction_then_balance(db, capsys):
+    assert main(['add-user', 'Ada']) == 0
+    assert "Created user Ada (ID: 2)" in capsys.readouterr().out
+    assert main(['add-transaction', '2', '100', 'Salary', '2025-01-01', '--no-alert']) == 0
+    assert main(['add-transaction', '2', '-20.5', 'Food', '2025-01-02', 'Lunch']) == 0
+    capsys.readouterr()
+    assert main(['balance', '2']) == 0
+    assert capsys.readouterr().out.strip() == "79.50"
+    assert main(['balance', '2', '--as-of', '2025-01-01']) == 0
+    assert capsys.readouterr().out.strip() == "100.00"
+
+
+def test_summary_json(db, capsys):
+    assert main(['summary', '1', '--json']) == 0
+    summary = json.loads(capsys.readouterr().out)
+    food = next(item for item in summary if item['category'] == 'Food')
+    assert food == {'category': 'Food', 'limit': '300.00', 'spent': '0.00', 'status': 'OK'}
+
+
+def test_failures_exit_non_zero(db, capsys):
+    assert main(['add-user', ' ']) == 1
+    assert main(['add-transaction', '1', '-5', 'Food', '01/02/2025', '--no-alert']) == 1
+
+
+def test_subcommand_skips_the_interactive_imports(tmp_path):
+    # The scripted path must not pay for colorama or the menu's modules
+    script = (f"import runpy, sys\n"
+              f"sys.argv = ['cli.py', 'balance', '1']\n"
+              f"try:\n"
+              f"    runpy.run_path({os.path.join(LIB, 'cli.py')!r}, run_name='__main__')\n"
+              f"except SystemExit as e:\n"
+              f"    print(e.code, sorted(m for m in ('colorama', 'server', 'analytics', 'reports')\n"
+              f"                         if m in sys.modules))\n")
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': LIB})
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "0 []"
+    assert (tmp_path / 'database' / 'finance_tracker.db').exists()
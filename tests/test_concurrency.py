@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import database
+
+
+@pytest.fixture
+def concurrent(db):
+    database.enable_concurrency()
+    yield db
+    database.close_pools()
+
+
+def count_users(name):
+    with database.db_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM users WHERE name = ?", (name,)).fetchone()[0]
+
+
+def test_connections_use_wal(concurrent):
+    with database.db_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_writes_from_many_threads_are_group_committed(concurrent):
+    def insert(conn):
+        return conn.execute("INSERT INTO users (name) VALUES ('Writer')").lastrowid
+
+    ids = []
+    threads = [threading.Thread(target=lambda: ids.extend(database.run_write(insert) for _ in range(20)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 160
+    assert count_users('Writer') == 160
+    writer = database.get_writer()
+    assert writer.jobs == 160
+    assert writer.batches <= writer.jobs
+
+
+def test_failing_job_does_not_undo_its_batch(concurrent):
+    writer = database.get_writer()
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocker(conn):
+        started.set()
+        release.wait(5)
+
+    def good(conn):
+        conn.execute("INSERT INTO users (name) VALUES ('Good')")
+
+    def bad(conn):
+        conn.execute("INSERT INTO users (name) VALUES ('Bad')")
+        conn.execute("INSERT INTO users (name) VALUES ('')")
+
+    errors = []
+
+    def submit(job):
+        try:
+            database.run_write(job)
+        except sqlite3.IntegrityError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=submit, args=(blocker,))
+    first.start()
+    started.wait(5)
+    # Queued while the blocker holds the writer, so they share the next batch
+    others = [threading.Thread(target=submit, args=(job,)) for job in (good, bad, good)]
+    for thread in others:
+        thread.start()
+    while writer._queue.qsize() < 3:
+        time.sleep(0.01)
+    release.set()
+    for thread in [first] + others:
+        thread.join()
+    assert len(errors) == 1
+    assert count_users('Good') == 2
+    assert count_users('Bad') == 0
+
+
+def test_write_jobs_cannot_queue_more_writes(concurrent):
+    with pytest.raises(RuntimeError):
+        database.run_write(lambda conn: database.run_write(lambda inner: None))
@@ -0,0 +1,59 @@
+import sqlite3
+import threading
+
+import pytest
+
+import database
+
+
+def test_nested_connections_share_one_pooled_connection(db):
+    with database.db_connection() as outer:
+        with database.db_connection() as inner:
+            assert inner is outer
+    stats = database.pool_stats()
+    assert stats['opened'] == 1
+    assert stats['in_use'] == 0
+
+
+def test_connections_are_reused_between_blocks(db):
+    with database.db_connection() as first:
+        pass
+    with database.db_connection() as second:
+        assert second is first
+    assert database.pool_stats()['reused'] >= 1
+
+
+def test_block_commits_on_success_and_rolls_back_on_error(db):
+    with database.db_connection() as conn:
+        conn.execute("INSERT INTO users (name) VALUES ('Kept')")
+    with pytest.raises(RuntimeError):
+        with database.db_connection() as conn:
+            conn.execute("INSERT INTO users (name) VALUES ('Dropped')")
+            raise RuntimeError
+    with database.db_connection() as conn:
+        names = [row['name'] for row in conn.execute("SELECT name FROM users")]
+    assert 'Kept' in names
+    assert 'Dropped' not in names
+
+
+def test_pool_is_bounded(db):
+    pool = database.ConnectionPool(db, max_size=1, timeout=0.1)
+    held = threading.Event()
+    done = threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait(5)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="Timed out"):
+            with pool.connection():
+                pass
+    finally:
+        done.set()
+        thread.join()
+        pool.close()
@@ -0,0 +1,127 @@
+import database
+from dedup import (OccurrenceCounter, normalize_description, row_fingerprint, scan_duplicates,
+                   transaction_fingerprint)
+from transaction import get_all_transactions, save_transactions_bulk
+
+
+def test_fingerprints_ignore_case_punctuation_and_spacing():
+    assert normalize_description("  Coffee -- SHOP!! ") == 'coffee shop'
+    assert (transaction_fingerprint(2, '2025-01-01', -350, 'Coffee shop')
+            == transaction_fingerprint(2, '2025-01-01', -350, 'coffee, shop'))
+    assert (transaction_fingerprint(2, '2025-01-01', -350, 'Coffee')
+            != transaction_fingerprint(2, '2025-01-01', -350, 'Coffee', external_id='X1'))
+
+
+def test_repeats_are_numbered_across_the_whole_import(db):
+    coffee = (2, -350, 'Food', '2025-01-01', 'Coffee')
+    rent = (2, -90000, 'Rent', '2025-01-02', 'Rent')
+    with database.db_connection() as conn:
+        counter = OccurrenceCounter(conn)
+        first = counter.fingerprints([(coffee, None), (rent, None), (coffee, None)])
+        second = counter.fingerprints([(coffee, None), (coffee, 'X1')])
+        counter.close()
+        assert conn.execute("SELECT 1 FROM sqlite_temp_master WHERE name = 'import_occurrences'").fetchone() is None
+    assert first == [row_fingerprint(coffee), row_fingerprint(rent), row_fingerprint(coffee, occurrence=1)]
+    assert second == [row_fingerprint(coffee, occurrence=2), row_fingerprint(coffee, 'X1')]
+
+
+def test_reimporting_a_file_adds_nothing(user):
+    # The two coffees on the 1st are not adjacent; both are kept, and only once
+    rows = [(-3.50, 'Food', '2025-01-01', 'Coffee'),
+            (-900, 'Rent', '2025-01-02', 'Rent'),
+            (-3.50, 'Food', '2025-01-01', 'coffee'),
+            (-3.50, 'Food', '2025-01-01', 'Coffee', 'BANK-1')]
+    assert save_transactions_bulk(user, rows, chunk_size=2)['inserted'] == 4
+    report = save_transactions_bulk(user, rows)
+    assert (report['inserted'], report['duplicates']) == (0, 4)
+    assert len(get_all_transactions(user)) == 4
+
+    report = save_transactions_bulk(user, rows + [rows[0]])
+    assert (report['inserted'], report['duplicates']) == (1, 4)
+
+
+def legacy(user_id, rows):
+    # Rows as they were stored before fingerprints existed; returns their ids
+    save_transactions_bulk(user_id, rows)
+    database.run_write(lambda conn: conn.execute(
+        "UPDATE transactions SET fingerprint = NULL WHERE user_id = ?", (user_id,)))
+    return [t['transaction_id'] for t in get_all_transactions(user_id)]
+
+
+def fingerprints(user_id):
+    with database.db_connection(user_id) as conn:
+        return dict(conn.execute("SELECT transaction_id, fingerprint FROM transactions "
+                                 "WHERE user_id = ?", (user_id,)).fetchall())
+
+
+COFFEES = [(-3.50, 'Food', '2025-01-01', 'Coffee'),
+           (-900, 'Rent', '2025-01-02', 'Rent'),
+           (-3.50, 'Food', '2025-01-01', 'Coffee')]
+
+
+def test_scan_keeps_genuine_repeats_and_numbers_them_like_an_import(user):
+    legacy(user, COFFEES)
+    assert scan_duplicates(user, batch_size=1) == {'scanned': 3, 'duplicates': 0, 'deleted': 0}
+    assert None not in fingerprints(user).values()
+    report = save_transactions_bulk(user, COFFEES)
+    assert (report['inserted'], report['duplicates']) == (0, 3)
+
+
+def test_interrupted_scan_continues_the_numbering(user):
+    first = min(legacy(user, COFFEES + [COFFEES[0]]))
+    scan_duplicates(user)
+    expected = fingerprints(user)
+    database.run_write(lambda conn: conn.execute(
+        "UPDATE transactions SET fingerprint = NULL WHERE transaction_id > ?", (first,)))
+    assert scan_duplicates(user)['duplicates'] == 0
+    assert fingerprints(user) == expected
+
+
+def test_newer_copy_is_the_duplicate(user):
+    (older,) = legacy(user, COFFEES[:1])
+    save_transactions_bulk(user, COFFEES[:1])
+    newer = max(fingerprints(user))
+    found = []
+    assert scan_duplicates(user, on_duplicates=found.extend)['duplicates'] == 1
+    assert [row[0] for row in found] == [newer]
+    assert fingerprints(user)[older] is None
+    assert scan_duplicates(user)['duplicates'] == 1
+
+    result = scan_duplicates(user, delete=True)
+    assert (result['duplicates'], result['deleted']) == (1, 1)
+    assert list(fingerprints(user)) == [older]
+    assert scan_duplicates(user) == {'scanned': 0, 'duplicates': 0, 'deleted': 0}
+
+
+def test_backfill_leaves_revisions_alone(user):
+    legacy(user, COFFEES)
+    with database.db_connection(user) as conn:
+        before = database.user_revision(conn, user)
+    scan_duplicates(user)
+    with database.db_connection(user) as conn:
+        assert database.user_revision(conn, user) == before
+    database.run_write(lambda conn: conn.execute(
+        "UPDATE transactions SET description = 'Espresso' WHERE user_id = ?", (user,)))
+    with database.db_connection(user) as conn:
+        assert database.user_revision(conn, user) > before
+
+
+def test_counts_left_by_a_failed_import_are_discarded(db):
+    coffee = (2, -350, 'Food', '2025-01-01', 'Coffee')
+    with database.db_connection() as conn:
+        OccurrenceCounter(conn).fingerprints([(coffee, None)])
+        assert OccurrenceCounter(conn).fingerprints([(coffee, None)]) == [row_fingerprint(coffee)]
+
+
+def test_copies_after_an_unresolved_duplicate_get_their_own_number(user):
+    first, _, second = sorted(legacy(user, COFFEES))
+    save_transactions_bulk(user, COFFEES[:1])
+    newer = max(fingerprints(user))
+    found = []
+    assert scan_duplicates(user, batch_size=1, on_duplicates=found.extend)['duplicates'] == 1
+    assert [row[0] for row in found] == [newer]
+    assert fingerprints(user)[first] is None
+    assert fingerprints(user)[second] == transaction_fingerprint(user, '2025-01-01', -350, 'Coffee',
+                                                                 occurrence=1)
+    assert scan_duplicates(user, delete=True)['deleted'] == 1
+    assert fingerprints(user)[first] == transaction_fingerprint(user, '2025-01-01', -350, 'Coffee')
@@ -0,0 +1,84 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+import instrument
+from exporter import decode_export_cursor, export_to_file, export_transactions
+from transaction import save_transactions_bulk
+
+
+def add(user_id, count, start=1):
+    save_transactions_bulk(user_id, [(-(i), 'Food', '2025-01-01', f"item {i}")
+                                     for i in range(start, start + count)])
+
+
+def csv_ids(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [int(row['transaction_id']) for row in csv.DictReader(f)]
+
+
+def test_csv_and_jsonl_formats(user):
+    add(user, 3)
+    out = io.StringIO()
+    result = export_transactions(user, out, 'csv', chunk_size=2)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == 'transaction_id,date,amount,category,description'
+    assert lines[1].endswith(',2025-01-01,-1.00,Food,item 1')
+    assert result['rows'] == 3
+
+    out = io.StringIO()
+    export_transactions(user, out, 'jsonl', since='2025-01-01')
+    first = json.loads(out.getvalue().splitlines()[0])
+    assert first['amount'] == '-1.00' and first['description'] == 'item 1'
+    with pytest.raises(ValueError):
+        export_transactions(user, io.StringIO(), 'xml')
+
+
+def test_cursor_file_exports_only_new_rows(user, tmp_path):
+    path, cursor_file = str(tmp_path / 'out.csv'), str(tmp_path / 'cursor')
+    add(user, 3)
+    assert export_to_file(user, path, cursor_file=cursor_file)['rows'] == 3
+    assert export_to_file(user, path, cursor_file=cursor_file)['rows'] == 0
+    add(user, 2, start=4)
+    assert export_to_file(user, path, cursor_file=cursor_file)['rows'] == 2
+    ids = csv_ids(path)
+    assert len(ids) == 5 and ids == sorted(set(ids))
+
+
+def test_interrupted_export_resumes_after_the_last_chunk(user, tmp_path):
+    path, cursor_file = str(tmp_path / 'out.csv'), str(tmp_path / 'cursor')
+    add(user, 7)
+
+    def crash(written, total):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        export_to_file(user, path, cursor_file=cursor_file, chunk_size=3, progress=crash)
+    assert len(csv_ids(path)) == 3
+    assert export_to_file(user, path, cursor_file=cursor_file, chunk_size=3)['rows'] == 4
+    assert len(set(csv_ids(path))) == 7
+
+
+def test_gzip_appends_members(user, tmp_path):
+    path, cursor_file = str(tmp_path / 'out.jsonl.gz'), str(tmp_path / 'cursor')
+    add(user, 2)
+    export_to_file(user, path, 'jsonl', cursor_file=cursor_file)
+    add(user, 1, start=3)
+    export_to_file(user, path, 'jsonl', cursor_file=cursor_file)
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        assert [json.loads(line)['description'] for line in f] == ['item 1', 'item 2', 'item 3']
+
+
+def test_bad_cursor_is_rejected():
+    with pytest.raises(ValueError, match="Invalid export cursor"):
+        decode_export_cursor('nope')
+
+
+def test_exported_rows_are_counted(user, profiling):
+    add(user, 3)
+    instrument.reset()
+    export_transactions(user, io.StringIO(), 'csv', chunk_size=2)
+    assert instrument.get_stats()['exporter.export_transactions']['rows'] == 3
@@ -0,0 +1,41 @@
+from datetime import date
+
+import database
+from helper import date_bounds, date_range_clause, period_bounds
+from transaction import get_all_transactions, save_transactions_bulk, transactions_query
+
+
+def test_period_bounds_are_half_open():
+    assert period_bounds(None, None) == (None, None)
+    assert period_bounds(None, 2024) == ('2024-01-01', '2025-01-01')
+    assert period_bounds(2, 2024) == ('2024-02-01', '2024-03-01')
+    assert period_bounds(12, 2024) == ('2024-12-01', '2025-01-01')
+
+
+def test_date_bounds_intersect_month_and_explicit_range():
+    assert date_bounds(3, 2025, '2025-03-10', date(2025, 5, 1)) == ('2025-03-10', '2025-04-01')
+    assert date_bounds(start_date=date(2025, 1, 1)) == ('2025-01-01', None)
+
+
+def test_date_range_clause_has_no_function_on_the_column():
+    clause, params = date_range_clause(12, 2024)
+    assert clause == " AND date >= ? AND date < ?"
+    assert params == ['2024-12-01', '2025-01-01']
+    assert date_range_clause() == ("", [])
+
+
+def test_month_filter_includes_the_last_day_and_excludes_the_next_month(user):
+    save_transactions_bulk(user, [
+        (-1, 'Food', '2024-11-30'),
+        (-2, 'Food', '2024-12-01'),
+        (-3, 'Food', '2024-12-31'),
+        (-4, 'Food', '2025-01-01'),
+    ])
+    assert sorted(t['amount'] for t in get_all_transactions(user, 12, 2024)) == [-3, -2]
+    assert len(get_all_transactions(user, start_date='2024-12-01', end_date='2024-12-31')) == 1
+
+
+def test_date_filtered_query_uses_the_user_date_index(user):
+    query, params = transactions_query(user, 6, 2025)
+    plan = ' '.join(database.explain_query_plan(query, params))
+    assert 'idx_user_date_created' in plan
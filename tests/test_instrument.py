@@ -0,0 +1,42 @@
+import json
+
+import database
+import instrument
+from instrument import timed
+from transaction import get_transactions_page, save_transactions_bulk
+
+
+@timed
+def outer(user_id):
+    with database.db_connection(user_id) as conn:
+        conn.execute("SELECT 1").fetchall()
+    return get_transactions_page(user_id, page_size=10)
+
+
+def test_disabled_instrumentation_records_nothing(user):
+    instrument.reset()
+    outer(user)
+    assert instrument.get_stats() == {}
+
+
+def test_queries_and_rows_are_charged_to_callers(user, profiling):
+    save_transactions_bulk(user, [(-1, 'Food', f"2025-01-{day:02d}") for day in range(1, 6)])
+    instrument.reset()
+    outer(user)
+    stats = instrument.get_stats()
+    page = stats['transaction.get_transactions_page']
+    assert page == {**page, 'calls': 1, 'queries': 1, 'rows': 5}
+    mine = stats[f"{__name__}.outer"]
+    assert mine['queries'] == 2
+    assert mine['rows'] == 6
+    assert mine['wall_ms'] >= page['wall_ms']
+
+
+def test_summary_and_json_export(user, profiling, tmp_path):
+    outer(user)
+    assert 'transaction.get_transactions_page' in instrument.format_summary()
+    path = tmp_path / 'profile.json'
+    instrument.export_json(str(path))
+    assert json.loads(path.read_text())[f"{__name__}.outer"]['calls'] == 1
+    instrument.reset()
+    assert "No instrumented calls recorded." in instrument.format_summary()
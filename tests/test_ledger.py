@@ -0,0 +1,86 @@
+import logging
+import sqlite3
+from datetime import date
+
+import database
+import ledger
+from transaction import calculate_balance, delete_transaction, get_all_transactions, save_transactions_bulk
+
+
+def checkpoints(user_id):
+    with database.db_connection(user_id) as conn:
+        return dict(conn.execute("SELECT period, closing_balance FROM balance_checkpoints "
+                                 "WHERE user_id = ? ORDER BY period", (user_id,)).fetchall())
+
+
+def test_balance_as_of_matches_a_full_sum(user):
+    save_transactions_bulk(user, [
+        (1000, 'Salary', '2024-01-15'),
+        (-200, 'Rent', '2024-02-01'),
+        (-50, 'Food', '2024-02-29'),
+        (-25, 'Food', '2024-04-10'),
+    ])
+    assert calculate_balance(user, '2024-01-31') == 1000
+    assert calculate_balance(user, '2024-02-29') == 750
+    assert calculate_balance(user, date(2024, 3, 31)) == 750
+    assert calculate_balance(user) == 725
+    assert checkpoints(user)['2024-02'] == 75000
+
+
+def test_back_dated_changes_drop_later_checkpoints(user):
+    save_transactions_bulk(user, [(100, 'Salary', '2024-01-01'), (100, 'Salary', '2024-03-01')])
+    assert calculate_balance(user) == 200
+    assert '2024-03' in checkpoints(user)
+
+    save_transactions_bulk(user, [(-30, 'Food', '2024-02-10')])
+    assert '2024-01' in checkpoints(user)
+    assert '2024-02' not in checkpoints(user)
+    assert calculate_balance(user) == 170
+
+    food = next(t for t in get_all_transactions(user) if t['category'] == 'Food')
+    delete_transaction(food['transaction_id'], user)
+    assert calculate_balance(user, '2024-02-29') == 100
+
+
+def test_checkpoints_from_a_stale_read_are_not_stored(user):
+    save_transactions_bulk(user, [(100, 'Salary', '2024-01-01')])
+    with database.db_connection(user) as conn:
+        revision = database.user_revision(conn, user)
+    save_transactions_bulk(user, [(-40, 'Food', '2024-01-02')])
+    stored = database.run_write(
+        lambda conn: ledger._store_checkpoints(conn, user, revision, [(user, '2024-01', 10000)]))
+    assert stored is False
+    assert checkpoints(user) == {}
+
+
+def test_read_only_connections_compute_without_storing(user):
+    save_transactions_bulk(user, [(100, 'Salary', '2024-01-01')])
+    database.enable_read_only()
+    assert calculate_balance(user) == 100
+    database.close_pools()
+    database.READ_ONLY = False
+    assert checkpoints(user) == {}
+
+
+def test_locked_database_skips_storing_and_logs(user, monkeypatch, caplog):
+    save_transactions_bulk(user, [(100, 'Salary', '2024-01-01')])
+    monkeypatch.setattr(database, 'BUSY_TIMEOUT_MS', 50)
+    database.close_pools()
+    blocker = sqlite3.connect(database.DB_PATH, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        with caplog.at_level(logging.WARNING):
+            assert ledger.balance_as_of(user) == 100
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert "not stored" in caplog.text
+    assert checkpoints(user) == {}
+
+
+def test_concurrent_mode_stores_through_the_writer_queue(user):
+    save_transactions_bulk(user, [(100, 'Salary', '2024-01-01')])
+    database.enable_concurrency()
+    assert calculate_balance(user) == 100
+    assert database.get_writer().jobs >= 1
+    assert checkpoints(user)
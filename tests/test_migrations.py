@@ -0,0 +1,118 @@
+import sqlite3
+
+import pytest
+
+import database
+
+
+def legacy_database(path):
+    # The schema and seed data written by the original setup_database(), before
+    # migrations existed: DECIMAL amounts stored as floats and user_version 0
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE transactions (
+            transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            amount DECIMAL(10, 2) NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            date DATE NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE budgets (
+            budget_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            category VARCHAR(50) NOT NULL,
+            limit_amount DECIMAL(10, 2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, category)
+        );
+        CREATE INDEX idx_user_date ON transactions(user_id, date);
+        INSERT INTO users (user_id, name) VALUES (1, 'Default User');
+        INSERT INTO budgets (user_id, category, limit_amount) VALUES (1, 'Food', 300.0);
+        INSERT INTO transactions (user_id, amount, category, date, description)
+        VALUES (1, -12.34, 'Food', '2024-05-01', 'Lunch'),
+               (1, 0.1, 'Interest', '2024-05-02', ''),
+               (1, -19.99, 'Food', '2024-06-01', 'Dinner');
+    """)
+    conn.commit()
+    conn.close()
+
+
+def test_decimal_amounts_are_converted_to_cents(tmp_path, monkeypatch):
+    path = str(tmp_path / 'legacy.db')
+    legacy_database(path)
+    monkeypatch.setattr(database, 'SHARDS', 0)
+    database.set_database_path(path)
+    try:
+        database.setup_database()
+        with database.db_connection() as conn:
+            columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(transactions)")}
+            amounts = [row[0] for row in conn.execute("SELECT amount FROM transactions ORDER BY transaction_id")]
+            limit = conn.execute("SELECT limit_amount FROM budgets WHERE category = 'Food'").fetchone()[0]
+            rollup = conn.execute("SELECT year_month, total_spent FROM spending_rollup ORDER BY 1").fetchall()
+    finally:
+        database.close_pools()
+    assert columns['amount'] == 'INTEGER'
+    assert amounts == [-1234, 10, -1999]
+    assert limit == 30000
+    assert [tuple(row) for row in rollup] == [('2024-05', 1234), ('2024-06', 1999)]
+
+
+def test_fresh_database_is_at_the_current_version(db):
+    with database.db_connection() as conn:
+        assert database.schema_version(conn) == database.SCHEMA_VERSION
+    assert database.migrate() == []
+
+
+def test_migrations_do_not_reseed_deleted_defaults(db):
+    with database.db_connection() as conn:
+        conn.execute("DELETE FROM budgets WHERE user_id = 1 AND category = 'Food'")
+    database.close_pools()
+    database.setup_database()
+    with database.db_connection() as conn:
+        assert conn.execute("SELECT 1 FROM budgets WHERE category = 'Food'").fetchone() is None
+
+
+def test_pending_migrations_are_applied_in_order(tmp_path):
+    path = str(tmp_path / 'steps.db')
+    applied = []
+
+    def first(cursor):
+        applied.append('first')
+        cursor.execute("CREATE TABLE one (x)")
+
+    def second(cursor):
+        applied.append('second')
+        cursor.execute("CREATE TABLE two (x)")
+
+    assert database.migrate(path, [first]) == ['first']
+    assert database.migrate(path, [first, second]) == ['second']
+    assert applied == ['first', 'second']
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    conn.close()
+
+
+def test_failed_migration_rolls_back_and_keeps_the_version(tmp_path):
+    path = str(tmp_path / 'broken.db')
+
+    def good(cursor):
+        cursor.execute("CREATE TABLE good (x)")
+
+    def broken(cursor):
+        cursor.execute("CREATE TABLE half (x)")
+        raise RuntimeError("boom")
+
+    database.migrate(path, [good])
+    with pytest.raises(RuntimeError):
+        database.migrate(path, [good, broken])
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half'").fetchone() is None
+    conn.close()
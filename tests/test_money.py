@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+
+from money import Money, to_cents
+
+
+def test_construction_rounds_half_up_to_cents():
+    assert Money(12.34).cents == 1234
+    assert Money('0.005').cents == 1
+    assert Money('-0.005').cents == -1
+    assert Money(Decimal('2.675')).cents == 268
+    assert Money(7).cents == 700
+    assert Money.from_cents(5).cents == 5
+    for bad in ('abc', 'nan', float('inf'), None):
+        with pytest.raises(ValueError):
+            Money(bad)
+
+
+def test_arithmetic_stays_exact():
+    assert Money('0.10') + Money('0.20') == Money('0.30')
+    assert sum([Money('0.10')] * 10, Money(0)) == 1
+    assert 5 - Money('0.01') == Money('4.99')
+    assert Money('10.00') * 0.333 == Money('3.33')
+    assert Money('10.00') / 4 == Money('2.50')
+    assert Money(3) / Money(4) == 0.75
+    assert -Money(2) == Money(-2)
+    assert abs(Money(-2)) == 2
+
+
+def test_equal_values_hash_alike():
+    for money, number in ((Money(1), 1), (Money('0.50'), 0.5), (Money('2.25'), Decimal('2.25')),
+                          (Money(0), 0), (Money(-3), -3.0)):
+        assert money == number
+        assert hash(money) == hash(number)
+    assert {Money(1): 'one'}[1] == 'one'
+    assert len({Money(1), 1, 1.0, Decimal('1.00')}) == 1
+
+
+def test_comparisons_with_floats_are_exact():
+    assert Money('0.10') != 0.1
+    assert Money('0.10') == Decimal('0.10')
+    assert Money(1) != 1.004
+    assert Money(0) < 0.001
+    assert Money('-0.01') < 0
+    assert (Money(1) == 'x') is False
+
+
+def test_int_truncates_toward_zero_exactly():
+    assert int(Money('2.99')) == 2
+    assert int(Money('-2.99')) == -2
+    assert int(Money('-0.50')) == 0
+    big = Money.from_cents(123456789012345678901)
+    assert int(big) == 1234567890123456789
+
+
+def test_formatting_and_sql_binding():
+    assert f"{Money('3.5'):.2f}" == "3.50"
+    assert str(Money(-1)) == "-1.00"
+    assert to_cents(Money('1.23')) == 123
+    assert to_cents('4') == 400
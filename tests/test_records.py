@@ -0,0 +1,51 @@
+import pytest
+
+import instrument
+from money import Money
+from records import Transaction, TransactionBatch, User
+from transaction import get_all_transactions, get_recent_transactions, save_transactions_bulk
+from users import create_user, get_all_users
+
+
+def test_records_read_like_the_old_dict_rows():
+    transaction = Transaction(7, -1250, 'Food', '2024-03-14', 'Lunch')
+    assert transaction['amount'] == Money('-12.50')
+    assert dict(transaction) == {'transaction_id': 7, 'amount': Money('-12.50'), 'category': 'Food',
+                                 'date': '2024-03-14', 'description': 'Lunch'}
+    assert {**User(3, 'Ada')} == {'user_id': 3, 'name': 'Ada'}
+    assert len(transaction) == 5
+    with pytest.raises(KeyError):
+        transaction['cents']
+    with pytest.raises(AttributeError):
+        transaction.extra = 1
+
+
+def test_batch_round_trips_rows():
+    rows = [(1, 500, 'Salary', '2024-01-31', 'Pay'),
+            (2, -120, 'Food', '1969-12-31', 'Snack'),
+            (3, -80, 'Food', '2024-02-01', 'Snack')]
+    batch = TransactionBatch.from_rows(rows)
+    assert len(batch) == 3
+    assert batch.category_names == ['Salary', 'Food']
+    assert [(t.transaction_id, t.cents, t.category, t.date, t.description) for t in batch] == rows
+    assert batch.descriptions[1] is batch.descriptions[2]
+
+
+def test_batch_matches_the_record_list(user):
+    save_transactions_bulk(user, [(100, 'Salary', '2024-01-01'), (-30.25, 'Food', '2024-01-05', 'Shop')])
+    assert list(get_all_transactions(user, batch=True)) == get_all_transactions(user)
+    assert len(get_all_transactions(user, batch=True, start_date='2024-01-02')) == 1
+
+
+def test_rows_are_counted_without_the_row_factory(user, profiling):
+    save_transactions_bulk(user, [(-1, 'Food', f"2025-01-{day:02d}") for day in range(1, 6)])
+    create_user('Other User')
+    instrument.reset()
+    get_all_transactions(user)
+    get_all_transactions(user, batch=True)
+    get_recent_transactions(user, limit=3)
+    get_all_users()
+    stats = instrument.get_stats()
+    assert stats['transaction.get_all_transactions']['rows'] == 10
+    assert stats['transaction.get_recent_transactions']['rows'] == 3
+    assert stats['users.get_all_users']['rows'] == 3
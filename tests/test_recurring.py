@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pytest
+
+from recurring import Rule, add_recurring_rule, delete_recurring_rule, get_recurring_rules, \
+    materialize_due, projected_total
+from transaction import calculate_balance, get_all_transactions
+
+
+def rule(frequency, start, interval=1, day_of_month=None, end=None, next_date=None):
+    return Rule({'rule_id': 1, 'user_id': 1, 'amount': -100, 'category': 'Rent', 'description': '',
+                 'frequency': frequency, 'interval': interval, 'day_of_month': day_of_month,
+                 'start_date': start, 'end_date': end, 'next_date': next_date or start})
+
+
+def test_monthly_dates_clamp_to_short_months():
+    r = rule('monthly', '2024-01-31')
+    assert [r.occurrence(k) for k in range(4)] == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)]
+    r = rule('monthly', '2024-01-15', interval=2, day_of_month=31)
+    assert [r.occurrence(k) for k in range(3)] == [date(2024, 1, 31), date(2024, 3, 31), date(2024, 5, 31)]
+
+
+def test_yearly_leap_day_and_daily_weekly_steps():
+    r = rule('yearly', '2024-02-29')
+    assert [r.occurrence(k) for k in range(2)] == [date(2024, 2, 29), date(2025, 2, 28)]
+    assert rule('weekly', '2025-01-06', interval=2).occurrence(3) == date(2025, 2, 17)
+    assert rule('daily', '2025-01-30').occurrence(3) == date(2025, 2, 2)
+
+
+@pytest.mark.parametrize('frequency,interval,day', [
+    ('daily', 3, None), ('weekly', 1, None), ('monthly', 1, 31), ('monthly', 5, None), ('yearly', 1, None)])
+def test_first_index_and_counts_match_brute_force(frequency, interval, day):
+    r = rule(frequency, '2024-01-31', interval, day, end='2030-06-30')
+    dates = [r.occurrence(k) for k in range(3000)]
+    dates = [d for d in dates if d <= date(2030, 6, 30)]
+    for probe in (date(2023, 1, 1), date(2024, 2, 29), date(2025, 7, 4), date(2029, 12, 31)):
+        assert r.first_index(probe) == next((k for k, d in enumerate(dates) if d >= probe), len(dates))
+        end = probe + timedelta(days=400)
+        expected = sum(1 for d in dates if probe <= d < end)
+        assert r.count_between(probe, end) == expected
+
+
+def test_materialize_is_idempotent_and_respects_the_end_date(user):
+    rule_id = add_recurring_rule(user, -100, 'Rent', 'monthly', '2025-01-31', end_date='2025-04-30')
+    assert materialize_due('2025-03-15', batch_size=1) == 2
+    assert materialize_due('2025-03-15') == 0
+    assert materialize_due('2025-12-31') == 2
+    dates = sorted(t['date'] for t in get_all_transactions(user))
+    assert dates == ['2025-01-31', '2025-02-28', '2025-03-31', '2025-04-30']
+    assert get_recurring_rules(user)[0]['next_date'] is None
+    assert delete_recurring_rule(rule_id, user)
+    assert len(get_all_transactions(user)) == 4
+
+
+def test_projected_balance_counts_unwritten_occurrences(user):
+    add_recurring_rule(user, 2000, 'Salary', 'monthly', '2025-01-25')
+    assert projected_total(user, end_date='2025-04-01') == 3 * 200000
+    materialize_due('2025-01-31', user_id=user)
+    assert projected_total(user, end_date='2025-04-01') == 2 * 200000
+    assert calculate_balance(user, '2025-03-31', include_projected=True) == 6000
+    assert calculate_balance(user, '2025-03-31') == 2000
+
+
+def test_invalid_rules_are_refused(user):
+    assert add_recurring_rule(user, -5, 'Food', 'hourly', '2025-01-01') is None
+    assert add_recurring_rule(user, -5, 'Food', 'weekly', '2025-01-01', day_of_month=3) is None
+    assert add_recurring_rule(user, -5, 'Food', 'daily', '2025-01-01', interval=0) is None
+    assert add_recurring_rule(user, -5, 'Food', 'daily', '2025-01-05', end_date='2025-01-01') is None
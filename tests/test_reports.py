@@ -0,0 +1,48 @@
+import pytest
+
+from reports import clear_report_cache, period_report
+from transaction import save_transactions_bulk
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_report_cache()
+    yield
+    clear_report_cache()
+
+
+def test_monthly_report_fills_gaps_and_carries_the_balance(user):
+    save_transactions_bulk(user, [(500, 'Salary', '2024-12-31'), (1000, 'Salary', '2025-01-05'),
+                                  (-200, 'Food', '2025-01-20'), (-50, 'Food', '2025-03-01')])
+    rows = period_report(user, 'monthly', '2025-01-01', '2025-04-01')
+    assert [row['period'] for row in rows] == ['2025-01', '2025-02', '2025-03']
+    assert [(row['income'], row['expense'], row['net']) for row in rows] == [
+        (1000, 200, 800), (0, 0, 0), (0, 50, -50)]
+    assert [row['balance'] for row in rows] == [1300, 1300, 1250]
+    assert [row['txn_count'] for row in rows] == [2, 0, 1]
+
+
+def test_weekly_daily_and_yearly_buckets(user):
+    # 2025-01-05 is a Sunday and 2025-01-06 a Monday
+    save_transactions_bulk(user, [(-1, 'Food', '2025-01-05'), (-2, 'Food', '2025-01-06'),
+                                  (-4, 'Food', '2025-01-12')])
+    weekly = period_report(user, 'weekly')
+    assert [(row['period'], row['start'], row['expense']) for row in weekly] == [
+        ('2025-W01', '2024-12-30', 1), ('2025-W02', '2025-01-06', 6)]
+    daily = period_report(user, 'daily')
+    assert len(daily) == 8
+    assert daily[-1]['balance'] == -7
+    assert [row['period'] for row in period_report(user, 'yearly')] == ['2025']
+
+
+def test_cached_report_is_refreshed_after_a_write(user):
+    save_transactions_bulk(user, [(-10, 'Food', '2025-01-05')])
+    assert period_report(user)[0]['expense'] == 10
+    save_transactions_bulk(user, [(-5, 'Food', '2025-01-06')])
+    assert period_report(user)[0]['expense'] == 15
+
+
+def test_unknown_granularity_and_empty_history(user):
+    with pytest.raises(ValueError):
+        period_report(user, 'hourly')
+    assert period_report(user) == []
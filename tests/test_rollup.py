@@ -0,0 +1,50 @@
+import database
+from helper import get_spending_by_category
+from rollup import rebuild_spending_rollup, verify_spending_rollup
+from transaction import delete_transaction, get_all_transactions, save_transactions_bulk
+
+
+def rollup_rows(user_id):
+    with database.db_connection() as conn:
+        return {(row['category'], row['year_month']): (row['total_spent'], row['txn_count'])
+                for row in conn.execute("SELECT * FROM spending_rollup WHERE user_id = ?", (user_id,))}
+
+
+def test_triggers_keep_the_rollup_current(user):
+    save_transactions_bulk(user, [
+        (-10, 'Food', '2025-01-05'),
+        (-5, 'Food', '2025-01-20'),
+        (-7, 'Food', '2025-02-01'),
+        (100, 'Salary', '2025-01-01'),
+    ])
+    assert rollup_rows(user) == {('Food', '2025-01'): (1500, 2), ('Food', '2025-02'): (700, 1)}
+
+    with database.db_connection() as conn:
+        conn.execute("UPDATE transactions SET category = 'Fun', date = '2025-02-10' "
+                     "WHERE user_id = ? AND amount = -500", (user,))
+    assert rollup_rows(user) == {('Food', '2025-01'): (1000, 1), ('Food', '2025-02'): (700, 1),
+                                 ('Fun', '2025-02'): (500, 1)}
+
+    fun = next(t for t in get_all_transactions(user) if t['amount'] == -5)
+    delete_transaction(fun['transaction_id'], user)
+    assert ('Fun', '2025-02') not in rollup_rows(user)
+    assert verify_spending_rollup() == []
+
+
+def test_month_spending_reads_the_rollup(user):
+    save_transactions_bulk(user, [(-10, 'Food', '2025-01-31'), (-4, 'Food', '2025-02-01')])
+    assert get_spending_by_category(user, 'Food', 1, 2025) == 10
+    assert get_spending_by_category(user, 'Food', year=2025) == 14
+    assert get_spending_by_category(user, 'Food', start_date='2025-02-01') == 4
+
+
+def test_verify_reports_drift_and_rebuild_repairs_it(user):
+    save_transactions_bulk(user, [(-10, 'Food', '2025-01-05'), (-3, 'Bus', '2025-01-06')])
+    with database.db_connection() as conn:
+        conn.execute("UPDATE spending_rollup SET total_spent = 1 WHERE category = 'Food'")
+        conn.execute("DELETE FROM spending_rollup WHERE category = 'Bus'")
+    mismatches = verify_spending_rollup(user)
+    assert [(m['category'], m['expected_total'], m['actual_total']) for m in mismatches] == [
+        ('Bus', 300, None), ('Food', 1000, 1)]
+    rebuild_spending_rollup(user)
+    assert verify_spending_rollup() == []
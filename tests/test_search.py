@@ -0,0 +1,64 @@
+import pytest
+
+import database
+from search import fts_query, rebuild_search_index, search_index_exists, search_transactions
+from transaction import delete_transaction, save_transactions_bulk
+from users import create_user
+
+
+def descriptions(results):
+    return [result['description'] for result in results]
+
+
+@pytest.fixture
+def searchable(user):
+    save_transactions_bulk(user, [
+        (-12, 'Transport', '2025-01-01', 'Uber rides home'),
+        (-40, 'Food', '2025-01-02', 'Café crème and croissant'),
+        (-9, 'Food', '2025-02-03', 'Uber Eats dinner'),
+        (-3, 'Transport', '2025-02-04', 'Bus ticket'),
+    ])
+    with database.db_connection() as conn:
+        if not search_index_exists(conn):
+            pytest.skip("SQLite built without FTS5")
+    return user
+
+
+def test_prefix_words_must_all_match(searchable):
+    assert descriptions(search_transactions(searchable, 'uber ride')) == ['Uber rides home']
+    assert sorted(descriptions(search_transactions(searchable, 'ub'))) == ['Uber Eats dinner',
+                                                                           'Uber rides home']
+    assert descriptions(search_transactions(searchable, 'transport bus')) == ['Bus ticket']
+    assert search_transactions(searchable, '   ') == []
+
+
+def test_diacritics_operators_and_snippets(searchable):
+    results = search_transactions(searchable, 'cafe creme', markers=('<', '>'))
+    assert descriptions(results) == ['Café crème and croissant']
+    assert '<Café>' in results[0]['snippet']
+    assert results[0]['amount'] == -40
+    # FTS5 syntax typed by the user is searched for, not parsed
+    assert search_transactions(searchable, 'uber OR NOT "bus') == []
+
+
+def test_filters_and_other_users(searchable):
+    assert descriptions(search_transactions(searchable, 'uber', {'month': 2, 'year': 2025})) == \
+        ['Uber Eats dinner']
+    assert descriptions(search_transactions(searchable, 'uber', {'category': 'Transport'})) == \
+        ['Uber rides home']
+    other = create_user('Other')
+    assert search_transactions(other, 'uber') == []
+    with pytest.raises(ValueError):
+        search_transactions(searchable, 'uber', {'colour': 'red'})
+
+
+def test_index_follows_deletes_and_rebuilds(searchable):
+    bus = search_transactions(searchable, 'bus')[0]
+    delete_transaction(bus['transaction_id'], searchable)
+    assert search_transactions(searchable, 'bus') == []
+    assert rebuild_search_index()
+    assert len(search_transactions(searchable, 'uber')) == 2
+
+
+def test_query_quotes_every_word():
+    assert fts_query(7, 'a-b "c') == 'user_id : "7" AND {description category} : ("a"* "b"* "c"*)'
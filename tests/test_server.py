@@ -0,0 +1,79 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+import database
+import server
+
+
+@pytest.fixture
+def api(db):
+    httpd = server.make_server(port=0, workers=4)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    conn = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=10)
+
+    def request(method, path, body=None, headers=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        conn.request(method, path, payload, {'Content-Type': 'application/json', **(headers or {})})
+        response = conn.getresponse()
+        data = response.read()
+        return response.status, response.getheader('ETag'), json.loads(data) if data else None
+
+    yield request
+    conn.close()
+    httpd.shutdown()
+    httpd.server_close()
+    database.close_pools()
+
+
+def test_create_and_read_transactions(api):
+    status, _, body = api('POST', '/users/1/transactions',
+                          {'amount': '-12.50', 'category': 'Food', 'date': '2025-01-02'})
+    assert status == 201
+    assert body['transaction_id'] > 0
+    status, _, body = api('GET', '/users/1/transactions?page_size=10')
+    assert status == 200
+    assert [t['amount'] for t in body['transactions']] == ['-12.50']
+    status, _, body = api('GET', '/users/1/balance')
+    assert body['balance'] == '-12.50'
+    status, _, users = api('GET', '/users')
+    assert users[0] == {'user_id': 1, 'name': 'Default User'}
+
+
+def test_etag_gives_304_until_the_user_changes(api):
+    status, etag, _ = api('GET', '/users/1/summary')
+    assert status == 200 and etag
+    status, same, body = api('GET', '/users/1/summary', headers={'If-None-Match': etag})
+    assert (status, same, body) == (304, etag, None)
+
+    api('PUT', '/users/1/budgets/Food', {'limit': '450'})
+    status, changed, body = api('GET', '/users/1/summary', headers={'If-None-Match': etag})
+    assert status == 200
+    assert changed != etag
+    assert next(b for b in body['budgets'] if b['category'] == 'Food')['limit'] == '450.00'
+
+
+def test_errors_are_json(api):
+    assert api('GET', '/nowhere')[0] == 404
+    assert api('DELETE', '/users/1/summary')[0] == 405
+    assert api('GET', '/users/1/transactions?page_size=x')[0] == 400
+    assert api('GET', '/users/1/transactions?cursor=bad')[0] == 400
+    status, _, body = api('POST', '/users/1/transactions', {'amount': 'abc', 'category': 'Food',
+                                                            'date': '2025-01-01'})
+    assert status == 400 and 'error' in body
+    assert api('DELETE', '/users/1/transactions/999')[0] == 404
+    assert api('PUT', '/users/1/budgets/Food', {'limit': -1})[0] == 400
+
+
+def test_repeated_entry_is_refused_unless_allowed(api):
+    entry = {'amount': '-3.50', 'category': 'Food', 'date': '2025-01-03', 'description': 'Coffee'}
+    first = api('POST', '/users/1/transactions', entry)
+    assert first[0] == 201
+    status, _, body = api('POST', '/users/1/transactions', {**entry, 'description': 'coffee!'})
+    assert status == 409 and 'allow_duplicate' in body['error']
+    status, _, body = api('POST', '/users/1/transactions', {**entry, 'allow_duplicate': True})
+    assert status == 201 and body['transaction_id'] != first[2]['transaction_id']
+    assert api('POST', '/users/1/transactions', {**entry, 'external_id': 'BANK-7'})[0] == 201
@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+
+import database
+import sharding
+from commands import main
+from recurring import add_recurring_rule, get_recurring_rules, materialize_due
+from rollup import verify_spending_rollup
+from transaction import calculate_balance, get_all_transactions, save_transaction, save_transactions_bulk
+from users import create_user, get_all_users
+
+SHARDS = 3
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'CONCURRENT', False)
+    monkeypatch.setattr(database, 'READ_ONLY', False)
+    monkeypatch.setattr(database, 'SHARDS', 0)
+    database.set_database_path(str(tmp_path / 'finance_tracker.db'))
+    database.enable_sharding(SHARDS)
+    database.setup_database()
+    yield tmp_path
+    database.close_pools()
+
+
+def users_on(shard):
+    with database.get_pool(sharding.shard_path(shard)).connection() as conn:
+        return [row[0] for row in conn.execute("SELECT user_id FROM users ORDER BY user_id")]
+
+
+def test_users_are_spread_over_their_home_shards(sharded):
+    created = [create_user(f"User {i}") for i in range(5)]
+    assert created == [2, 3, 4, 5, 6]
+    assert users_on(0) == [1, 4]
+    assert users_on(1) == [2, 5]
+    assert users_on(2) == [3, 6]
+    assert [user.user_id for user in get_all_users()] == [1] + created
+    for user_id in created:
+        save_transactions_bulk(user_id, [(user_id, 'Salary', '2025-01-01')])
+        assert calculate_balance(user_id) == user_id
+
+
+def test_move_user_keeps_data_and_reroutes(sharded):
+    user_id = create_user('Mover')
+    home = sharding.shard_for(user_id)
+    add_recurring_rule(user_id, -10, 'Rent', 'monthly', '2025-01-01')
+    materialize_due('2025-02-15', user_id=user_id)
+    save_transactions_bulk(user_id, [(100, 'Salary', '2025-01-01')])
+    before = sorted((t['date'], t['amount']) for t in get_all_transactions(user_id))
+
+    target = (home + 1) % SHARDS
+    assert sharding.move_user(user_id, target) == 1 + 1 + 3
+    assert sharding.shard_for(user_id) == target
+    assert user_id not in users_on(home)
+    assert sorted((t['date'], t['amount']) for t in get_all_transactions(user_id)) == before
+    assert calculate_balance(user_id) == 80
+    # Copied occurrences still point at the (renumbered) rule, so none are written twice
+    assert materialize_due('2025-02-15', user_id=user_id) == 0
+    assert get_recurring_rules(user_id)[0]['next_date'] == '2025-03-01'
+    assert verify_spending_rollup() == []
+
+    with pytest.raises(sqlite3.IntegrityError, match=database.MOVED_USER_ERROR):
+        database.run_write(lambda conn: conn.execute(
+            "INSERT INTO transactions (user_id, amount, category, date) VALUES (?, 1, 'X', '2025-01-01')",
+            (user_id,)), path=sharding.shard_path(home))
+    assert sharding.move_user(user_id, target) == 0
+    with pytest.raises(ValueError):
+        sharding.move_user(user_id, SHARDS)
+
+
+def test_write_routed_to_the_old_shard_is_retried(sharded, monkeypatch):
+    user_id = create_user('Mover')
+    home = sharding.shard_for(user_id)
+    sharding.move_user(user_id, (home + 1) % SHARDS)
+    stale = [home]
+    real_shard_for = sharding.shard_for
+    # The first lookup answers from a stale cache, as a process that has not seen the move would
+    monkeypatch.setattr(sharding, 'shard_for', lambda uid: stale.pop() if stale else real_shard_for(uid))
+    assert save_transaction(user_id, 5, 'Gift', '2025-01-01')
+    assert stale == []
+    assert calculate_balance(user_id) == 5
+
+
+def test_shards_command(sharded, capsys):
+    create_user('Someone')
+    assert main(['shards', 'status']) == 0
+    assert 'shard00' in capsys.readouterr().out
+    assert [stats['users'] for stats in sharding.shard_stats()] == [1, 1, 0]
+
+
+def test_catalog_version_is_separate_from_the_schema_version(sharded):
+    with sqlite3.connect(database.DB_PATH) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 0
+        assert conn.execute("SELECT value FROM shard_config WHERE key = ?",
+                            (sharding.CATALOG_VERSION_KEY,)).fetchone()[0] == len(sharding.CATALOG_MIGRATIONS)
+    assert sharding.migrate_catalog() == []
+
+
+def test_mismatched_settings_fail_clearly(db, monkeypatch, capsys):
+    # An existing single-file database cannot be reopened as a shard directory
+    database.enable_sharding(2)
+    with pytest.raises(RuntimeError, match="unsharded database"):
+        database.setup_database()
+    assert main(['balance', '1']) == 1
+    assert "unsharded database" in capsys.readouterr().err
+
+    # ...and a shard directory cannot be opened as a single-file database
+    database.set_database_path(db.replace('finance_tracker', 'catalog'))
+    database.setup_database()
+    database.enable_sharding(0)
+    with pytest.raises(RuntimeError, match="shard directory"):
+        database.setup_database()
+    database.enable_sharding(3)
+    with pytest.raises(RuntimeError, match="split into 2 shards, not 3"):
+        database.setup_database()
@@ -0,0 +1,70 @@
+import json
+import os
+from datetime import date
+
+import database
+from budget import set_budget_limit
+from statements import build_statement, previous_month, run_statements, statement_path
+from transaction import save_transactions_bulk
+from users import create_user
+
+
+def seed(user_id):
+    save_transactions_bulk(user_id, [
+        (1000, 'Salary', '2024-02-20', 'February pay'),
+        (-300, 'Rent', '2024-03-01', 'March rent'),
+        (-45.50, 'Food', '2024-03-14', 'Groceries'),
+        (-20, 'Food', '2024-04-02', 'Lunch'),
+    ])
+    set_budget_limit(user_id, 'Food', 100)
+
+
+def test_previous_month_wraps_the_year():
+    assert previous_month(date(2024, 1, 15)) == (12, 2023)
+    assert previous_month(date(2024, 3, 1)) == (2, 2024)
+
+
+def test_build_statement(user):
+    seed(user)
+    statement = build_statement({'user_id': user, 'name': 'Test User'}, 3, 2024)
+    assert statement['period'] == '2024-03'
+    assert statement['opening_balance'] == '1000.00'
+    assert statement['closing_balance'] == '654.50'
+    assert [t['description'] for t in statement['transactions']] == ['Groceries', 'March rent']
+    food = statement['budgets'][0]
+    assert (food['category'], food['limit'], food['spent']) == ('Food', '100.00', '65.50')
+    json.dumps(statement)
+
+
+def test_run_statements_in_process(user, tmp_path):
+    seed(user)
+    other = create_user('Other User')
+    result = run_statements(str(tmp_path), 3, 2024, workers=1, user_ids=[user, other], batch_size=1)
+    assert result['written'] == 2
+    assert result['failed'] == []
+    with open(statement_path(str(tmp_path), user, 3, 2024), encoding='utf-8') as f:
+        assert json.load(f)['closing_balance'] == '654.50'
+    with open(statement_path(str(tmp_path), other, 3, 2024), encoding='utf-8') as f:
+        assert json.load(f)['transactions'] == []
+
+
+def test_run_statements_on_worker_processes(user, tmp_path):
+    seed(user)
+    other = create_user('Other User')
+    result = run_statements(str(tmp_path), 3, 2024, workers=2, user_ids=[user, other], batch_size=1)
+    assert result['written'] == 2
+    assert result['failed'] == []
+    assert sum(stats['statements'] for stats in result['workers'].values()) == 2
+    assert os.path.exists(statement_path(str(tmp_path), other, 3, 2024))
+
+
+def test_database_errors_are_reported_as_failures(user, tmp_path):
+    # With the budgets table gone a statement cannot be complete; it must not
+    # be written with an empty budget list.
+    seed(user)
+    database.run_write(lambda conn: conn.execute("DROP TABLE budgets"))
+    result = run_statements(str(tmp_path), 3, 2024, workers=1, user_ids=[user])
+    assert result['written'] == 0
+    assert [user_id for user_id, _ in result['failed']] == [user]
+    assert 'budgets' in result['failed'][0][1]
+    assert not os.path.exists(statement_path(str(tmp_path), user, 3, 2024))
@@ -0,0 +1,84 @@
+import pytest
+
+from commands import main
+from importer import import_csv
+from transaction import get_all_transactions, get_transactions_page, iter_transactions, save_transactions_bulk
+
+
+def test_bulk_insert_reports_rejected_rows_by_position(user):
+    rows = [
+        (-10, 'Food', '2025-01-01', 'Lunch'),
+        {'amount': 2500, 'category': 'Salary', 'date': '2025-01-02'},
+        (-5, '', '2025-01-03'),
+        (-5, 'Food', 'not a date'),
+        ('abc', 'Food', '2025-01-04'),
+    ]
+    report = save_transactions_bulk(user, iter(rows), chunk_size=2)
+    assert report['inserted'] == 2
+    assert report['failed'] == 3
+    assert [error['row'] for error in report['errors']] == [3, 4, 5]
+    assert sorted(t['amount'] for t in get_all_transactions(user)) == [-10, 2500]
+
+
+def test_bulk_insert_spans_chunks_in_one_commit(user):
+    rows = ((-1, 'Food', f"2025-01-{day:02d}", f"item {day}") for day in range(1, 29))
+    report = save_transactions_bulk(user, rows, chunk_size=5)
+    assert report['inserted'] == 28
+    assert len(get_all_transactions(user)) == 28
+
+
+def test_import_csv_reads_header_columns_in_any_order(user, tmp_path):
+    path = tmp_path / 'bank.csv'
+    path.write_text("Category,Amount,Date,Description\n"
+                    "Food,-12.50,2025-02-01,Groceries\n"
+                    "Rent,-900,2025-02-01,\n")
+    report = import_csv(user, str(path))
+    assert report['inserted'] == 2
+    amounts = sorted(str(t['amount']) for t in get_all_transactions(user))
+    assert amounts == ['-12.50', '-900.00']
+
+
+def test_import_command_exit_status(user, tmp_path, capsys):
+    path = tmp_path / 'bank.csv'
+    path.write_text("date,amount,category\n2025-02-01,-3,Food\nbad,-3,Food\n")
+    assert main(['import', str(user), str(path)]) == 2
+    assert "Imported 1 transactions" in capsys.readouterr().out
+    missing = tmp_path / 'missing.csv'
+    missing.write_text("date,amount\n2025-02-01,-3\n")
+    assert main(['import', str(user), str(missing)]) == 1
+
+
+def test_keyset_pages_cover_every_row_once_in_order(user):
+    # Same date and created_at for many rows, so the id breaks ties
+    save_transactions_bulk(user, [(-(i + 1), 'Food', f"2025-03-{i % 3 + 1:02d}") for i in range(23)])
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = get_transactions_page(user, page_size=5, cursor=cursor)
+        assert len(page) <= 5
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert len(seen) == 23
+    assert len({t['transaction_id'] for t in seen}) == 23
+    keys = [(t['date'], t['created_at'], t['transaction_id']) for t in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert [t['transaction_id'] for t in iter_transactions(user, page_size=4)] == \
+        [t['transaction_id'] for t in seen]
+
+
+def test_pages_apply_filters(user):
+    save_transactions_bulk(user, [(-1, 'Food', '2025-03-01'), (-2, 'Bus', '2025-03-02'),
+                                  (-3, 'Food', '2025-04-01')])
+    page, cursor = get_transactions_page(user, {'category': 'Food', 'month': 3, 'year': 2025})
+    assert [t['amount'] for t in page] == [-1]
+    assert cursor is None
+    with pytest.raises(ValueError, match="Unknown transaction filters"):
+        get_transactions_page(user, {'colour': 'red'})
+
+
+def test_invalid_cursor_is_rejected(user):
+    with pytest.raises(ValueError, match="Invalid page cursor"):
+        get_transactions_page(user, cursor='not-a-cursor')
+    with pytest.raises(ValueError):
+        get_transactions_page(user, page_size=0)